@@ -0,0 +1,101 @@
+"""
+Benchmark: Keyword Matching for Manipulation Strategy Detection
+Master's Thesis: Psychological Manipulation in Marketing Discourse
+
+Compares the original per-keyword substring + regex scan against the
+single-pass keyword automaton on a sector corpus, and checks that both
+produce the same counts and context examples.
+
+Usage:
+    python benchmark_keyword_matching.py [sector] [repeats]
+"""
+
+import re
+import sys
+import time
+
+from emotion_manipulation_analyzer import EmotionManipulationAnalyzer
+
+
+def legacy_detect_manipulation_strategies(manipulation_categories, text):
+    """Original implementation: one substring check and one regex per keyword"""
+    text_lower = text.lower()
+    results = {}
+
+    for category, details in manipulation_categories.items():
+        matches = []
+        for keyword in details['keywords']:
+            if keyword in text_lower:
+                pattern = re.compile(
+                    r'.{0,30}' + re.escape(keyword) + r'.{0,30}',
+                    re.IGNORECASE
+                )
+                contexts = pattern.findall(text)
+                matches.extend([(keyword, context) for context in contexts])
+
+        results[category] = {
+            'count': len(matches),
+            'unique_keywords': len(set([m[0] for m in matches])),
+            'examples': matches[:3] if matches else []
+        }
+
+    return results
+
+
+def time_call(func, repeats):
+    """Return the best wall-clock time of several calls and the last result"""
+    best = float('inf')
+    result = None
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    sector = sys.argv[1] if len(sys.argv) > 1 else 'Fashion'
+    repeats = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+
+    analyzer = EmotionManipulationAnalyzer(sector)
+    analyzer.load_texts()
+
+    print(f"\n{'Brand':<20}{'Size (KB)':>10}{'Legacy (ms)':>14}{'Automaton (ms)':>16}{'Speedup':>10}")
+    print('-' * 70)
+
+    total_legacy = total_new = 0.0
+    mismatches = []
+    for brand_name, text in sorted(analyzer.texts.items()):
+        legacy_time, legacy = time_call(
+            lambda: legacy_detect_manipulation_strategies(analyzer.manipulation_categories, text),
+            repeats
+        )
+        new_time, new = time_call(
+            lambda: analyzer.detect_manipulation_strategies(text),
+            repeats
+        )
+        total_legacy += legacy_time
+        total_new += new_time
+
+        for category, details in legacy.items():
+            for field in ['count', 'unique_keywords', 'examples']:
+                if details[field] != new[category][field]:
+                    mismatches.append((brand_name, category, field))
+
+        print(f"{brand_name:<20}{len(text) / 1024:>10.0f}{legacy_time * 1000:>14.1f}"
+              f"{new_time * 1000:>16.1f}{legacy_time / new_time:>9.1f}x")
+
+    print('-' * 70)
+    print(f"{'Total':<30}{total_legacy * 1000:>14.1f}{total_new * 1000:>16.1f}"
+          f"{total_legacy / total_new:>9.1f}x")
+
+    if mismatches:
+        print(f"\n{len(mismatches)} mismatches between implementations:")
+        for brand_name, category, field in mismatches:
+            print(f"  - {brand_name} / {category}: {field}")
+    else:
+        print("\nCounts and examples identical for all brands and categories")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""
+Benchmark: POS Tagger Backends for Linguistic Features
+Master's Thesis: Psychological Manipulation in Marketing Discourse
+
+Tags every brand document of the materials corpus with each tagger backend
+and compares throughput and agreement with the NLTK perceptron: how often
+a token falls in the same class (adjective / adverb / verb / other), and
+how far the per-document adjective, adverb and verb counts are off.
+
+Usage:
+    python benchmark_pos_taggers.py [backend ...]
+"""
+
+import sys
+import time
+
+from corpus_analysis import MarketingDiscourseAnalyzer
+from parsed_document import ParsedDocument
+from pos_taggers import TAG_GROUPS, TAGGER_BACKENDS, count_tag_groups, get_pos_tagger
+
+
+def tag_class(tag: str) -> str:
+    """Feature group of a tag, or 'other'"""
+    for group, tags in TAG_GROUPS.items():
+        if tag in tags:
+            return group
+    return 'other'
+
+
+def load_corpus():
+    """Tokenized documents of every sector, keyed by (sector, brand)"""
+    base_analyzer = MarketingDiscourseAnalyzer('Fashion')
+    documents = {}
+    for sector in ['Fashion', 'Fitness', 'Skincare_Cosmetics']:
+        analyzer = base_analyzer.for_sector(sector)
+        if not analyzer.data_path.exists():
+            continue
+        analyzer.load_texts()
+        for brand_name, text in analyzer.texts.items():
+            documents[(sector, brand_name)] = ParsedDocument(text)
+    return documents
+
+
+def main():
+    backends = sys.argv[1:] or list(TAGGER_BACKENDS)
+
+    documents = load_corpus()
+    start = time.perf_counter()
+    total_words = sum(len(document.words) for document in documents.values())
+    print(f"Tokenized {len(documents)} documents ({total_words} words) "
+          f"in {time.perf_counter() - start:.1f} s")
+
+    tagged = {}
+    timings = {}
+    for backend in backends:
+        try:
+            tagger = get_pos_tagger(backend)
+        except Exception as e:
+            print(f"Skipping {backend}: {e}")
+            continue
+        start = time.perf_counter()
+        tagged[backend] = {
+            key: tagger.tag(document.sentence_words) for key, document in documents.items()
+        }
+        timings[backend] = time.perf_counter() - start
+
+    if not tagged:
+        print("No tagger backend available")
+        return
+    reference = 'nltk' if 'nltk' in tagged else next(iter(tagged))
+
+    print(f"\nAgreement with the {reference} tagger")
+    print(f"\n{'Backend':<10}{'Time (s)':>10}{'Words/s':>12}{'Token agr.':>12}"
+          + ''.join(f"{group + ' err.':>16}" for group in TAG_GROUPS))
+    print('-' * (44 + 16 * len(TAG_GROUPS)))
+
+    for backend, backend_tags in tagged.items():
+        agreeing = 0
+        count_errors = {group: [] for group in TAG_GROUPS}
+        for key, tags in backend_tags.items():
+            reference_tags = tagged[reference][key]
+            agreeing += sum(
+                tag_class(tag) == tag_class(reference_tag)
+                for tag, reference_tag in zip(tags, reference_tags)
+            )
+            counts = count_tag_groups(tags)
+            reference_counts = count_tag_groups(reference_tags)
+            for group in TAG_GROUPS:
+                if reference_counts[group]:
+                    count_errors[group].append(
+                        abs(counts[group] - reference_counts[group]) / reference_counts[group]
+                    )
+
+        print(f"{backend:<10}{timings[backend]:>10.2f}{total_words / timings[backend]:>12.0f}"
+              f"{agreeing / total_words:>12.1%}"
+              + ''.join(
+                  f"{sum(errors) / len(errors) if errors else 0.0:>16.1%}"
+                  for errors in count_errors.values()
+              ))
+
+    print("\nerr. = mean relative difference of the per-document count")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""
+Benchmark: Vectorized VADER Scoring
+Master's Thesis: Psychological Manipulation in Marketing Discourse
+
+Scores every brand document of a sector with NLTK's VADER and with the
+vectorized scorer, once as whole documents and once sentence by sentence,
+and checks that all scores agree within vader_scorer.TOLERANCE.
+
+Usage:
+    python benchmark_vader.py [sector ...]
+"""
+
+import sys
+import time
+
+from corpus_analysis import MarketingDiscourseAnalyzer
+from parsed_document import ParsedDocument
+from resources import get_vader, get_vader_scorer
+from vader_scorer import SCORE_NAMES, TOLERANCE, round_scores
+
+
+def compare(reference, scores, max_differences):
+    """Update the largest absolute difference per score, return mismatches"""
+    mismatches = 0
+    for name in SCORE_NAMES:
+        difference = abs(reference[name] - scores[name])
+        max_differences[name] = max(max_differences[name], difference)
+        if difference > TOLERANCE[name] + 1e-12:
+            mismatches += 1
+    return mismatches
+
+
+def main():
+    sectors = sys.argv[1:] or ['Fashion', 'Fitness', 'Skincare_Cosmetics']
+    sia = get_vader()
+    scorer = get_vader_scorer()
+    base_analyzer = MarketingDiscourseAnalyzer(sectors[0])
+
+    print(f"\n{'Brand':<22}{'Sentences':>10}{'NLTK doc':>10}{'Vec doc':>10}"
+          f"{'NLTK sent':>11}{'Vec sent':>10}")
+    print('-' * 73)
+
+    totals = dict.fromkeys(['nltk_document', 'vector_document', 'nltk_sentences',
+                            'vector_sentences'], 0.0)
+    document_differences = dict.fromkeys(SCORE_NAMES, 0.0)
+    sentence_differences = dict.fromkeys(SCORE_NAMES, 0.0)
+    mismatches = 0
+    sentence_total = 0
+    for sector in sectors:
+        analyzer = base_analyzer.for_sector(sector)
+        if not analyzer.data_path.exists():
+            continue
+        analyzer.load_texts()
+        for brand_name, text in sorted(analyzer.texts.items()):
+            sentences = ParsedDocument(text).sentences
+            sentence_total += len(sentences)
+
+            start = time.perf_counter()
+            reference = sia.polarity_scores(text)
+            nltk_document = time.perf_counter() - start
+
+            start = time.perf_counter()
+            scores = scorer.polarity_scores(text)
+            vector_document = time.perf_counter() - start
+            mismatches += compare(reference, scores, document_differences)
+
+            start = time.perf_counter()
+            sentence_references = [sia.polarity_scores(sentence) for sentence in sentences]
+            nltk_sentences = time.perf_counter() - start
+
+            start = time.perf_counter()
+            sentence_scores = scorer.score_batch(sentences)
+            vector_sentences = time.perf_counter() - start
+            for sentence_reference, row in zip(sentence_references,
+                                               sentence_scores.to_dict('records')):
+                mismatches += compare(sentence_reference, round_scores(row),
+                                      sentence_differences)
+
+            for key, seconds in zip(totals, [nltk_document, vector_document,
+                                             nltk_sentences, vector_sentences]):
+                totals[key] += seconds
+            print(f"{brand_name:<22}{len(sentences):>10}{nltk_document * 1000:>10.0f}"
+                  f"{vector_document * 1000:>10.0f}{nltk_sentences * 1000:>11.0f}"
+                  f"{vector_sentences * 1000:>10.0f}")
+
+    print('-' * 73)
+    print(f"{'Total (ms)':<22}{sentence_total:>10}{totals['nltk_document'] * 1000:>10.0f}"
+          f"{totals['vector_document'] * 1000:>10.0f}{totals['nltk_sentences'] * 1000:>11.0f}"
+          f"{totals['vector_sentences'] * 1000:>10.0f}")
+    if totals['vector_document'] and totals['vector_sentences']:
+        print(f"Speedup: {totals['nltk_document'] / totals['vector_document']:.1f}x (documents), "
+              f"{totals['nltk_sentences'] / totals['vector_sentences']:.1f}x (sentences)")
+
+    print("\nLargest absolute difference to NLTK (tolerance)")
+    for name in SCORE_NAMES:
+        print(f"  {name:<10}documents {document_differences[name]:.4f}  "
+              f"sentences {sentence_differences[name]:.4f}  ({TOLERANCE[name]:g})")
+    if mismatches:
+        print(f"\n{mismatches} scores outside the tolerance")
+    else:
+        print("\nAll scores within the tolerance")
+
+
+if __name__ == "__main__":
+    main()
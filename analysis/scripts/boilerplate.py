@@ -0,0 +1,227 @@
+"""
+Near-Duplicate Boilerplate Removal
+Master's Thesis: Psychological Manipulation in Marketing Discourse
+
+Brand files concatenate many scraped pages, which repeat navigation,
+footer and legal text with small variations ("You can always withdraw your
+consent at any time" with and without the period, privacy policy headings
+in upper and lower case, one ingredient list per product shade). Repeats
+inflate keyword counts and are analyzed again and again.
+
+Each line of a brand file is compared with the lines kept before it:
+
+- exact duplicates: the same words after Unicode normalization and case
+  folding (punctuation and spacing ignored)
+- near duplicates: lines of at least MIN_WORDS words whose word 3-gram
+  sets have an estimated Jaccard similarity of at least
+  SIMILARITY_THRESHOLD, found with MinHash signatures and locality-
+  sensitive hashing (banded signatures), so each line is only compared
+  with a few candidates instead of every kept line
+
+The first occurrence is kept; every dropped line is recorded with the line
+it repeats. The corpus store applies the filter when built with
+deduplicate=True, see corpus_store.py.
+
+Usage:
+    python boilerplate.py [--examples 3]
+"""
+
+import argparse
+import re
+import unicodedata
+import zlib
+from collections import defaultdict
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from parallel_analysis import CSVStream
+
+# Configuration
+PROJECT_ROOT = Path("D:/Thesis")
+DATA_DIR = PROJECT_ROOT / "docs" / "materials"
+RESULTS_DIR = PROJECT_ROOT / "analysis" / "results"
+SECTORS = ['Fashion', 'Fitness', 'Skincare_Cosmetics']
+
+# MinHash signature length and LSH banding (16 bands of 8 rows: lines with
+# a Jaccard similarity of 0.8 become candidates with probability > 0.99)
+NUM_PERMUTATIONS = 128
+BANDS = 16
+SIMILARITY_THRESHOLD = 0.8
+SHINGLE_SIZE = 3
+# Shorter lines (menu items, headings) are only removed as exact duplicates
+MIN_WORDS = 8
+SEED = 1
+
+# Mersenne prime for the permutation hashes; products stay below 2**62
+PRIME = (1 << 31) - 1
+
+WORD_PATTERN = re.compile(r'\w+')
+
+
+def line_words(line: str) -> List[str]:
+    """Words of a line after NFKC normalization and case folding"""
+    return WORD_PATTERN.findall(unicodedata.normalize('NFKC', line).casefold())
+
+
+def settings() -> Dict:
+    """Parameters that determine the filter output (stored with filtered data)"""
+    return {
+        'num_permutations': NUM_PERMUTATIONS, 'bands': BANDS,
+        'similarity_threshold': SIMILARITY_THRESHOLD, 'shingle_size': SHINGLE_SIZE,
+        'min_words': MIN_WORDS, 'seed': SEED
+    }
+
+
+class MinHasher:
+    """
+    MinHash signatures of word shingle sets with random linear permutations
+    """
+
+    def __init__(self, num_permutations: int = NUM_PERMUTATIONS,
+                 shingle_size: int = SHINGLE_SIZE, seed: int = SEED):
+        rng = np.random.default_rng(seed)
+        self.a = rng.integers(1, PRIME, num_permutations, dtype=np.uint64)
+        self.b = rng.integers(0, PRIME, num_permutations, dtype=np.uint64)
+        self.shingle_size = shingle_size
+
+    def signature(self, words: List[str]) -> np.ndarray:
+        """Minimum of each permutation over the line's word n-gram hashes"""
+        size = self.shingle_size
+        shingles = {' '.join(words[i:i + size]) for i in range(max(len(words) - size + 1, 1))}
+        hashes = np.fromiter(
+            (zlib.crc32(shingle.encode('utf-8')) % PRIME for shingle in shingles),
+            dtype=np.uint64, count=len(shingles)
+        )
+        return ((np.outer(hashes, self.a) + self.b) % PRIME).min(axis=0)
+
+
+class LSHIndex:
+    """
+    Banded MinHash signatures: items sharing any band are candidates
+    """
+
+    def __init__(self, num_permutations: int = NUM_PERMUTATIONS, bands: int = BANDS):
+        if num_permutations % bands:
+            raise ValueError(f"{num_permutations} permutations cannot be split into {bands} bands")
+        self.rows = num_permutations // bands
+        self.bands = bands
+        self._buckets = defaultdict(list)
+        self.signatures = []
+
+    def _keys(self, signature: np.ndarray) -> List[Tuple[int, bytes]]:
+        rows = self.rows
+        return [(band, signature[band * rows:(band + 1) * rows].tobytes())
+                for band in range(self.bands)]
+
+    def add(self, signature: np.ndarray) -> int:
+        """Index a signature and return its item id"""
+        item = len(self.signatures)
+        self.signatures.append(signature)
+        for key in self._keys(signature):
+            self._buckets[key].append(item)
+        return item
+
+    def most_similar(self, signature: np.ndarray) -> Tuple[Optional[int], float]:
+        """Candidate with the highest estimated Jaccard similarity"""
+        best, best_similarity = None, 0.0
+        candidates = set(item for key in self._keys(signature) for item in self._buckets.get(key, ()))
+        for item in candidates:
+            similarity = float((self.signatures[item] == signature).mean())
+            if similarity > best_similarity:
+                best, best_similarity = item, similarity
+        return best, best_similarity
+
+
+class BoilerplateFilter:
+    """
+    Drops lines of a document that repeat earlier lines exactly or nearly
+    """
+
+    def __init__(self, similarity_threshold: float = SIMILARITY_THRESHOLD,
+                 min_words: int = MIN_WORDS):
+        self.similarity_threshold = similarity_threshold
+        self.min_words = min_words
+        self.hasher = MinHasher()
+
+    def filter(self, text: str) -> Tuple[str, List[Dict]]:
+        """
+        Remove repeated lines from one document
+
+        Args:
+            text: Document text
+
+        Returns:
+            Tuple of (text without the repeated lines, one record per
+            removed line: 'line_number', 'reason' ('duplicate' or
+            'near_duplicate'), 'similarity', 'kept_line_number', 'text')
+        """
+        lines = text.splitlines(keepends=True)
+        kept = []
+        removed = []
+        first_lines = {}
+        index = LSHIndex()
+        index_lines = []
+
+        for line_number, line in enumerate(lines, start=1):
+            words = line_words(line)
+            if not words:
+                kept.append(line)
+                continue
+
+            key = ' '.join(words)
+            if key in first_lines:
+                removed.append({
+                    'line_number': line_number, 'reason': 'duplicate', 'similarity': 1.0,
+                    'kept_line_number': first_lines[key], 'text': line.strip()
+                })
+                continue
+            first_lines[key] = line_number
+
+            if len(words) >= self.min_words:
+                signature = self.hasher.signature(words)
+                item, similarity = index.most_similar(signature)
+                if item is not None and similarity >= self.similarity_threshold:
+                    removed.append({
+                        'line_number': line_number, 'reason': 'near_duplicate',
+                        'similarity': similarity, 'kept_line_number': index_lines[item],
+                        'text': line.strip()
+                    })
+                    continue
+                index.add(signature)
+                index_lines.append(line_number)
+            kept.append(line)
+
+        return ''.join(kept), removed
+
+
+def main(examples: int = 3):
+    """Filter every brand file and save the removed lines for review"""
+    boilerplate_filter = BoilerplateFilter()
+    record_path = RESULTS_DIR / 'boilerplate_removed.csv'
+    total_lines = total_removed = 0
+    with CSVStream(record_path, flush_each_row=False) as record:
+        for sector in SECTORS:
+            for path in sorted((DATA_DIR / sector).glob("*.txt")):
+                with open(path, 'r', encoding='utf-8', errors='ignore') as f:
+                    text = f.read()
+                filtered, removed = boilerplate_filter.filter(text)
+                for row in removed:
+                    record.write({'sector': sector, 'brand': path.stem, **row})
+                lines = text.count('\n') + 1
+                total_lines += lines
+                total_removed += len(removed)
+                print(f"{sector}/{path.stem}: {len(removed)} of {lines} lines removed, "
+                      f"{1 - len(filtered) / max(len(text), 1):.1%} of the text")
+                for row in removed[:examples]:
+                    print(f"    [{row['reason']} of line {row['kept_line_number']}] {row['text'][:100]}")
+    print(f"\n{total_removed} of {total_lines} lines removed; record saved to {record_path}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Report repeated boilerplate lines of the corpus")
+    parser.add_argument('--examples', type=int, default=3,
+                        help="Removed lines printed per brand")
+    args = parser.parse_args()
+    main(args.examples)
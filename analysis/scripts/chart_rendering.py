@@ -0,0 +1,178 @@
+"""
+Headless Chart Rendering
+Master's Thesis: Psychological Manipulation in Marketing Discourse
+
+Renders the analysis figures without a display: matplotlib always runs
+with the non-interactive Agg backend and figures are saved, never shown.
+Each figure is a ChartJob, a module-level draw function with the data it
+plots, so independent figures can be rendered in a process pool; a full
+regeneration then takes about as long as the slowest figure.
+
+A figure is skipped when its PNG exists and was rendered from the same
+input: the hash of the draw function, its data and the resolution is
+recorded per output directory in chart_inputs.json. Preview mode renders
+at low resolution to <name>_preview.png for a quick look.
+"""
+
+import inspect
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+from typing import Callable, Dict, List, NamedTuple
+
+from result_cache import fingerprint
+
+# Resolution of the thesis figures and of previews
+FULL_DPI = 300
+PREVIEW_DPI = 72
+
+MANIFEST_NAME = "chart_inputs.json"
+
+
+def use_headless_backend():
+    """Select the Agg backend before pyplot is used in this process"""
+    import matplotlib
+    matplotlib.use('Agg')
+
+
+class ChartJob(NamedTuple):
+    """
+    One figure: draw(*args) draws it with pyplot and returns the figure
+    (the current figure if None). draw must be a module-level function
+    so it can be sent to a worker process.
+    """
+    path: Path
+    draw: Callable
+    args: tuple = ()
+    # Edits of draw itself are detected; bump when a helper it calls or a
+    # style setting changes its output, to render it again
+    version: int = 1
+
+
+def data_hash(value) -> str:
+    """Stable hash of the data of a chart"""
+    import pandas as pd
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        return fingerprint(type(value).__name__, value.to_csv())
+    if isinstance(value, (list, tuple)):
+        return fingerprint(*(data_hash(item) for item in value))
+    if isinstance(value, dict):
+        return fingerprint(*(part for key in sorted(value) for part in (key, data_hash(value[key]))))
+    return fingerprint(json.dumps(value, sort_keys=True, default=str))
+
+
+def output_path(job: ChartJob, preview: bool) -> Path:
+    """PNG written by a job"""
+    path = Path(job.path)
+    return path.with_name(f"{path.stem}_preview{path.suffix}") if preview else path
+
+
+def code_hash(draw: Callable) -> str:
+    """Hash of a draw function's source, so editing it renders it again"""
+    try:
+        return fingerprint(inspect.getsource(draw))
+    except (OSError, TypeError):
+        # No source file (e.g. defined interactively): hash the bytecode
+        code = draw.__code__
+        return fingerprint(code.co_code.hex(), repr(code.co_consts))
+
+
+def job_digest(job: ChartJob, dpi: int) -> str:
+    """Hash of everything that determines the rendered PNG"""
+    return fingerprint(job.draw.__module__, job.draw.__qualname__, code_hash(job.draw),
+                       job.version, dpi, *(data_hash(arg) for arg in job.args))
+
+
+def render(draw: Callable, args: tuple, path: Path, dpi: int) -> Path:
+    """Draw one figure and save it (runs in a worker process or this one)"""
+    use_headless_backend()
+    import matplotlib.pyplot as plt
+    try:
+        figure = draw(*args) or plt.gcf()
+        # Written under a temporary name: an interrupted render leaves no PNG
+        temporary_path = path.with_name(path.stem + '.tmp' + path.suffix)
+        figure.savefig(temporary_path, dpi=dpi, bbox_inches='tight')
+        os.replace(temporary_path, path)
+    finally:
+        plt.close('all')
+    return path
+
+
+def _load_manifest(directory: Path) -> Dict[str, str]:
+    manifest_path = directory / MANIFEST_NAME
+    if manifest_path.exists():
+        with open(manifest_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    return {}
+
+
+def _save_manifest(directory: Path, manifest: Dict[str, str]):
+    temporary_path = directory / (MANIFEST_NAME + '.tmp')
+    with open(temporary_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.replace(temporary_path, directory / MANIFEST_NAME)
+
+
+def render_charts(jobs: List[ChartJob], workers: int = 1, preview: bool = False,
+                  force: bool = False) -> List[Path]:
+    """
+    Render the figures whose input changed
+
+    Args:
+        jobs: Figures to render
+        workers: Number of worker processes; 1 renders in this process
+        preview: Render at PREVIEW_DPI to <name>_preview.png
+        force: Render even if the PNG is current
+
+    Returns:
+        Paths of the rendered PNGs (skipped figures are not included)
+    """
+    dpi = PREVIEW_DPI if preview else FULL_DPI
+    manifests = {}
+    pending = []
+    for job in jobs:
+        path = output_path(job, preview)
+        path.parent.mkdir(exist_ok=True, parents=True)
+        manifest = manifests.setdefault(path.parent, _load_manifest(path.parent))
+        digest = job_digest(job, dpi)
+        if not force and manifest.get(path.name) == digest and path.exists():
+            print(f"Unchanged: {path.name}")
+            continue
+        pending.append((job, path, digest))
+
+    rendered = []
+
+    def finished(path: Path, digest: str):
+        # Recorded as each figure finishes, so an interrupted run keeps them
+        manifests[path.parent][path.name] = digest
+        _save_manifest(path.parent, manifests[path.parent])
+        rendered.append(path)
+        print(f"Saved: {path.name}")
+
+    # More processes than cores or figures only add startup time
+    workers = min(workers, len(pending), os.cpu_count() or 1)
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers, initializer=use_headless_backend) as executor:
+            futures = {
+                executor.submit(render, job.draw, job.args, path, dpi): (path, digest)
+                for job, path, digest in pending
+            }
+            for future in as_completed(futures):
+                path, digest = futures[future]
+                try:
+                    future.result()
+                except Exception as e:
+                    print(f"Error rendering {path.name}: {e}")
+                    continue
+                finished(path, digest)
+    else:
+        for job, path, digest in pending:
+            # A failing figure does not stop the others, as in the pool
+            try:
+                render(job.draw, job.args, path, dpi)
+            except Exception as e:
+                print(f"Error rendering {path.name}: {e}")
+                continue
+            finished(path, digest)
+    return rendered
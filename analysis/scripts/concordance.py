@@ -0,0 +1,257 @@
+"""
+Keyword-in-Context Concordance
+Master's Thesis: Psychological Manipulation in Marketing Discourse
+
+Writes one KWIC line for every coding scheme keyword occurrence in every
+brand document, for qualitative coding: the keyword as it appears in the
+text, the left and right context within its sentence, and the full
+sentence. Occurrences come from the single-pass lexicon scan and are
+assigned to the document's sentence spans in one merged pass, so the run
+is linear in corpus size. Lines are streamed to a Parquet (with pyarrow)
+or CSV file as they are produced.
+
+Options:
+- sampling: keep at most N lines per brand and category (reservoir
+  sampling, reproducible with a seed)
+- dedup: drop lines whose category, keyword and sentence were already
+  written, e.g. boilerplate repeated on every page of a brand site
+
+Usage:
+    python concordance.py [--groups manipulation emotion_marker]
+                          [--sample 50] [--dedup] [--format parquet|csv]
+"""
+
+import argparse
+import json
+import random
+import re
+from collections import defaultdict
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from corpus_store import SECTORS, load_sector_texts, parse_document
+from keyword_matcher import MATCH_MODES, LexiconIndex, MANIPULATION
+from parallel_analysis import CSVStream, ParquetStream
+from resources import PYARROW_AVAILABLE
+
+# Configuration
+PROJECT_ROOT = Path("D:/Thesis")
+DATA_DIR = PROJECT_ROOT / "docs" / "materials"
+CODING_SCHEME_PATH = PROJECT_ROOT / "analysis" / "coding_scheme.json"
+RESULTS_DIR = PROJECT_ROOT / "analysis" / "results"
+RESULTS_DIR.mkdir(exist_ok=True, parents=True)
+
+# Characters of context kept on each side of the keyword, within the sentence
+CONTEXT_CHARS = 150
+
+WHITESPACE = re.compile(r'\s+')
+
+
+def squash(text: str) -> str:
+    """Text on one line with single spaces"""
+    return WHITESPACE.sub(' ', text).strip()
+
+
+def concordance_lines(text: str, keyword_offsets: Dict[str, List[int]],
+                      categories: Dict[str, List[str]],
+                      sentence_spans: List[Tuple[int, int]],
+                      context_chars: int = CONTEXT_CHARS) -> Iterator[Dict]:
+    """
+    KWIC lines of one document in text order
+
+    Args:
+        text: Original document text
+        keyword_offsets: Sorted start offsets per keyword (LexiconHits.keyword_offsets)
+        categories: Category -> keywords of one lexicon group
+        sentence_spans: Sorted (start, end) offsets of the sentences
+        context_chars: Maximum context characters on each side
+
+    Yields:
+        One line per occurrence and category: 'category', 'keyword',
+        'start', 'sentence_index', 'left', 'match', 'right', 'sentence'
+    """
+    keyword_categories = defaultdict(list)
+    for category, keywords in categories.items():
+        for keyword in keywords:
+            keyword_categories[keyword].append(category)
+
+    occurrences = sorted(
+        (start, keyword)
+        for keyword in keyword_categories
+        for start in keyword_offsets.get(keyword, ())
+    )
+
+    # Occurrences and sentences are both in text order: one merged pass
+    sentence_index = 0
+    for start, keyword in occurrences:
+        while (sentence_index + 1 < len(sentence_spans)
+               and sentence_spans[sentence_index][1] <= start):
+            sentence_index += 1
+        if sentence_spans:
+            sentence_start, sentence_end = sentence_spans[sentence_index]
+        else:
+            sentence_start, sentence_end = 0, len(text)
+        end = start + len(keyword)
+        # Occurrences between sentences (or in a trailing fragment) keep
+        # their context unclipped on the side outside the sentence
+        left_start = max(min(sentence_start, start), start - context_chars)
+        right_end = min(max(sentence_end, end), end + context_chars)
+
+        line = {
+            'keyword': keyword,
+            'start': start,
+            'sentence_index': sentence_index,
+            'left': squash(text[left_start:start]),
+            'match': text[start:end],
+            'right': squash(text[end:right_end]),
+            'sentence': squash(text[sentence_start:sentence_end])
+        }
+        for category in keyword_categories[keyword]:
+            yield {'category': category, **line}
+
+
+class ReservoirSample:
+    """
+    Uniform sample of at most k items of a stream (Algorithm R)
+    """
+
+    def __init__(self, k: int, rng: random.Random):
+        self.k = k
+        self.rng = rng
+        self.seen = 0
+        self.items = []
+
+    def add(self, item):
+        self.seen += 1
+        if len(self.items) < self.k:
+            self.items.append(item)
+        else:
+            index = self.rng.randrange(self.seen)
+            if index < self.k:
+                self.items[index] = item
+
+
+class ConcordanceBuilder:
+    """
+    Concordance lines of every brand, with optional sampling and dedup
+    """
+
+    def __init__(self, coding_scheme: Dict, match_mode: str = 'substring',
+                 groups: Tuple[str, ...] = (MANIPULATION,),
+                 sample_size: Optional[int] = None, dedup: bool = False,
+                 seed: int = 42, context_chars: int = CONTEXT_CHARS):
+        """
+        Args:
+            coding_scheme: Parsed coding_scheme.json
+            match_mode: Keyword matching mode, see keyword_matcher.MATCH_MODES
+            groups: Lexicon groups to extract, e.g. 'manipulation', 'emotion_marker'
+            sample_size: Keep at most this many lines per brand and category
+            dedup: Skip lines whose (group, category, keyword, sentence) was
+                   already written
+            seed: Seed of the sampling random generator
+            context_chars: Maximum context characters on each side
+        """
+        self.lexicon_index = LexiconIndex(coding_scheme, match_mode)
+        unknown = set(groups).difference(self.lexicon_index.lexicons)
+        if unknown:
+            raise ValueError(f"Unknown lexicon groups {sorted(unknown)}, "
+                             f"expected some of {list(self.lexicon_index.lexicons)}")
+        self.groups = groups
+        self.sample_size = sample_size
+        self.dedup = dedup
+        self.rng = random.Random(seed)
+        self.context_chars = context_chars
+        self._seen = set()
+        self.lines_found = 0
+        self.lines_written = 0
+
+    def brand_lines(self, sector: str, brand_name: str, texts) -> Iterator[Dict]:
+        """Concordance lines of one brand, sampled and deduplicated"""
+        document = parse_document(texts, brand_name)
+        tokenized = document.keyword_tokens if self.lexicon_index.match_mode == 'token' else None
+        hits = self.lexicon_index.scan(document.text, document.text_lower, tokenized)
+        spans = document.sentence_spans
+
+        samples = defaultdict(lambda: ReservoirSample(self.sample_size, self.rng))
+        for group in self.groups:
+            for line in concordance_lines(document.text, hits.keyword_offsets,
+                                          hits.lexicons[group], spans, self.context_chars):
+                self.lines_found += 1
+                line = {'sector': sector, 'brand': brand_name, 'group': group, **line}
+                if self.dedup:
+                    key = (group, line['category'], line['keyword'], line['sentence'].lower())
+                    if key in self._seen:
+                        continue
+                    self._seen.add(key)
+                if self.sample_size is None:
+                    yield line
+                else:
+                    samples[(group, line['category'])].add(line)
+
+        # Samples are written in text order
+        sampled = [line for sample in samples.values() for line in sample.items]
+        yield from sorted(sampled, key=lambda line: (line['group'], line['start']))
+
+    def write(self, stream, sectors: List[str] = SECTORS, data_dir: Path = DATA_DIR):
+        """
+        Stream the concordance of every brand of the sectors to a CSVStream
+        or ParquetStream
+        """
+        for sector in sectors:
+            texts = load_sector_texts(sector, data_dir)
+            for brand_name in texts:
+                brand_count = 0
+                for line in self.brand_lines(sector, brand_name, texts):
+                    stream.write(line)
+                    brand_count += 1
+                self.lines_written += brand_count
+                print(f"{sector}/{brand_name}: {brand_count} lines")
+
+
+def main(match_mode: str = 'substring', groups: Tuple[str, ...] = (MANIPULATION,),
+         sample_size: Optional[int] = None, dedup: bool = False, seed: int = 42,
+         output_format: str = 'parquet'):
+    """
+    Write the concordance of the whole materials corpus
+
+    Args:
+        match_mode: Keyword matching mode
+        groups: Lexicon groups to extract
+        sample_size: Optional cap on lines per brand and category
+        dedup: Drop repeated sentences per category and keyword
+        seed: Sampling seed
+        output_format: 'parquet' (requires pyarrow) or 'csv'
+    """
+    with open(CODING_SCHEME_PATH, 'r', encoding='utf-8') as f:
+        coding_scheme = json.load(f)
+    builder = ConcordanceBuilder(coding_scheme, match_mode, groups, sample_size, dedup, seed)
+
+    suffix = '' if match_mode == 'substring' else f'_{match_mode}'
+    output_path = RESULTS_DIR / f'concordance{suffix}.{output_format}'
+    stream_class = ParquetStream if output_format == 'parquet' else CSVStream
+    with stream_class(output_path) as stream:
+        builder.write(stream)
+
+    print(f"\n{builder.lines_written} of {builder.lines_found} concordance lines "
+          f"saved to {output_path}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Keyword-in-context concordance of the corpus")
+    parser.add_argument('--match-mode', choices=MATCH_MODES, default='substring',
+                        help="Keyword matching: raw substrings or whole tokens")
+    parser.add_argument('--groups', nargs='+', default=[MANIPULATION],
+                        help="Lexicon groups to extract (manipulation, emotion_marker, "
+                             "emotion_intensity, sector_marker, modifier)")
+    parser.add_argument('--sample', type=int, default=None,
+                        help="Keep at most N lines per brand and category")
+    parser.add_argument('--dedup', action='store_true',
+                        help="Drop lines repeating a sentence for the same keyword")
+    parser.add_argument('--seed', type=int, default=42, help="Sampling seed")
+    parser.add_argument('--format', choices=['parquet', 'csv'],
+                        default='parquet' if PYARROW_AVAILABLE else 'csv',
+                        help="Output format (Parquet requires pyarrow)")
+    args = parser.parse_args()
+    if args.format == 'parquet' and not PYARROW_AVAILABLE:
+        parser.error("Parquet output requires pyarrow (pip install pyarrow)")
+    main(args.match_mode, tuple(args.groups), args.sample, args.dedup, args.seed, args.format)
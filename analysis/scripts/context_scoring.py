@@ -0,0 +1,176 @@
+"""
+Context-Aware Keyword Scoring
+Master's Thesis: Psychological Manipulation in Marketing Discourse
+
+Applies the coding scheme's analysis guidelines to keyword hits: a hit
+preceded by a negation ("not limited") is flipped into counter-evidence, an
+intensity modifier ("absolutely urgent") boosts it, and a hedging marker
+("may help") damps it. Only a bounded window of tokens before each hit, up
+to the nearest clause punctuation, is considered.
+
+Scoring is split in two: keyword_windows() collects the preceding tokens of
+every hit in one linear pass over the document's token stream (coding
+scheme independent, stored with the document index), and ContextScorer
+turns the windows into a context factor per category with the scheme's
+current modifiers, by which the category's keyword count is scaled.
+Re-scoring after a scheme edit only tokenizes a document again when a
+newly added keyword occurs in it, to collect the windows of those hits.
+
+A negation cue directly followed by a quantifying word ("not only limited",
+"no more than 3 left", "nothing but the best") restricts or adds to the
+claim rather than denying it and is not counted as a negation.
+"""
+
+from typing import Dict, List, Tuple
+
+from keyword_matcher import LexiconHits, MANIPULATION, keyword_term
+
+# Tokens before a hit that are checked for negations and modifiers
+WINDOW = 3
+
+# Tokens that end a clause; modifiers never reach across them
+CLAUSE_BOUNDARIES = frozenset('.,;:!?()[]')
+
+# Negation cues (the coding scheme only switches negation handling on or off)
+NEGATION_CUES = frozenset([
+    'not', 'no', 'never', 'none', 'nothing', 'neither', 'nor', 'without',
+    'hardly', 'barely', 'cannot', 'nobody', 'nowhere'
+])
+
+# Words after a negation cue that make it a quantifier, not a denial
+NON_NEGATING_FOLLOWERS = frozenset(['only', 'just', 'merely', 'simply', 'more', 'less', 'but'])
+
+# Factors applied to a hit per negation, intensity modifier and hedge
+NEGATION_FACTOR = -1.0
+INTENSIFIER_FACTOR = 1.5
+HEDGE_FACTOR = 0.5
+
+
+def keyword_windows(tokens: List[str], starts: List[int],
+                    keyword_offsets: Dict[str, List[int]],
+                    window: int = WINDOW) -> Dict[str, List[Tuple[str, ...]]]:
+    """
+    Tokens preceding every keyword occurrence, within the same clause
+
+    Args:
+        tokens: Tokens of the lowercased document (keyword_matcher.tokenize)
+        starts: Character start offset of each token
+        keyword_offsets: Sorted start offsets per keyword
+        window: Maximum number of preceding tokens
+
+    Returns:
+        Dictionary mapping each keyword to one window per occurrence, in the
+        order of keyword_offsets
+    """
+    occurrences = sorted(
+        (offset, keyword, index)
+        for keyword, offsets in keyword_offsets.items()
+        for index, offset in enumerate(offsets)
+    )
+    windows = {keyword: [None] * len(offsets) for keyword, offsets in keyword_offsets.items()}
+
+    # Occurrences and tokens are both in text order: one merged pass
+    position = 0
+    clause_start = 0
+    for offset, keyword, index in occurrences:
+        # Token containing the occurrence (substring hits may start mid-token)
+        while position + 1 < len(starts) and starts[position + 1] <= offset:
+            position += 1
+            if tokens[position - 1] in CLAUSE_BOUNDARIES:
+                clause_start = position
+        first = max(clause_start, position - window)
+        windows[keyword][index] = tuple(tokens[first:position])
+    return windows
+
+
+class ContextScorer:
+    """
+    Context factors for keyword counts from the coding scheme's guidelines
+    """
+
+    def __init__(self, coding_scheme: Dict):
+        """
+        Args:
+            coding_scheme: Parsed coding_scheme.json; negation handling,
+                           intensity modifiers and hedging markers are read
+                           from its analysis_guidelines
+        """
+        guidelines = coding_scheme.get('analysis_guidelines', {})
+        self.negation_handling = guidelines.get('negation_handling', False)
+        # Modifiers are single words, normalized like the token stream
+        self.intensifiers = frozenset(
+            keyword_term(modifier) for modifier in guidelines.get('intensity_modifiers', [])
+        )
+        self.hedges = frozenset(
+            keyword_term(marker) for marker in guidelines.get('hedging_markers', [])
+        )
+
+    def is_negation(self, token: str, following: str = '') -> bool:
+        """True if token negates, given the token after it"""
+        if following in NON_NEGATING_FOLLOWERS:
+            return False
+        return token in NEGATION_CUES or token.endswith("n't")
+
+    def factor(self, window: Tuple[str, ...], keyword: str = '') -> Tuple[float, bool, bool, bool]:
+        """
+        Weight of one keyword occurrence given its preceding tokens
+
+        Args:
+            window: Tokens before the occurrence (keyword_windows)
+            keyword: The keyword, whose first word follows the window
+
+        Returns:
+            Tuple of (factor, negated, intensified, hedged)
+        """
+        factor = 1.0
+        negated = intensified = hedged = False
+        # Each token with the one after it (the keyword's first word last)
+        following_tokens = window[1:] + (tuple(keyword.split()[:1]) or ('',))
+        for token, following in zip(window, following_tokens):
+            if self.negation_handling and self.is_negation(token, following):
+                factor *= NEGATION_FACTOR
+                negated = True
+            elif token in self.intensifiers:
+                factor *= INTENSIFIER_FACTOR
+                intensified = True
+            elif token in self.hedges:
+                factor *= HEDGE_FACTOR
+                hedged = True
+        return factor, negated, intensified, hedged
+
+    def score(self, hits: LexiconHits, windows: Dict[str, List[Tuple[str, ...]]],
+              group: str = MANIPULATION) -> Dict[str, Dict[str, float]]:
+        """
+        Context factors per category of a lexicon group
+
+        Args:
+            hits: Lexicon hits of the document
+            windows: keyword_windows() of the same occurrences
+            group: Lexicon group to score
+
+        Returns:
+            Dictionary mapping each category to its 'context_factor' (mean
+            occurrence factor, 1.0 without occurrences; multiply a count by
+            it) and the number of 'negated', 'intensified' and 'hedged'
+            occurrences
+        """
+        results = {}
+        for category, keywords in hits.lexicons[group].items():
+            total = 0.0
+            occurrences = negated = intensified = hedged = 0
+            for keyword in keywords:
+                for window in windows.get(keyword, ()):
+                    factor, is_negated, is_intensified, is_hedged = self.factor(window, keyword)
+                    total += factor
+                    occurrences += 1
+                    negated += is_negated
+                    intensified += is_intensified
+                    hedged += is_hedged
+            results[category] = {
+                # Negated claims cancel affirmative ones but never go below zero
+                'context_factor': max(total, 0.0) / occurrences if occurrences else 1.0,
+                'negated': negated,
+                'intensified': intensified,
+                'hedged': hedged
+            }
+        return results
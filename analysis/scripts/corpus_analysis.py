@@ -5,6 +5,8 @@ Author: [Your Name]
 Date: January 2025
 """
 
+import argparse
+import copy
 import os
 import pandas as pd
 import numpy as np
@@ -12,33 +14,44 @@ from pathlib import Path
 import nltk
 # import spacy  # Optional - commented out for now
 from collections import Counter, defaultdict
+from contextlib import ExitStack
 from textblob import TextBlob
+from chart_rendering import ChartJob, render_charts, use_headless_backend
+use_headless_backend()
 import matplotlib.pyplot as plt
 import seaborn as sns
 from wordcloud import WordCloud
 import re
-from typing import List, Dict, Tuple
+from typing import List, Dict, Tuple, Optional, Union
 import json
 
+from corpus_store import load_sector_texts, parse_document
+from embedding_store import open_embedding_store
+from keyword_matcher import LexiconIndex, LexiconHits, MANIPULATION
+from parallel_analysis import CSVStream, ordered_rows, run_incremental_jobs
+from parsed_document import ParsedDocument, StageTimings
+from pos_taggers import TAGGER_BACKENDS, get_pos_tagger
+from resources import (
+    SENTENCE_MODEL, SPACY_AVAILABLE, TRANSFORMERS_AVAILABLE, ensure_sentence_tokenizer,
+    get_sentence_model, get_sentence_splitter, get_stopwords, get_vader_scorer
+)
+from result_cache import DEFAULT_MAX_BYTES, ResultCache, fingerprint
+from semantic_detector import SemanticDetector
+
 # Configuration
 PROJECT_ROOT = Path("D:/Thesis")
 DATA_DIR = PROJECT_ROOT / "docs" / "materials"
+CODING_SCHEME_PATH = PROJECT_ROOT / "analysis" / "coding_scheme.json"
 RESULTS_DIR = PROJECT_ROOT / "analysis" / "results"
 RESULTS_DIR.mkdir(exist_ok=True)
+CACHE_DIR = PROJECT_ROOT / "analysis" / "cache" / "corpus_analysis"
+
+# Bump when index_document or score_document output changes to invalidate caches
+ANALYZER_VERSION = 2
 
 # Initialize spaCy model (download with: python -m spacy download en_core_web_lg)
 # nlp = spacy.load("en_core_web_lg")  # Commented out - spacy optional
 
-# Download required NLTK data
-nltk.download('punkt', quiet=True)
-nltk.download('stopwords', quiet=True)
-nltk.download('vader_lexicon', quiet=True)
-nltk.download('averaged_perceptron_tagger', quiet=True)
-
-from nltk.corpus import stopwords
-from nltk.sentiment.vader import SentimentIntensityAnalyzer
-from nltk.tokenize import word_tokenize, sent_tokenize
-
 # Set style for visualizations
 sns.set_style("whitegrid")
 plt.rcParams['figure.figsize'] = (12, 8)
@@ -48,100 +61,167 @@ class MarketingDiscourseAnalyzer:
     Analyzer for marketing discourse focusing on psychological manipulation strategies
     """
     
-    def __init__(self, sector: str):
+    def __init__(self, sector: str, pos_backend: str = 'nltk', use_semantic: bool = False):
         """
         Initialize analyzer for specific sector
         
         Args:
             sector: One of 'Fashion', 'Fitness', 'Skincare_Cosmetics'
+            pos_backend: POS tagger for the linguistic features, one of
+                         'nltk', 'spacy' or 'lexicon' (approximate, fast)
+            use_semantic: Score sentences against the coding scheme's
+                          prototype sentences with the sentence embedding
+                          model (requires sentence-transformers)
         """
+        if pos_backend not in TAGGER_BACKENDS:
+            raise ValueError(f"Unknown POS tagger backend {pos_backend!r}, expected one of {TAGGER_BACKENDS}")
         self.sector = sector
         self.data_path = DATA_DIR / sector
         self.texts = {}
-        self.stop_words = set(stopwords.words('english'))
-        self.sia = SentimentIntensityAnalyzer()
-        
-        # Manipulation indicators (can be expanded based on literature)
-        self.manipulation_lexicon = {
-            'urgency': ['now', 'today', 'limited', 'hurry', 'quick', 'fast', 'immediately', 
-                       'last chance', 'ending soon', 'don\'t miss'],
-            'scarcity': ['exclusive', 'limited edition', 'rare', 'unique', 'only', 'few left',
-                        'selling out', 'almost gone'],
-            'authority': ['expert', 'proven', 'scientific', 'clinical', 'dermatologist',
-                         'recommended', 'certified', 'award-winning'],
-            'social_proof': ['bestseller', 'popular', 'trending', 'everyone', 'thousands',
-                           'loved by', 'favorite', 'must-have'],
-            'emotion_fear': ['worried', 'concerned', 'damage', 'protect', 'prevent', 'risk',
-                            'danger', 'harmful', 'threat'],
-            'emotion_aspiration': ['dream', 'perfect', 'ideal', 'transform', 'achieve',
-                                 'success', 'luxury', 'elite', 'prestige'],
-            'inadequacy': ['problem', 'issue', 'concern', 'flaw', 'imperfection', 'aging',
-                          'wrinkles', 'tired', 'dull']
-        }
+        self.pos_backend = pos_backend
+        # Fails here (not as zero counts per brand) when the backend's
+        # package, model or data is missing
+        get_pos_tagger(pos_backend)
+        # NLTK data is checked locally and downloaded only if missing
+        ensure_sentence_tokenizer()
+        self.stop_words = get_stopwords()
+        # VADER-compatible, vectorized over the tokens of a text
+        self.sia = get_vader_scorer()
+        
+        # Manipulation indicators from the shared coding scheme
+        with open(CODING_SCHEME_PATH, 'r', encoding='utf-8') as f:
+            self.coding_scheme = json.load(f)
+        self.coding_scheme_hash = fingerprint(json.dumps(self.coding_scheme, sort_keys=True))
+        self.lexicon_index = LexiconIndex(self.coding_scheme)
+        
+        # Sentence embeddings are shared with the emotion analyzer's store
+        self.use_semantic = use_semantic and TRANSFORMERS_AVAILABLE
+        if use_semantic and not TRANSFORMERS_AVAILABLE:
+            print("Sentence-transformers not available. Skipping semantic detection.")
+        self._semantic_detector = None
+        
+    def for_sector(self, sector: str) -> 'MarketingDiscourseAnalyzer':
+        """
+        Analyzer for another sector that shares this analyzer's loaded
+        resources (stopwords, sentiment analyzer, lexicon index)
+        """
+        analyzer = copy.copy(self)
+        analyzer.sector = sector
+        analyzer.data_path = DATA_DIR / sector
+        analyzer.texts = {}
+        return analyzer
+    
+    @property
+    def pos_tagger(self):
+        """POS tagger backend, loaded once per process on first use"""
+        return get_pos_tagger(self.pos_backend)
+    
+    @property
+    def semantic_detector(self) -> SemanticDetector:
+        """Prototype-based semantic detector, built on first use"""
+        if self._semantic_detector is None:
+            self._semantic_detector = SemanticDetector(
+                self.coding_scheme, get_sentence_model,
+                open_embedding_store(SENTENCE_MODEL)
+            )
+        return self._semantic_detector
+    
+    def cache_key(self, brand_name: str) -> str:
+        """
+        Result cache key of a brand: its text, the coding scheme and the
+        analyzer version
+        """
+        return fingerprint(
+            self.texts[brand_name], self.coding_scheme_hash, ANALYZER_VERSION, self.sector,
+            self.pos_backend, SENTENCE_MODEL if self.use_semantic else None
+        )
+    
+    def document_key(self, brand_name: str) -> str:
+        """
+        Document cache key of a brand: its text and the analyzer version,
+        so document records survive coding scheme edits
+        """
+        return fingerprint(
+            self.texts[brand_name], ANALYZER_VERSION, self.lexicon_index.match_mode,
+            self.pos_backend
+        )
+        
+    def load_texts(self, deduplicate: bool = False):
+        """
+        Load all texts of the sector from the memory-mapped corpus store
         
-    def load_texts(self):
-        """Load all text files from the sector directory"""
-        for file_path in self.data_path.glob("*.txt"):
-            brand_name = file_path.stem
-            with open(file_path, 'r', encoding='utf-8') as f:
-                self.texts[brand_name] = f.read()
+        Args:
+            deduplicate: Load the texts with repeated boilerplate lines removed
+        """
+        self.texts = load_sector_texts(self.sector, DATA_DIR, deduplicate)
         print(f"Loaded {len(self.texts)} brands from {self.sector} sector")
         
-    def preprocess_text(self, text: str) -> List[str]:
-        """Basic text preprocessing"""
-        # Convert to lowercase
-        text = text.lower()
-        # Remove special characters but keep spaces
-        text = re.sub(r'[^a-zA-Z0-9\s]', '', text)
-        # Tokenize
-        tokens = word_tokenize(text)
+    def preprocess_text(self, document: Union[str, ParsedDocument]) -> List[str]:
+        """Basic text preprocessing on the shared word tokens"""
+        if isinstance(document, str):
+            document = ParsedDocument(document)
+        # Lowercase and remove special characters
+        tokens = (re.sub(r'[^a-z0-9]', '', word.lower()) for word in document.words)
         # Remove stopwords
-        tokens = [token for token in tokens if token not in self.stop_words and len(token) > 2]
-        return tokens
+        return [token for token in tokens if token not in self.stop_words and len(token) > 2]
     
-    def analyze_manipulation_strategies(self, text: str) -> Dict[str, int]:
+    def analyze_manipulation_strategies(self, text: str,
+                                        hits: Optional[LexiconHits] = None) -> Dict[str, int]:
         """
         Identify manipulation strategies in text
         
+        Args:
+            text: Document text
+            hits: Lexicon hits of the text, scanned here if not given
+        
         Returns:
             Dictionary with counts of each manipulation strategy
         """
-        text_lower = text.lower()
-        strategy_counts = {}
-        
-        for strategy, keywords in self.manipulation_lexicon.items():
-            count = sum(1 for keyword in keywords if keyword in text_lower)
-            strategy_counts[strategy] = count
-            
-        return strategy_counts
+        if hits is None:
+            hits = self.lexicon_index.scan(text)
+        return hits.presence(MANIPULATION)
     
-    def sentiment_analysis(self, text: str) -> Dict[str, float]:
+    def sentiment_analysis(self, document: Union[str, ParsedDocument]) -> Dict[str, float]:
         """
         Perform sentiment analysis on text
         
+        Args:
+            document: Text or parsed document (which records stage timings)
+        
         Returns:
             Dictionary with sentiment scores
         """
+        if isinstance(document, str):
+            document = ParsedDocument(document)
+        
         # Using VADER sentiment analyzer
-        scores = self.sia.polarity_scores(text)
+        with document.timed('vader'):
+            scores = self.sia.polarity_scores(document.text)
         
         # Using TextBlob for additional perspective
-        blob = TextBlob(text)
-        scores['textblob_polarity'] = blob.sentiment.polarity
-        scores['textblob_subjectivity'] = blob.sentiment.subjectivity
+        with document.timed('textblob'):
+            sentiment = TextBlob(document.text).sentiment
+        scores['textblob_polarity'] = sentiment.polarity
+        scores['textblob_subjectivity'] = sentiment.subjectivity
         
         return scores
     
-    def extract_linguistic_features(self, text: str) -> Dict[str, any]:
+    def extract_linguistic_features(self, document: Union[str, ParsedDocument]) -> Dict[str, any]:
         """
         Extract various linguistic features from text
+        
+        Args:
+            document: Text or parsed document whose tokens are reused
         """
+        if isinstance(document, str):
+            document = ParsedDocument(document)
+        text = document.text
         features = {}
         
         try:
             # Basic statistics
-            sentences = sent_tokenize(text)
-            words = word_tokenize(text)
+            sentences = document.sentence_spans
+            words = document.words
         except:
             # Fallback if tokenization fails
             sentences = text.split('. ')
@@ -152,11 +232,7 @@ class MarketingDiscourseAnalyzer:
         features['avg_sentence_length'] = len(words) / len(sentences) if sentences else 0
         
         # POS tagging for linguistic complexity
-        try:
-            pos_tags = nltk.pos_tag(words)
-            pos_counts = Counter(tag for word, tag in pos_tags)
-        except:
-            pos_counts = Counter()  # Empty counter if POS tagging fails
+        pos_counts = Counter(document.pos_tags(self.pos_tagger))
         
         features['adjective_count'] = pos_counts.get('JJ', 0) + pos_counts.get('JJR', 0) + pos_counts.get('JJS', 0)
         features['adverb_count'] = pos_counts.get('RB', 0) + pos_counts.get('RBR', 0) + pos_counts.get('RBS', 0)
@@ -172,98 +248,184 @@ class MarketingDiscourseAnalyzer:
         
         return features
     
-    def analyze_brand(self, brand_name: str) -> Dict:
+    def index_document(self, brand_name: str) -> Dict:
         """
-        Comprehensive analysis of a single brand's marketing discourse
+        Coding-scheme-independent part of a brand analysis: sentiment,
+        linguistic features and the keyword occurrence index of the text
         """
         if brand_name not in self.texts:
             raise ValueError(f"Brand {brand_name} not found in loaded texts")
             
+        # Tokenized once; every component below reuses the same parse
+        document = parse_document(self.texts, brand_name)
+        sentiment = self.sentiment_analysis(document)
+        linguistic_features = self.extract_linguistic_features(document)
+        with document.timed('keywords'):
+            keyword_offsets = self.lexicon_index.scan(
+                document.text, document.text_lower
+            ).keyword_offsets
+        
+        return {
+            'brand': brand_name,
+            'sentiment': sentiment,
+            'linguistic_features': linguistic_features,
+            'keyword_offsets': keyword_offsets,
+            'scanned_keywords': list(self.lexicon_index.keywords),
+            # Sentence boundaries for semantic detection at scoring time
+            'sentence_spans': document.sentence_spans,
+            'timings': document.timings
+        }
+    
+    def update_document(self, brand_name: str, document: Dict) -> bool:
+        """
+        Scan a stored document record for keywords added to the coding
+        scheme since it was indexed
+        
+        Returns:
+            True if the record changed
+        """
+        changed = False
+        offsets = self.lexicon_index.update_offsets(
+            self.texts[brand_name], document['keyword_offsets'], document['scanned_keywords']
+        )
+        if offsets is not document['keyword_offsets']:
+            document['keyword_offsets'] = offsets
+            document['scanned_keywords'] = sorted(
+                set(document['scanned_keywords']).union(self.lexicon_index.keywords)
+            )
+            changed = True
+        
+        if self.use_semantic and 'sentence_spans' not in document:
+            document['sentence_spans'] = list(
+                get_sentence_splitter().span_tokenize(self.texts[brand_name])
+            )
+            changed = True
+        return changed
+    
+    def score_document(self, brand_name: str, document: Dict) -> Dict:
+        """
+        Apply the coding scheme to a document record
+        """
         text = self.texts[brand_name]
+        hits = self.lexicon_index.hits(document['keyword_offsets'])
         
         analysis = {
             'brand': brand_name,
             'sector': self.sector,
-            'manipulation_strategies': self.analyze_manipulation_strategies(text),
-            'sentiment': self.sentiment_analysis(text),
-            'linguistic_features': self.extract_linguistic_features(text)
+            'manipulation_strategies': self.analyze_manipulation_strategies(text, hits),
+            'sentiment': document['sentiment'],
+            'linguistic_features': document['linguistic_features'],
+            # Embeddings were stored by embed_sentences() before scoring
+            'semantic_manipulation': self.semantic_detector.detect(
+                [text[start:end] for start, end in document['sentence_spans']]
+            ) if self.use_semantic else {}
         }
         
         return analysis
     
-    def analyze_all_brands(self) -> pd.DataFrame:
+    def analyze_brand(self, brand_name: str) -> Dict:
         """
-        Analyze all brands in the sector and return results as DataFrame
+        Comprehensive analysis of a single brand's marketing discourse
         """
-        results = []
-        
-        for brand_name in self.texts:
-            try:
-                analysis = self.analyze_brand(brand_name)
-                # Flatten the nested dictionaries for DataFrame
-                flat_result = {'brand': brand_name, 'sector': self.sector}
-                
-                # Add manipulation strategies
-                for strategy, count in analysis['manipulation_strategies'].items():
-                    flat_result[f'manipulation_{strategy}'] = count
-                
-                # Add sentiment scores
-                for metric, score in analysis['sentiment'].items():
-                    flat_result[f'sentiment_{metric}'] = score
-                
-                # Add linguistic features
-                for feature, value in analysis['linguistic_features'].items():
-                    flat_result[f'linguistic_{feature}'] = value
-                
-                results.append(flat_result)
-                
-            except Exception as e:
-                print(f"Error analyzing {brand_name}: {e}")
-                
-        return pd.DataFrame(results)
-    
-    def visualize_manipulation_strategies(self, df: pd.DataFrame):
+        return self.score_document(brand_name, self.index_document(brand_name))
+    
+    def flatten_analysis(self, analysis: Dict) -> Dict:
         """
-        Create visualizations for manipulation strategies
+        Flatten the nested dictionaries of a brand analysis for DataFrame
         """
-        # Check if DataFrame is empty
-        if df.empty:
-            print(f"No data to visualize for {self.sector}")
-            return
-            
-        # Get manipulation columns
-        manipulation_cols = [col for col in df.columns if col.startswith('manipulation_')]
+        flat_result = {'brand': analysis['brand'], 'sector': self.sector}
         
-        if not manipulation_cols:
-            print(f"No manipulation columns found for {self.sector}")
-            return
+        # Add manipulation strategies
+        for strategy, count in analysis['manipulation_strategies'].items():
+            flat_result[f'manipulation_{strategy}'] = count
         
-        # Calculate average use of each strategy
-        strategy_means = df[manipulation_cols].mean().sort_values(ascending=False)
-        strategy_means.index = [col.replace('manipulation_', '') for col in strategy_means.index]
+        # Add sentiment scores
+        for metric, score in analysis['sentiment'].items():
+            flat_result[f'sentiment_{metric}'] = score
         
-        # Create bar plot
-        fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(15, 6))
+        # Add linguistic features
+        for feature, value in analysis['linguistic_features'].items():
+            flat_result[f'linguistic_{feature}'] = value
         
-        # Average strategy use
-        strategy_means.plot(kind='bar', ax=ax1, color='steelblue')
-        ax1.set_title(f'Average Manipulation Strategy Use - {self.sector}')
-        ax1.set_xlabel('Strategy')
-        ax1.set_ylabel('Average Count')
-        ax1.tick_params(axis='x', rotation=45)
+        # Add semantic (prototype similarity) detection when enabled
+        for strategy, details in analysis.get('semantic_manipulation', {}).items():
+            flat_result[f'semantic_{strategy}'] = details['sentences']
+            flat_result[f'semantic_{strategy}_share'] = details['share']
         
-        # Heatmap of strategies by brand
-        pivot_data = df.set_index('brand')[manipulation_cols]
-        pivot_data.columns = [col.replace('manipulation_', '') for col in pivot_data.columns]
+        return flat_result
+    
+    def embed_sentences(self, analyzers: Dict[str, 'MarketingDiscourseAnalyzer']):
+        """
+        Embed the sentences of every loaded brand of the analyzers in one
+        batch before scoring, so semantic detection only reads the store
         
-        sns.heatmap(pivot_data.T, annot=True, fmt='.0f', cmap='YlOrRd', ax=ax2)
-        ax2.set_title(f'Manipulation Strategies by Brand - {self.sector}')
-        ax2.set_xlabel('Brand')
-        ax2.set_ylabel('Strategy')
+        Args:
+            analyzers: Dictionary mapping sector to an analyzer with loaded texts
+        """
+        if not self.use_semantic:
+            return
+        documents = [
+            parse_document(analyzer.texts, brand_name).sentences
+            for analyzer in analyzers.values()
+            for brand_name in analyzer.texts
+        ]
+        print(f"Embedding sentences of {len(documents)} brands...")
+        self.semantic_detector.prefetch(documents)
+    
+    def analyze_all_brands(self, workers: int = 1,
+                           cache: Optional[ResultCache] = None,
+                           document_cache: Optional[ResultCache] = None) -> pd.DataFrame:
+        """
+        Analyze all brands in the sector and return results as DataFrame
         
-        plt.tight_layout()
-        plt.savefig(RESULTS_DIR / f'{self.sector}_manipulation_strategies.png', dpi=300, bbox_inches='tight')
-        plt.show()
+        Args:
+            workers: Number of worker processes; 1 analyzes in this process
+            cache: Optional cache of complete results; only brands whose
+                   inputs changed are analyzed again
+            document_cache: Optional cache of document records; after a
+                            coding scheme edit brands are only re-scored
+        """
+        analyses = {}
+        stage_timings = StageTimings()
+        for _, brand_name, analysis, error in run_incremental_jobs(
+                {self.sector: self}, (self.sector, self.pos_backend), workers, cache, document_cache,
+                stage_timings=stage_timings, prefetch=self.embed_sentences):
+            if error is not None:
+                print(f"Error analyzing {brand_name}: {error}")
+            else:
+                analyses[brand_name] = analysis
+        if stage_timings.documents:
+            print(stage_timings.report())
+        
+        return pd.DataFrame([
+            self.flatten_analysis(analyses[brand_name])
+            for brand_name in self.texts if brand_name in analyses
+        ])
+    
+    def strategies_job(self, df: pd.DataFrame) -> Optional[ChartJob]:
+        """
+        Chart job of the sector's strategy figure, None if there is nothing
+        to plot
+        """
+        # Check if DataFrame is empty
+        if df.empty:
+            print(f"No data to visualize for {self.sector}")
+            return None
+        
+        if not any(col.startswith('manipulation_') for col in df.columns):
+            print(f"No manipulation columns found for {self.sector}")
+            return None
+        
+        return ChartJob(RESULTS_DIR / f'{self.sector}_manipulation_strategies.png',
+                        draw_manipulation_strategies, (df, self.sector))
+    
+    def visualize_manipulation_strategies(self, df: pd.DataFrame, preview: bool = False):
+        """
+        Create visualizations for manipulation strategies
+        """
+        job = self.strategies_job(df)
+        if job is not None:
+            render_charts([job], preview=preview)
         
     def generate_report(self, df: pd.DataFrame):
         """
@@ -285,7 +447,7 @@ class MarketingDiscourseAnalyzer:
         for col in manipulation_cols:
             strategy = col.replace('manipulation_', '')
             avg = df[col].mean()
-            report += f"- {strategy.title()}: {avg:.2f}\n"
+            report += f"- {strategy.replace('_', ' ').title()}: {avg:.2f}\n"
         
         report += f"""
 ### Sentiment Analysis (Average Scores)
@@ -310,40 +472,136 @@ class MarketingDiscourseAnalyzer:
         return report
 
 
-def main():
+def draw_manipulation_strategies(df: pd.DataFrame, sector: str):
+    """
+    Average strategy use and strategies by brand of one sector
+    
+    Args:
+        df: Flat results of the sector (flatten_analysis rows)
+        sector: Sector name for the titles
+    """
+    # Get manipulation columns
+    manipulation_cols = [col for col in df.columns if col.startswith('manipulation_')]
+    
+    # Calculate average use of each strategy
+    strategy_means = df[manipulation_cols].mean().sort_values(ascending=False)
+    strategy_means.index = [col.replace('manipulation_', '') for col in strategy_means.index]
+    
+    # Create bar plot
+    fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(15, 6))
+    
+    # Average strategy use
+    strategy_means.plot(kind='bar', ax=ax1, color='steelblue')
+    ax1.set_title(f'Average Manipulation Strategy Use - {sector}')
+    ax1.set_xlabel('Strategy')
+    ax1.set_ylabel('Average Count')
+    ax1.tick_params(axis='x', rotation=45)
+    
+    # Heatmap of strategies by brand
+    pivot_data = df.set_index('brand')[manipulation_cols]
+    pivot_data.columns = [col.replace('manipulation_', '') for col in pivot_data.columns]
+    
+    sns.heatmap(pivot_data.T, annot=True, fmt='.0f', cmap='YlOrRd', ax=ax2)
+    ax2.set_title(f'Manipulation Strategies by Brand - {sector}')
+    ax2.set_xlabel('Brand')
+    ax2.set_ylabel('Strategy')
+    
+    plt.tight_layout()
+    return fig
+
+
+def main(workers: int = 1, use_cache: bool = True,
+         cache_max_bytes: int = DEFAULT_MAX_BYTES, pos_backend: str = 'nltk',
+         use_semantic: bool = False, preview: bool = False):
     """
     Main analysis pipeline
+    
+    Args:
+        workers: Number of worker processes shared by all sectors
+        use_cache: Reuse cached results and document records; after a
+                   coding scheme edit brands are only re-scored
+        cache_max_bytes: Size limit of each cache directory
+        pos_backend: POS tagger backend for the linguistic features
+        use_semantic: Add embedding-based detection against the coding
+                      scheme's prototype sentences
+        preview: Render the figures at low resolution to *_preview.png
     """
     sectors = ['Fashion', 'Fitness', 'Skincare_Cosmetics']
     all_results = []
+    chart_jobs = []
     
+    # Load shared resources once; per-sector analyzers reuse them
+    base_analyzer = MarketingDiscourseAnalyzer(sectors[0], pos_backend, use_semantic)
+    analyzers = {}
     for sector in sectors:
-        print(f"\n{'='*50}")
-        print(f"Analyzing {sector} Sector")
-        print('='*50)
-        
-        analyzer = MarketingDiscourseAnalyzer(sector)
+        analyzer = base_analyzer.for_sector(sector)
         
         # Check if data exists
         if not analyzer.data_path.exists():
             print(f"Warning: Data directory {analyzer.data_path} does not exist")
             continue
             
-        # Load and analyze
         analyzer.load_texts()
-        
         if analyzer.texts:
-            df = analyzer.analyze_all_brands()
-            all_results.append(df)
-            
-            # Save sector results
-            df.to_csv(RESULTS_DIR / f'{sector}_analysis_results.csv', index=False)
-            
-            # Generate visualizations
-            analyzer.visualize_manipulation_strategies(df)
-            
-            # Generate report
-            analyzer.generate_report(df)
+            analyzers[sector] = analyzer
+    
+    # Only work invalidated since the last run is redone
+    cache = document_cache = None
+    if use_cache:
+        cache = ResultCache(CACHE_DIR, cache_max_bytes)
+        document_cache = ResultCache(CACHE_DIR / "documents", cache_max_bytes)
+    
+    # Analyze every (sector, brand) pair in one pool, streaming rows to disk
+    print(f"\n{'='*50}")
+    print(f"Analyzing {sum(len(a.texts) for a in analyzers.values())} brands "
+          f"across {len(analyzers)} sectors")
+    print('='*50)
+    
+    sector_rows = {sector: {} for sector in analyzers}
+    stage_timings = StageTimings()
+    with ExitStack() as stack:
+        sector_streams = {
+            sector: stack.enter_context(CSVStream(RESULTS_DIR / f'{sector}_analysis_results.csv'))
+            for sector in analyzers
+        }
+        combined_stream = stack.enter_context(CSVStream(RESULTS_DIR / 'all_sectors_combined.csv'))
+        
+        for sector, brand_name, analysis, error in run_incremental_jobs(
+                analyzers, (sectors[0], pos_backend), workers, cache, document_cache,
+                stage_timings=stage_timings, prefetch=base_analyzer.embed_sentences):
+            if error is not None:
+                print(f"Error analyzing {sector}/{brand_name}: {error}")
+                continue
+            row = analyzers[sector].flatten_analysis(analysis)
+            sector_rows[sector][brand_name] = row
+            sector_streams[sector].write(row)
+            combined_stream.write(row)
+            print(f"Finished {sector}/{brand_name}")
+    
+    if use_cache:
+        print(cache.summary())
+        print(document_cache.summary())
+    if stage_timings.documents:
+        print("\nTime per analysis stage (indexed documents):")
+        print(stage_timings.report())
+    
+    for sector, analyzer in analyzers.items():
+        # Rewrite the streamed results in brand load order
+        df = pd.DataFrame(ordered_rows(sector_rows[sector], list(analyzer.texts)))
+        if df.empty:
+            continue
+        all_results.append(df)
+        
+        # Save sector results
+        df.to_csv(RESULTS_DIR / f'{sector}_analysis_results.csv', index=False)
+        
+        # Visualizations are rendered together at the end
+        job = analyzer.strategies_job(df)
+        if job is not None:
+            chart_jobs.append(job)
+        
+        # Generate report
+        analyzer.generate_report(df)
     
     # Combine all sectors for cross-sector analysis
     if all_results:
@@ -352,7 +610,27 @@ def main():
         print(f"\n{'='*50}")
         print("Cross-sector analysis data saved")
         print(f"Total brands analyzed: {len(combined_df)}")
-        
+    
+    # Independent figures render in parallel; unchanged ones are skipped
+    render_charts(chart_jobs, workers, preview)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Marketing discourse corpus analysis")
+    parser.add_argument('--workers', type=int, default=1,
+                        help="Number of worker processes for brand analysis")
+    parser.add_argument('--no-cache', action='store_true',
+                        help="Analyze every brand again instead of reusing cached results")
+    parser.add_argument('--cache-size-mb', type=int, default=DEFAULT_MAX_BYTES // (1024 * 1024),
+                        help="Size limit of the result cache")
+    parser.add_argument('--pos-backend', choices=TAGGER_BACKENDS, default='nltk',
+                        help="POS tagger: NLTK perceptron, batched spaCy, or fast lexicon lookup")
+    parser.add_argument('--semantic', action='store_true',
+                        help="Embedding-based detection of paraphrased manipulation "
+                             "(requires sentence-transformers)")
+    parser.add_argument('--preview', action='store_true',
+                        help="Render low-resolution *_preview.png figures")
+    args = parser.parse_args()
+    if args.pos_backend == 'spacy' and not SPACY_AVAILABLE:
+        parser.error("--pos-backend spacy requires spacy (pip install spacy)")
+    main(args.workers, not args.no_cache, args.cache_size_mb * 1024 * 1024, args.pos_backend,
+         args.semantic, args.preview)
\ No newline at end of file
@@ -0,0 +1,442 @@
+"""
+Inverted Positional Index of the Materials Corpus
+Master's Thesis: Psychological Manipulation in Marketing Discourse
+
+Tokenizes every brand file of the sector directories once (with the same
+tokenizer as 'token' keyword matching) and stores a positional inverted
+index as flat NumPy arrays, memory-mapped when opened:
+
+- postings: for each term, the (document, token position) of every
+  occurrence, sorted, in compressed sparse row layout
+- forward index: the term and character offset of every token of every
+  document, so token windows and text snippets need no re-tokenization
+
+Queries cover terms, phrases and proximity ("'clinically proven' within 10
+words of 'dermatologist'"). The index records a fingerprint of every file
+and is rebuilt when the materials change.
+
+Each build is written to a temporary directory, renamed to its own build
+directory and only then made current by replacing manifest.json, so a
+process never maps a partially written index. Builds hold an exclusive
+lock on build.lock and re-check the manifest once they have it, so when
+several processes find the index stale only the first one builds. Like
+the corpus store, the index is opened (and built if stale) in the parent
+process before worker processes start, which then find it current.
+
+Usage:
+    python corpus_index.py build
+    python corpus_index.py phrase "clinically proven"
+    python corpus_index.py near "clinically proven" dermatologist [--window 10]
+    python -m doctest corpus_index.py    # check the proximity window
+"""
+
+import argparse
+import json
+import os
+import shutil
+import tempfile
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from keyword_matcher import lowercase_preserving_offsets, tokenize
+from embedding_store import file_lock
+from result_cache import fingerprint
+
+# Configuration
+PROJECT_ROOT = Path("D:/Thesis")
+DATA_DIR = PROJECT_ROOT / "docs" / "materials"
+INDEX_DIR = PROJECT_ROOT / "analysis" / "index" / "materials"
+SECTORS = ['Fashion', 'Fitness', 'Skincare_Cosmetics']
+
+# Bump when the tokenizer or the file layout changes
+INDEX_VERSION = 2
+
+ARRAYS = ('term_offsets', 'posting_documents', 'posting_positions',
+          'document_offsets', 'token_terms', 'token_starts')
+
+# Postings are compared as 64-bit keys: document id in the high bits
+POSITION_BITS = 32
+
+
+def read_text(path: Path) -> str:
+    """Read a brand file the way the analyzers do"""
+    with open(path, 'r', encoding='utf-8', errors='ignore') as f:
+        return f.read()
+
+
+def corpus_files(data_dir: Path, sectors: Iterable[str]) -> List[Tuple[str, str, Path]]:
+    """(sector, brand, path) of every brand file, in a stable order"""
+    return [
+        (sector, path.stem, path)
+        for sector in sectors
+        for path in sorted((Path(data_dir) / sector).glob("*.txt"))
+    ]
+
+
+def proximity_bounds(first_keys: np.ndarray, first_length: int, second_length: int,
+                     window: int, ordered: bool = False) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Range [low, high) of second-phrase start keys within `window` tokens of
+    each first-phrase start; keys never cross documents because positions
+    are far below 2**32
+
+    In "alpha beta gamma" one token lies between alpha (0) and gamma (2):
+
+    >>> low, high = proximity_bounds(np.array([0]), 1, 1, window=1)
+    >>> bool(low[0] <= 2 < high[0])
+    True
+    >>> low, high = proximity_bounds(np.array([0]), 1, 1, window=0)
+    >>> bool(low[0] <= 2 < high[0])
+    False
+    >>> low, high = proximity_bounds(np.array([2]), 1, 1, window=1)
+    >>> bool(low[0] <= 0 < high[0])
+    True
+    """
+    # Second phrase after the first: at most `window` tokens after its end
+    high = first_keys + first_length + window + 1
+    if ordered:
+        return first_keys + first_length, high
+    # Second phrase before the first: its end at most `window` tokens before
+    return first_keys - second_length - window, high
+
+
+def build_index(data_dir: Path = DATA_DIR, index_dir: Path = INDEX_DIR,
+                sectors: Iterable[str] = SECTORS, force: bool = False) -> 'CorpusIndex':
+    """
+    Tokenize every brand file and write the index arrays
+
+    Args:
+        data_dir: Materials directory with one subdirectory per sector
+        index_dir: Output directory, created if missing
+        sectors: Sector subdirectories to index
+        force: Rebuild even if another process has made the index current
+
+    Returns:
+        The opened index
+    """
+    index_dir = Path(index_dir)
+    index_dir.mkdir(exist_ok=True, parents=True)
+    sectors = list(sectors)
+    with file_lock(index_dir / "build.lock"):
+        # Another process may have built the index while this one waited
+        if not force and index_is_current(data_dir, index_dir, sectors):
+            return CorpusIndex(index_dir)
+        return _write_index(data_dir, index_dir, sectors)
+
+
+def _write_index(data_dir: Path, index_dir: Path, sectors: List[str]) -> 'CorpusIndex':
+    """Write a new build and make it current (build.lock must be held)"""
+    temporary_dir = Path(tempfile.mkdtemp(prefix='build-', suffix='.tmp', dir=index_dir))
+
+    vocabulary = {}
+    documents = []
+    term_chunks = []
+    start_chunks = []
+    for sector, brand, path in corpus_files(data_dir, sectors):
+        text = read_text(path)
+        tokens, starts = tokenize(lowercase_preserving_offsets(text))
+        term_chunks.append(np.array(
+            [vocabulary.setdefault(token, len(vocabulary)) for token in tokens], dtype=np.int32
+        ))
+        start_chunks.append(np.array(starts, dtype=np.int32))
+        documents.append({
+            'sector': sector,
+            'brand': brand,
+            'path': str(path),
+            'fingerprint': fingerprint(text),
+            'tokens': len(tokens)
+        })
+
+    token_counts = np.array([len(chunk) for chunk in term_chunks], dtype=np.int64)
+    token_terms = np.concatenate(term_chunks) if term_chunks else np.empty(0, dtype=np.int32)
+    token_starts = np.concatenate(start_chunks) if start_chunks else np.empty(0, dtype=np.int32)
+    document_offsets = np.concatenate(([0], np.cumsum(token_counts)))
+
+    # Stable sort by term keeps each term's postings in (document, position) order
+    token_documents = np.repeat(np.arange(len(documents), dtype=np.int32), token_counts)
+    token_positions = (np.arange(len(token_terms), dtype=np.int64)
+                       - np.repeat(document_offsets[:-1], token_counts)).astype(np.int32)
+    order = np.argsort(token_terms, kind='stable')
+    term_offsets = np.concatenate(
+        ([0], np.cumsum(np.bincount(token_terms, minlength=len(vocabulary))))
+    )
+
+    arrays = {
+        'term_offsets': term_offsets.astype(np.int64),
+        'posting_documents': token_documents[order],
+        'posting_positions': token_positions[order],
+        'document_offsets': document_offsets.astype(np.int64),
+        'token_terms': token_terms,
+        'token_starts': token_starts
+    }
+    for name, array in arrays.items():
+        np.save(temporary_dir / f"{name}.npy", array)
+    with open(temporary_dir / "vocabulary.json", 'w', encoding='utf-8') as f:
+        json.dump(list(vocabulary), f, ensure_ascii=False)
+
+    # Complete builds get their own directory; the manifest switches to it
+    build_name = temporary_dir.name[:-len('.tmp')]
+    os.replace(temporary_dir, index_dir / build_name)
+    descriptor, manifest_tmp = tempfile.mkstemp(prefix='manifest-', suffix='.tmp', dir=index_dir)
+    with open(descriptor, 'w', encoding='utf-8') as f:
+        json.dump({'version': INDEX_VERSION, 'build': build_name, 'documents': documents},
+                  f, indent=1)
+    os.replace(manifest_tmp, index_dir / "manifest.json")
+
+    # Earlier builds and leftovers of interrupted ones, unless still mapped
+    # by another process (Windows); no other build runs while the lock is held
+    for old_build in index_dir.glob("build-*"):
+        if old_build.name != build_name:
+            shutil.rmtree(old_build, ignore_errors=True)
+    for old_file in index_dir.glob("manifest-*.tmp"):
+        try:
+            old_file.unlink(missing_ok=True)
+        except OSError:
+            pass
+    # Arrays of the single-directory layout of index version 1
+    for old_file in [*index_dir.glob("*.npy"), index_dir / "vocabulary.json"]:
+        try:
+            old_file.unlink(missing_ok=True)
+        except OSError:
+            pass
+
+    print(f"Indexed {len(documents)} documents, {len(token_terms)} tokens, "
+          f"{len(vocabulary)} terms in {index_dir}")
+    return CorpusIndex(index_dir)
+
+
+def index_is_current(data_dir: Path = DATA_DIR, index_dir: Path = INDEX_DIR,
+                     sectors: Iterable[str] = SECTORS) -> bool:
+    """Whether the index exists and matches every brand file"""
+    manifest_path = Path(index_dir) / "manifest.json"
+    if not manifest_path.exists():
+        return False
+    with open(manifest_path, 'r', encoding='utf-8') as f:
+        manifest = json.load(f)
+    if manifest.get('version') != INDEX_VERSION:
+        return False
+    if not (Path(index_dir) / manifest['build']).is_dir():
+        return False
+    files = corpus_files(data_dir, sectors)
+    indexed = manifest['documents']
+    return len(files) == len(indexed) and all(
+        (sector, brand) == (document['sector'], document['brand'])
+        and fingerprint(read_text(path)) == document['fingerprint']
+        for (sector, brand, path), document in zip(files, indexed)
+    )
+
+
+@lru_cache(maxsize=None)
+def open_corpus_index(data_dir: Path = DATA_DIR, index_dir: Path = INDEX_DIR) -> 'CorpusIndex':
+    """Index of the materials corpus, rebuilt if stale, opened once per process"""
+    if not index_is_current(data_dir, index_dir):
+        return build_index(data_dir, index_dir)
+    return CorpusIndex(index_dir)
+
+
+class CorpusIndex:
+    """
+    Memory-mapped positional index with term, phrase and proximity queries
+
+    Query results are DataFrames with one row per match: the document's
+    'sector' and 'brand', the token 'position' of the match and, for
+    proximity queries, the 'other_position' of the nearby match.
+    """
+
+    def __init__(self, index_dir: Path = INDEX_DIR):
+        with open(Path(index_dir) / "manifest.json", 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+        self.documents = manifest['documents']
+        # Arrays of the build current when the index is opened
+        index_dir = Path(index_dir) / manifest['build']
+        with open(index_dir / "vocabulary.json", 'r', encoding='utf-8') as f:
+            self.vocabulary = json.load(f)
+        self.term_ids = {term: term_id for term_id, term in enumerate(self.vocabulary)}
+        self.document_ids = {
+            (document['sector'], document['brand']): document_id
+            for document_id, document in enumerate(self.documents)
+        }
+        for name in ARRAYS:
+            setattr(self, name, np.load(index_dir / f"{name}.npy", mmap_mode='r'))
+        # Keyword set -> per-document character offsets, see keyword_offsets
+        self._keyword_offsets = {}
+
+    # Postings
+
+    def _keys(self, term: str) -> np.ndarray:
+        """Sorted (document << 32 | position) keys of a single token"""
+        term_id = self.term_ids.get(term)
+        if term_id is None:
+            return np.empty(0, dtype=np.int64)
+        start, end = self.term_offsets[term_id], self.term_offsets[term_id + 1]
+        return ((self.posting_documents[start:end].astype(np.int64) << POSITION_BITS)
+                | self.posting_positions[start:end])
+
+    def _phrase_keys(self, phrase: str) -> Tuple[np.ndarray, int]:
+        """Sorted keys of the first token of every phrase occurrence, and its length"""
+        tokens, _ = tokenize(phrase.lower())
+        if not tokens:
+            return np.empty(0, dtype=np.int64), 0
+        keys = self._keys(tokens[0])
+        for offset, token in enumerate(tokens[1:], start=1):
+            if not keys.size:
+                break
+            # Occurrences of the next token, shifted back to the phrase start
+            keys = keys[np.isin(keys, self._keys(token) - offset, assume_unique=True)]
+        return keys, len(tokens)
+
+    def _frame(self, keys: np.ndarray, other_keys: Optional[np.ndarray] = None) -> pd.DataFrame:
+        documents = (keys >> POSITION_BITS).astype(np.int64)
+        frame = pd.DataFrame({
+            'sector': [self.documents[document]['sector'] for document in documents],
+            'brand': [self.documents[document]['brand'] for document in documents],
+            'position': (keys & ((1 << POSITION_BITS) - 1)).astype(np.int64)
+        })
+        if other_keys is not None:
+            frame['other_position'] = (other_keys & ((1 << POSITION_BITS) - 1)).astype(np.int64)
+        return frame
+
+    # Queries
+
+    def term(self, term: str) -> pd.DataFrame:
+        """Every occurrence of a single token"""
+        return self._frame(self._keys(term.lower()))
+
+    def phrase(self, phrase: str) -> pd.DataFrame:
+        """Every occurrence of a phrase (consecutive tokens), by its first token"""
+        keys, _ = self._phrase_keys(phrase)
+        return self._frame(keys)
+
+    def near(self, first: str, second: str, window: int = 10,
+             ordered: bool = False) -> pd.DataFrame:
+        """
+        Occurrences of two phrases at most `window` tokens apart
+
+        Args:
+            first: Phrase whose occurrences are returned as 'position'
+            second: Phrase that must occur nearby ('other_position')
+            window: Maximum number of tokens between the two phrases
+            ordered: Only count the second phrase after the first
+
+        Returns:
+            One row per (first, second) pair in range
+        """
+        first_keys, first_length = self._phrase_keys(first)
+        second_keys, second_length = self._phrase_keys(second)
+        if not first_keys.size or not second_keys.size:
+            return self._frame(np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64))
+
+        low, high = proximity_bounds(first_keys, first_length, second_length, window, ordered)
+        lows = np.searchsorted(second_keys, low, side='left')
+        highs = np.searchsorted(second_keys, high, side='left')
+        counts = highs - lows
+
+        first_index = np.repeat(np.arange(first_keys.size), counts)
+        # Indices lows[i], ..., highs[i] - 1 for every first occurrence i
+        second_index = (np.arange(counts.sum())
+                        - np.repeat(np.cumsum(counts) - counts, counts)
+                        + np.repeat(lows, counts))
+        return self._frame(first_keys[first_index], second_keys[second_index])
+
+    @staticmethod
+    def brands(matches: pd.DataFrame) -> pd.DataFrame:
+        """Number of matches per brand, most first"""
+        return (matches.groupby(['sector', 'brand']).size()
+                .rename('matches').sort_values(ascending=False).reset_index())
+
+    # Documents
+
+    def document_id(self, sector: str, brand: str) -> int:
+        document_id = self.document_ids.get((sector, brand))
+        if document_id is None:
+            raise ValueError(f"Brand {sector}/{brand} is not in the corpus index")
+        return document_id
+
+    def is_current(self, sector: str, brand: str, text: str) -> bool:
+        """Whether the indexed version of a brand file is this text"""
+        document_id = self.document_ids.get((sector, brand))
+        return (document_id is not None
+                and self.documents[document_id]['fingerprint'] == fingerprint(text))
+
+    def document_tokens(self, sector: str, brand: str) -> Tuple[List[str], List[int]]:
+        """Tokens and character offsets of one document, as tokenize() returns them"""
+        document_id = self.document_id(sector, brand)
+        start, end = self.document_offsets[document_id], self.document_offsets[document_id + 1]
+        vocabulary = self.vocabulary
+        return ([vocabulary[term] for term in self.token_terms[start:end]],
+                self.token_starts[start:end].tolist())
+
+    def snippet(self, sector: str, brand: str, position: int, window: int = 10) -> str:
+        """Text of the tokens around a position, read from the brand file"""
+        document_id = self.document_id(sector, brand)
+        start, end = self.document_offsets[document_id], self.document_offsets[document_id + 1]
+        text = read_text(Path(self.documents[document_id]['path']))
+        first = start + max(position - window, 0)
+        last = min(start + position + window + 1, end)
+        text_end = self.token_starts[last] if last < end else len(text)
+        return ' '.join(text[self.token_starts[first]:text_end].split())
+
+    def keyword_offsets(self, sector: str, brand: str,
+                        keywords: Iterable[str]) -> Dict[str, List[int]]:
+        """
+        Character start offsets of keywords in one document, identical to
+        a 'token' mode LexiconIndex scan of its text
+
+        All documents are answered from one phrase query per keyword, which
+        is kept for the other documents.
+        """
+        keywords = tuple(sorted(set(keywords)))
+        by_document = self._keyword_offsets.get(keywords)
+        if by_document is None:
+            by_document = self._keyword_offsets[keywords] = {}
+            for keyword in keywords:
+                keys, _ = self._phrase_keys(keyword)
+                if not keys.size:
+                    continue
+                documents = keys >> POSITION_BITS
+                token_index = (self.document_offsets[documents]
+                               + (keys & ((1 << POSITION_BITS) - 1)))
+                starts = self.token_starts[token_index]
+                for document_id, start in zip(documents.tolist(), starts.tolist()):
+                    by_document.setdefault(document_id, {}).setdefault(keyword, []).append(start)
+        return by_document.get(self.document_id(sector, brand), {})
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Positional index of the materials corpus")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    subparsers.add_parser('build', help="(Re)build the index")
+    phrase_parser = subparsers.add_parser('phrase', help="Brands using a term or phrase")
+    phrase_parser.add_argument('phrase')
+    near_parser = subparsers.add_parser('near', help="Brands using two phrases close together")
+    near_parser.add_argument('first')
+    near_parser.add_argument('second')
+    near_parser.add_argument('--window', type=int, default=10,
+                             help="Maximum number of words between the phrases")
+    near_parser.add_argument('--ordered', action='store_true',
+                             help="Second phrase must follow the first")
+    near_parser.add_argument('--examples', type=int, default=3,
+                             help="Example snippets to print")
+    args = parser.parse_args()
+
+    if args.command == 'build':
+        build_index(force=True)
+        return
+
+    index = open_corpus_index()
+    if args.command == 'phrase':
+        matches = index.phrase(args.phrase)
+    else:
+        matches = index.near(args.first, args.second, args.window, args.ordered)
+        for row in matches.head(args.examples).itertuples():
+            print(f"  [{row.sector}/{row.brand}] ... "
+                  f"{index.snippet(row.sector, row.brand, row.position, args.window)} ...")
+    print(index.brands(matches).to_string(index=False) if len(matches) else "No matches")
+
+
+if __name__ == "__main__":
+    main()
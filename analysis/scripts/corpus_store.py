@@ -0,0 +1,374 @@
+"""
+Memory-Mapped Corpus Store
+Master's Thesis: Psychological Manipulation in Marketing Discourse
+
+Packs the brand files of docs/materials/<sector>/*.txt of the three sectors
+into one UTF-8 blob with a JSON offset table, built once and memory-mapped
+read-only by every process. Each document is stored in three variants:
+
+- text: the file decoded as the analyzers always read it (UTF-8, invalid
+  bytes dropped)
+- lower: lowercase_preserving_offsets(text), whose offsets match the text
+- normalized: NFKC, case-folded, whitespace collapsed; for comparing
+  documents, offsets do not match the text
+
+Analyzers load a sector as StoredTexts, a read-only mapping that decodes a
+document from the shared mapping when it is accessed instead of holding
+every text as a Python string. Worker processes are sent a StoredDocument
+reference instead of the text and read it from their own mapping of the
+same blob, so the operating system's page cache holds the corpus once.
+
+The offset table records the size and modification time of every file;
+the store is rebuilt when a file is added, removed or changed. Builds hold
+an exclusive lock on build.lock and re-check the offset table once they
+have it, so when several processes find the store stale only the first
+one builds.
+
+A second store holds the corpus with repeated boilerplate lines removed
+(boilerplate.py); its removed_lines.json records every dropped line.
+
+Usage:
+    python corpus_store.py [--dedup]          # build the store if stale
+    python corpus_store.py [--dedup] --rebuild
+"""
+
+import argparse
+import json
+import mmap
+import os
+import re
+import tempfile
+import unicodedata
+from collections.abc import Mapping
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, Iterator, List, NamedTuple, Optional
+
+from embedding_store import file_lock
+from keyword_matcher import lowercase_preserving_offsets
+from parsed_document import ParsedDocument
+from result_cache import fingerprint
+
+# Configuration
+PROJECT_ROOT = Path("D:/Thesis")
+DATA_DIR = PROJECT_ROOT / "docs" / "materials"
+STORE_DIR = PROJECT_ROOT / "analysis" / "store" / "materials"
+DEDUP_STORE_DIR = PROJECT_ROOT / "analysis" / "store" / "materials_dedup"
+SECTORS = ['Fashion', 'Fitness', 'Skincare_Cosmetics']
+
+# Bump when the blob layout or a variant changes
+STORE_VERSION = 1
+
+VARIANTS = ('text', 'lower', 'normalized')
+
+WHITESPACE = re.compile(r'\s+')
+
+
+def normalize_text(text: str) -> str:
+    """Compatibility-normalized, case-folded text with collapsed whitespace"""
+    return WHITESPACE.sub(' ', unicodedata.normalize('NFKC', text).casefold()).strip()
+
+
+def source_files(data_dir: Path) -> List[Dict]:
+    """Sector, brand, path, size and modification time of every brand file"""
+    files = []
+    for sector in SECTORS:
+        for path in sorted((Path(data_dir) / sector).glob("*.txt")):
+            stat = path.stat()
+            files.append({
+                'sector': sector,
+                'brand': path.stem,
+                'path': str(path),
+                'size': stat.st_size,
+                'mtime_ns': stat.st_mtime_ns
+            })
+    return files
+
+
+def _read_manifest(store_dir: Path) -> Optional[Dict]:
+    manifest_path = Path(store_dir) / "manifest.json"
+    if not manifest_path.exists():
+        return None
+    with open(manifest_path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def _dedup_settings(deduplicate: bool) -> Optional[Dict]:
+    # Imported here: boilerplate uses parallel_analysis, which imports this module
+    from boilerplate import settings
+    return settings() if deduplicate else None
+
+
+def store_is_current(data_dir: Path = DATA_DIR, store_dir: Path = STORE_DIR,
+                     deduplicate: bool = False) -> bool:
+    """Whether the store exists and every brand file is unchanged since it was built"""
+    manifest = _read_manifest(store_dir)
+    if manifest is None or manifest.get('version') != STORE_VERSION:
+        return False
+    if manifest.get('deduplicate') != _dedup_settings(deduplicate):
+        return False
+    if not (Path(store_dir) / manifest['blob']).exists():
+        return False
+    keys = ('sector', 'brand', 'path', 'size', 'mtime_ns')
+    stored = [{key: document[key] for key in keys} for document in manifest['documents']]
+    return stored == source_files(data_dir)
+
+
+def build_store(data_dir: Path = DATA_DIR, store_dir: Path = STORE_DIR,
+                deduplicate: bool = False, force: bool = False):
+    """
+    Decode every brand file once and write the blob and offset table
+
+    Args:
+        data_dir: Materials directory with one subdirectory per sector
+        store_dir: Output directory, created if missing
+        deduplicate: Remove repeated boilerplate lines from every document
+                     and record them in removed_lines.json
+        force: Rebuild even if another process has made the store current
+    """
+    store_dir = Path(store_dir)
+    store_dir.mkdir(exist_ok=True, parents=True)
+    with file_lock(store_dir / "build.lock"):
+        # Another process may have built the store while this one waited
+        if force or not store_is_current(data_dir, store_dir, deduplicate):
+            _write_store(data_dir, store_dir, deduplicate)
+
+
+def _write_store(data_dir: Path, store_dir: Path, deduplicate: bool):
+    """Write the blob and offset table (build.lock must be held)"""
+    if deduplicate:
+        from boilerplate import BoilerplateFilter
+        boilerplate_filter = BoilerplateFilter()
+
+    documents = []
+    chunks = []
+    removed_lines = {}
+    position = 0
+    for document in source_files(data_dir):
+        with open(document['path'], 'r', encoding='utf-8', errors='ignore') as f:
+            text = f.read()
+        if deduplicate:
+            text, removed = boilerplate_filter.filter(text)
+            removed_lines[f"{document['sector']}/{document['brand']}"] = removed
+            document['removed_lines'] = len(removed)
+        document['hash'] = fingerprint(text)
+        document['characters'] = len(text)
+        variants = {
+            'text': text,
+            'lower': lowercase_preserving_offsets(text),
+            'normalized': normalize_text(text)
+        }
+        for variant in VARIANTS:
+            data = variants[variant].encode('utf-8')
+            document[variant] = [position, len(data)]
+            chunks.append(data)
+            position += len(data)
+        documents.append(document)
+
+    # Blobs are named by content and layout (version, variants, dedup
+    # settings): a blob mapped by another process is never overwritten
+    # (Windows cannot replace a mapped file), and an existing blob of that
+    # name holds exactly these bytes
+    blob_name = "corpus-{}.bin".format(fingerprint(
+        STORE_VERSION, *VARIANTS, json.dumps(_dedup_settings(deduplicate), sort_keys=True),
+        *[document['hash'] for document in documents]
+    )[:16])
+    blob_path = store_dir / blob_name
+    if not blob_path.exists():
+        descriptor, temporary_path = tempfile.mkstemp(prefix='corpus-', suffix='.tmp', dir=store_dir)
+        with open(descriptor, 'wb') as f:
+            for data in chunks:
+                f.write(data)
+        os.replace(temporary_path, blob_path)
+
+    if deduplicate:
+        with open(store_dir / "removed_lines.json", 'w', encoding='utf-8') as f:
+            json.dump(removed_lines, f, indent=1, ensure_ascii=False)
+
+    descriptor, temporary_path = tempfile.mkstemp(prefix='manifest-', suffix='.tmp', dir=store_dir)
+    with open(descriptor, 'w', encoding='utf-8') as f:
+        json.dump({
+            'version': STORE_VERSION, 'deduplicate': _dedup_settings(deduplicate),
+            'blob': blob_name, 'documents': documents
+        }, f, indent=1)
+    os.replace(temporary_path, store_dir / "manifest.json")
+
+    # Blobs of earlier builds, unless still mapped by another process, and
+    # temporary files of interrupted builds
+    for old_file in [*store_dir.glob("corpus-*.bin"), *store_dir.glob("*.tmp")]:
+        if old_file.name != blob_name:
+            try:
+                old_file.unlink()
+            except OSError:
+                pass
+
+    print(f"Stored {len(documents)} documents ({position / 1e6:.1f} MB) in {blob_path}")
+    if deduplicate:
+        print(f"Removed {sum(len(lines) for lines in removed_lines.values())} repeated lines, "
+              f"see {store_dir / 'removed_lines.json'}")
+
+
+@lru_cache(maxsize=None)
+def _open_store_dir(store_dir: str) -> 'CorpusStore':
+    return CorpusStore(Path(store_dir))
+
+
+@lru_cache(maxsize=None)
+def open_corpus_store(data_dir: Path = DATA_DIR, deduplicate: bool = False) -> 'CorpusStore':
+    """
+    Corpus store of the materials, rebuilt if stale, mapped once per process
+
+    Args:
+        data_dir: Materials directory
+        deduplicate: Open the store with repeated boilerplate lines removed
+    """
+    store_dir = DEDUP_STORE_DIR if deduplicate else STORE_DIR
+    if not store_is_current(data_dir, store_dir, deduplicate):
+        build_store(data_dir, store_dir, deduplicate)
+    return _open_store_dir(str(store_dir))
+
+
+class CorpusStore:
+    """
+    Read-only memory mapping of the packed corpus
+    """
+
+    def __init__(self, store_dir: Path = STORE_DIR):
+        self.store_dir = Path(store_dir)
+        manifest = _read_manifest(self.store_dir)
+        self.documents = {
+            (document['sector'], document['brand']): document
+            for document in manifest['documents']
+        }
+        with open(self.store_dir / manifest['blob'], 'rb') as f:
+            # An empty file cannot be mapped
+            if os.fstat(f.fileno()).st_size:
+                self._mapping = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            else:
+                self._mapping = b''
+        self._buffer = memoryview(self._mapping)
+
+    def _document(self, sector: str, brand: str) -> Dict:
+        document = self.documents.get((sector, brand))
+        if document is None:
+            raise KeyError(f"{sector}/{brand} is not in the corpus store")
+        return document
+
+    def sectors(self) -> List[str]:
+        return sorted(set(sector for sector, _ in self.documents))
+
+    def brands(self, sector: str) -> List[str]:
+        """Brands of a sector in file name order"""
+        return [brand for document_sector, brand in self.documents if document_sector == sector]
+
+    def view(self, sector: str, brand: str, variant: str = 'text') -> memoryview:
+        """UTF-8 bytes of a document variant, without copying"""
+        start, length = self._document(sector, brand)[variant]
+        return self._buffer[start:start + length]
+
+    def text(self, sector: str, brand: str, variant: str = 'text') -> str:
+        """Decoded document variant"""
+        return str(self.view(sector, brand, variant), 'utf-8')
+
+    def content_hash(self, sector: str, brand: str) -> str:
+        """fingerprint() of the document text"""
+        return self._document(sector, brand)['hash']
+
+    def sector_texts(self, sector: str) -> 'StoredTexts':
+        return StoredTexts(self, sector)
+
+
+class StoredDocument(NamedTuple):
+    """Picklable reference to a stored document, resolved in the receiving process"""
+    store_dir: str
+    sector: str
+    brand: str
+
+    def texts(self) -> 'StoredTexts':
+        """Mapping of just this document in this process's mapping of the store"""
+        return StoredTexts(_open_store_dir(self.store_dir), self.sector, [self.brand])
+
+
+class StoredTexts(Mapping):
+    """
+    Brand name -> text mapping of one sector, decoded from the corpus store
+    on access
+    """
+
+    def __init__(self, store: CorpusStore, sector: str, brands: Optional[List[str]] = None):
+        """
+        Args:
+            store: Opened corpus store
+            sector: Sector whose brands are mapped
+            brands: Restrict the mapping to these brands (default: all)
+        """
+        self.store = store
+        self.sector = sector
+        self._brands = list(brands) if brands is not None else store.brands(sector)
+        self._brand_set = set(self._brands)
+
+    def __getitem__(self, brand: str) -> str:
+        if brand not in self._brand_set:
+            raise KeyError(brand)
+        return self.store.text(self.sector, brand)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._brands)
+
+    def __len__(self) -> int:
+        return len(self._brands)
+
+    def __contains__(self, brand) -> bool:
+        return brand in self._brand_set
+
+    def subset(self, brands: List[str]) -> 'StoredTexts':
+        """The same mapping restricted to some brands"""
+        return StoredTexts(self.store, self.sector, brands)
+
+    def lower(self, brand: str) -> str:
+        """Stored lowercase_preserving_offsets() of a brand text"""
+        return self.store.text(self.sector, brand, 'lower')
+
+    def reference(self, brand: str) -> StoredDocument:
+        return StoredDocument(str(self.store.store_dir), self.sector, brand)
+
+
+def load_sector_texts(sector: str, data_dir: Path = DATA_DIR,
+                      deduplicate: bool = False) -> Mapping:
+    """
+    Texts of a sector's brands from the corpus store (built or refreshed
+    first if needed)
+
+    Args:
+        sector: Sector subdirectory
+        data_dir: Materials directory
+        deduplicate: Texts with repeated boilerplate lines removed
+    """
+    return open_corpus_store(Path(data_dir), deduplicate).sector_texts(sector)
+
+
+def parse_document(texts: Mapping, brand_name: str) -> ParsedDocument:
+    """ParsedDocument of a brand, with the stored lowercase text if available"""
+    if isinstance(texts, StoredTexts):
+        return ParsedDocument(texts[brand_name], texts.lower(brand_name))
+    return ParsedDocument(texts[brand_name])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pack the materials corpus into a memory-mapped store")
+    parser.add_argument('--rebuild', action='store_true', help="Rebuild even if up to date")
+    parser.add_argument('--dedup', action='store_true',
+                        help="Build the store with repeated boilerplate lines removed")
+    args = parser.parse_args()
+    store_dir = DEDUP_STORE_DIR if args.dedup else STORE_DIR
+    if args.rebuild or not store_is_current(DATA_DIR, store_dir, args.dedup):
+        build_store(DATA_DIR, store_dir, args.dedup, force=args.rebuild)
+    else:
+        print(f"Corpus store in {store_dir} is up to date")
+    store = open_corpus_store(DATA_DIR, args.dedup)
+    for sector in store.sectors():
+        print(f"{sector}: {len(store.brands(sector))} brands")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,291 @@
+"""
+Persistent Sentence Embedding Store
+Master's Thesis: Psychological Manipulation in Marketing Discourse
+
+Scraped pages repeat the same sentences across files and brands, and every
+analysis run would embed them again. The store keeps one embedding per
+distinct sentence of a sentence model on disk:
+
+- embeddings.f16: float16 matrix, one row per sentence, memory-mapped
+- keys.bin: append-only index, the 16-byte hash of the sentence of each
+  row (sentence_key), in row order
+- store.json: model name and embedding dimension
+
+New rows are appended to the matrix first and their keys after, so a key
+always points at a complete row. Appends hold an exclusive lock on
+store.lock and first catch up with rows other processes appended, so two
+analyzers can add to the same store; a partial row or key left by an
+interrupted append is truncated before the next append. Lookups
+are batched: rows() maps many keys at once and reports only the missing
+ones, which are then embedded in one batch and appended.
+
+Semantic detection runs in the parent process of the analyzers, which
+stores the sentences of all documents to score in one batch and then reads
+their rows from the mapped matrix. Both analyzers use the store through
+open_embedding_store, one instance per directory and process; a store
+opened read-only (as the listing below does) never appends.
+
+Usage:
+    python embedding_store.py    # print the size of every store
+"""
+
+import hashlib
+import json
+import os
+import re
+from contextlib import contextmanager
+from functools import lru_cache
+from pathlib import Path
+from typing import Callable, List, Sequence, Tuple
+
+import numpy as np
+
+# Configuration
+PROJECT_ROOT = Path("D:/Thesis")
+EMBEDDING_STORE_DIR = PROJECT_ROOT / "analysis" / "cache" / "sentence_embeddings"
+
+# Bump when the file layout changes
+STORE_VERSION = 1
+
+KEY_BYTES = 16
+DTYPE = np.float16
+
+WHITESPACE = re.compile(r'\s+')
+
+
+def sentence_key(sentence: str) -> bytes:
+    """Store key of a sentence: hash of its whitespace-normalized text"""
+    normalized = WHITESPACE.sub(' ', sentence).strip()
+    return hashlib.blake2b(normalized.encode('utf-8'), digest_size=KEY_BYTES).digest()
+
+
+@contextmanager
+def file_lock(path: Path):
+    """Exclusive lock on a file across processes while the block runs"""
+    with open(path, 'a+b') as f:
+        if os.name == 'nt':
+            import msvcrt
+            f.seek(0)
+            # LK_LOCK gives up after about 10 seconds; keep waiting
+            while True:
+                try:
+                    msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:
+                    continue
+            try:
+                yield
+            finally:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+        else:
+            import fcntl
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+
+class EmbeddingStore:
+    """
+    Sentence key -> row of a memory-mapped float16 embedding matrix
+    """
+
+    def __init__(self, directory: Path, read_only: bool = False):
+        """
+        Args:
+            directory: Store directory of one sentence model, created if
+                       missing (unless read_only)
+            read_only: Never append; storing a new sentence raises
+        """
+        self.directory = Path(directory)
+        self.read_only = read_only
+        self.matrix_path = self.directory / "embeddings.f16"
+        self.keys_path = self.directory / "keys.bin"
+        self.meta_path = self.directory / "store.json"
+        self.lock_path = self.directory / "store.lock"
+        self.dimension = None
+        self.rows_by_key = {}
+        self.row_count = 0
+        self._matrix = None
+        self._mapped_rows = 0
+
+        if not read_only:
+            self.directory.mkdir(exist_ok=True, parents=True)
+            with file_lock(self.lock_path):
+                self._read_meta()
+        else:
+            self._read_meta()
+        self.refresh()
+
+    def _read_meta(self):
+        """Dimension from store.json; a writer deletes a store of an older layout"""
+        if not self.meta_path.exists():
+            return
+        with open(self.meta_path, 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+        if meta.get('version') == STORE_VERSION:
+            self.dimension = meta['dimension']
+        elif not self.read_only:
+            # Older layout: start over
+            for path in (self.matrix_path, self.keys_path, self.meta_path):
+                path.unlink(missing_ok=True)
+
+    def __len__(self) -> int:
+        return self.row_count
+
+    @property
+    def row_bytes(self) -> int:
+        return self.dimension * np.dtype(DTYPE).itemsize
+
+    def refresh(self):
+        """Read keys appended since the store was opened (by another process)"""
+        if (self.dimension is None or not self.keys_path.exists()
+                or not self.matrix_path.exists()):
+            return
+        with open(self.keys_path, 'rb') as f:
+            f.seek(self.row_count * KEY_BYTES)
+            data = f.read()
+        matrix_bytes = self.matrix_path.stat().st_size
+        rows = min(len(data) // KEY_BYTES, matrix_bytes // self.row_bytes - self.row_count)
+        for row in range(rows):
+            self.rows_by_key[data[row * KEY_BYTES:(row + 1) * KEY_BYTES]] = self.row_count + row
+        self.row_count += max(rows, 0)
+
+    def _truncate_partial(self):
+        """
+        Drop a partial row or key left by an interrupted append, so the next
+        append starts at row_count in both files (call with the lock held,
+        after refresh)
+        """
+        for path, size in ((self.matrix_path, self.row_count * self.row_bytes),
+                           (self.keys_path, self.row_count * KEY_BYTES)):
+            if path.exists() and path.stat().st_size > size:
+                os.truncate(path, size)
+
+    @property
+    def matrix(self) -> np.ndarray:
+        """Memory-mapped embedding matrix, remapped after appends"""
+        if self._matrix is None or self._mapped_rows != self.row_count:
+            self._mapped_rows = self.row_count
+            if self._mapped_rows == 0:
+                self._matrix = np.empty((0, self.dimension or 0), dtype=DTYPE)
+            else:
+                self._matrix = np.memmap(self.matrix_path, dtype=DTYPE, mode='r',
+                                         shape=(self._mapped_rows, self.dimension))
+        return self._matrix
+
+    def rows(self, keys: Sequence[bytes]) -> Tuple[np.ndarray, List[int]]:
+        """
+        Batched lookup
+
+        Args:
+            keys: Sentence keys
+
+        Returns:
+            Tuple of (row of each key, -1 if missing; positions in keys of
+            the first occurrence of every missing key)
+        """
+        rows = np.fromiter((self.rows_by_key.get(key, -1) for key in keys),
+                           dtype=np.int64, count=len(keys))
+        missing = {}
+        for position in np.flatnonzero(rows < 0):
+            missing.setdefault(keys[position], int(position))
+        return rows, list(missing.values())
+
+    def append(self, keys: Sequence[bytes], embeddings: np.ndarray) -> np.ndarray:
+        """
+        Append embeddings of new keys; keys stored meanwhile by another
+        process are not written again
+
+        Returns:
+            Rows of the keys
+        """
+        if self.read_only:
+            raise PermissionError(f"Embedding store {self.directory} is open read-only")
+        embeddings = np.asarray(embeddings, dtype=DTYPE)
+        with file_lock(self.lock_path):
+            if self.dimension is None:
+                self._read_meta()
+            if self.dimension is None:
+                self.dimension = int(embeddings.shape[1])
+                with open(self.meta_path, 'w', encoding='utf-8') as f:
+                    json.dump({'version': STORE_VERSION, 'model': self.directory.name,
+                               'dimension': self.dimension}, f)
+            elif embeddings.shape[1] != self.dimension:
+                raise ValueError(f"Embeddings of dimension {embeddings.shape[1]} "
+                                 f"do not fit store dimension {self.dimension}")
+
+            # Rows appended by other processes come first
+            self.refresh()
+            self._truncate_partial()
+            new = [position for position, key in enumerate(keys) if key not in self.rows_by_key]
+            new_keys = [keys[position] for position in new]
+
+            # Matrix first, keys last: a key always points at a complete row
+            with open(self.matrix_path, 'ab') as f:
+                f.write(np.ascontiguousarray(embeddings[new]).tobytes())
+            with open(self.keys_path, 'ab') as f:
+                f.write(b''.join(new_keys))
+            for offset, key in enumerate(new_keys):
+                self.rows_by_key[key] = self.row_count + offset
+            self.row_count += len(new_keys)
+        return np.array([self.rows_by_key[key] for key in keys], dtype=np.int64)
+
+    def add(self, sentences: List[str],
+            encode: Callable[[List[str]], np.ndarray]) -> np.ndarray:
+        """
+        Store sentences, encoding those not stored yet in one batch
+
+        Args:
+            sentences: Sentences to store
+            encode: Function embedding a list of sentences into a matrix
+
+        Returns:
+            Row of each sentence
+        """
+        keys = [sentence_key(sentence) for sentence in sentences]
+        rows, missing = self.rows(keys)
+        if missing:
+            encoded = encode([sentences[position] for position in missing])
+            new_rows = dict(zip((keys[position] for position in missing),
+                                self.append([keys[position] for position in missing], encoded)))
+            for position in np.flatnonzero(rows < 0):
+                rows[position] = new_rows[keys[position]]
+        return rows
+
+    def embeddings(self, sentences: List[str],
+                   encode: Callable[[List[str]], np.ndarray]) -> np.ndarray:
+        """
+        Embeddings of sentences, encoding only those not stored
+
+        Args:
+            sentences: Sentences to embed
+            encode: Function embedding a list of sentences into a matrix
+
+        Returns:
+            float32 matrix with one embedding row per sentence
+        """
+        if not sentences:
+            return np.empty((0, self.dimension or 0), dtype=np.float32)
+        rows = self.add(sentences, encode)
+        return self.matrix[rows].astype(np.float32)
+
+
+@lru_cache(maxsize=None)
+def open_embedding_store(model_name: str, read_only: bool = False,
+                         store_dir: Path = EMBEDDING_STORE_DIR) -> EmbeddingStore:
+    """Embedding store of a sentence model, opened once per process"""
+    return EmbeddingStore(Path(store_dir) / model_name, read_only)
+
+
+if __name__ == "__main__":
+    stores = sorted(path.parent for path in EMBEDDING_STORE_DIR.glob("*/store.json"))
+    if not stores:
+        print(f"No embedding stores in {EMBEDDING_STORE_DIR}")
+    for directory in stores:
+        store = EmbeddingStore(directory, read_only=True)
+        size = store.matrix_path.stat().st_size if store.matrix_path.exists() else 0
+        print(f"{directory.name}: {len(store)} sentences, dimension {store.dimension}, "
+              f"{size / (1024 * 1024):.1f} MB")
@@ -0,0 +1,113 @@
+"""
+Batched Transformer Emotion Inference
+Master's Thesis: Psychological Manipulation in Marketing Discourse
+
+Packs each document's sentences (as split by the shared Punkt splitter,
+see ParsedDocument.sentences) into chunks that fit the model's token limit, runs the chunks of many documents through the emotion
+classifier in large padded batches, and averages chunk scores per document
+weighted by chunk length in tokens.
+"""
+
+from collections import defaultdict
+from typing import Dict, Hashable, List, Optional, Sequence, Tuple
+
+
+def chunk_document(sentences: Sequence[str], tokenizer, max_tokens: Optional[int] = None,
+                   max_chunks: Optional[int] = None) -> List[Tuple[str, int]]:
+    """
+    Pack consecutive sentences into chunks that fit the model input
+
+    Args:
+        sentences: Sentences of the document, in order
+        tokenizer: Tokenizer of the classification model
+        max_tokens: Input limit including special tokens (model maximum if None)
+        max_chunks: Optional cap on chunks per document (None covers everything)
+
+    Returns:
+        List of (chunk text, chunk length in tokens)
+    """
+    max_tokens = min(max_tokens or tokenizer.model_max_length, tokenizer.model_max_length)
+    budget = max_tokens - tokenizer.num_special_tokens_to_add()
+
+    sentences = [sentence for sentence in sentences if sentence.strip()]
+    if not sentences:
+        return []
+    sentence_ids = tokenizer(sentences, add_special_tokens=False)['input_ids']
+
+    chunks = []
+    current, current_length = [], 0
+    for sentence, ids in zip(sentences, sentence_ids):
+        if current and current_length + len(ids) > budget:
+            chunks.append((' '.join(current), current_length))
+            current, current_length = [], 0
+
+        if len(ids) > budget:
+            # A single overlong sentence is split on token windows
+            for start in range(0, len(ids), budget):
+                window = ids[start:start + budget]
+                chunks.append((tokenizer.decode(window), len(window)))
+        else:
+            current.append(sentence)
+            current_length += len(ids)
+
+        if max_chunks and len(chunks) >= max_chunks:
+            return chunks[:max_chunks]
+
+    if current:
+        chunks.append((' '.join(current), current_length))
+    return chunks[:max_chunks] if max_chunks else chunks
+
+
+def classify_documents(documents: Dict[Hashable, Sequence[str]], classifier,
+                       batch_size: int = 32, max_chunks: Optional[int] = None,
+                       max_tokens: Optional[int] = None) -> Dict[Hashable, Dict[str, float]]:
+    """
+    Emotion scores for many documents with batched inference
+
+    Args:
+        documents: Dictionary mapping a document key to its sentences
+        classifier: Text-classification pipeline returning all label scores
+        batch_size: Number of chunks per forward pass
+        max_chunks: Optional cap on chunks per document
+        max_tokens: Optional chunk size limit in tokens
+
+    Returns:
+        Dictionary mapping each document key to its length-weighted
+        average score per emotion label
+    """
+    chunk_texts, chunk_lengths, chunk_keys = [], [], []
+    for key, sentences in documents.items():
+        for chunk_text, length in chunk_document(sentences, classifier.tokenizer, max_tokens, max_chunks):
+            chunk_texts.append(chunk_text)
+            chunk_lengths.append(length)
+            chunk_keys.append(key)
+
+    if not chunk_texts:
+        return {key: {} for key in documents}
+
+    # Batch chunks of similar length together to minimize padding
+    order = sorted(range(len(chunk_texts)), key=lambda index: chunk_lengths[index])
+    outputs = classifier(
+        [chunk_texts[index] for index in order],
+        batch_size=batch_size,
+        truncation=True,
+        top_k=None
+    )
+
+    weighted_sums = defaultdict(lambda: defaultdict(float))
+    total_lengths = defaultdict(int)
+    for index, scores in zip(order, outputs):
+        if isinstance(scores, dict):
+            scores = [scores]
+        key, length = chunk_keys[index], chunk_lengths[index]
+        total_lengths[key] += length
+        for score in scores:
+            weighted_sums[key][score['label']] += score['score'] * length
+
+    return {
+        key: {
+            label: weighted_sums[key][label] / total_lengths[key]
+            for label in weighted_sums[key]
+        } if total_lengths[key] else {}
+        for key in documents
+    }
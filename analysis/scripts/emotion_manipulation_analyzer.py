@@ -8,29 +8,46 @@ This script implements the emotion-based manipulation detection framework
 based on the research synthesis and coding scheme.
 """
 
+import argparse
+import bisect
+import copy
 import json
 import os
 import re
 from pathlib import Path
-from typing import Dict, List, Tuple, Optional
+from typing import Callable, Dict, List, Tuple, Optional, Union
 import pandas as pd
 import numpy as np
 from collections import Counter, defaultdict
-import matplotlib.pyplot as plt
-import seaborn as sns
+from contextlib import ExitStack
 from textblob import TextBlob
-import nltk
-from nltk.tokenize import word_tokenize, sent_tokenize
-from nltk.corpus import stopwords
-
-# Try to import transformer models (optional for advanced analysis)
-try:
-    from transformers import pipeline
-    from sentence_transformers import SentenceTransformer
-    TRANSFORMERS_AVAILABLE = True
-except ImportError:
-    TRANSFORMERS_AVAILABLE = False
-    print("Transformers not available. Using basic analysis only.")
+
+from chart_rendering import ChartJob, render_charts
+from context_scoring import ContextScorer, keyword_windows
+from corpus_index import open_corpus_index
+from corpus_store import load_sector_texts, parse_document
+from embedding_store import open_embedding_store
+from emotion_inference import classify_documents
+from intensity_model import LEAD_SHARE, IntensityModel
+from keyword_matcher import (
+    LexiconIndex, LexiconHits, MATCH_MODES, keyword_contexts, lowercase_preserving_offsets,
+    sector_key, tokenize, EMOTION_MARKER, EMOTION_INTENSITY, SECTOR_MARKER
+)
+from parallel_analysis import CSVStream, ordered_rows, run_incremental_jobs
+from parsed_document import ParsedDocument, StageTimings
+# Transformer models are optional and loaded lazily on first use
+from resources import (
+    EMOTION_MODEL, PYARROW_AVAILABLE, SENTENCE_MODEL, TRANSFORMERS_AVAILABLE,
+    ensure_sentence_tokenizer,
+    get_emotion_classifier, get_sentence_model, get_sentence_splitter,
+    get_stopwords, get_vader_scorer
+)
+from result_cache import DEFAULT_MAX_BYTES, ResultCache, fingerprint
+from result_tables import ResultTableWriter
+from semantic_detector import SemanticDetector
+from sentence_stream import (
+    CHUNK_SIZE, SentenceAggregator, analyze_stream, read_chunks, stream_sentences
+)
 
 # Configuration
 PROJECT_ROOT = Path("D:/Thesis")
@@ -38,102 +55,269 @@ DATA_DIR = PROJECT_ROOT / "docs" / "materials"
 CODING_SCHEME_PATH = PROJECT_ROOT / "analysis" / "coding_scheme.json"
 RESULTS_DIR = PROJECT_ROOT / "analysis" / "results"
 RESULTS_DIR.mkdir(exist_ok=True, parents=True)
+CACHE_DIR = PROJECT_ROOT / "analysis" / "cache" / "emotion_manipulation"
 
-# Download required NLTK data
-nltk.download('punkt', quiet=True)
-nltk.download('stopwords', quiet=True)
-nltk.download('vader_lexicon', quiet=True)
-from nltk.sentiment.vader import SentimentIntensityAnalyzer
+# Bump when index_document or score_document output changes to invalidate caches
+ANALYZER_VERSION = 7
 
 class EmotionManipulationAnalyzer:
     """
     Advanced analyzer for emotion-based manipulation strategies in marketing discourse
     """
     
-    def __init__(self, sector: str):
+    def __init__(self, sector: str, match_mode: str = 'substring',
+                 use_transformers: bool = True, use_corpus_index: bool = False,
+                 use_semantic: bool = False):
         """
         Initialize analyzer with coding scheme and sector-specific settings
         
         Args:
             sector: One of 'Fashion', 'Fitness', 'Skincare_Cosmetics'
+            match_mode: Keyword matching, 'substring' (original containment)
+                        or 'token' (whole-word n-grams)
+            use_transformers: Run transformer emotion classification when
+                              transformers is installed
+            use_corpus_index: Read keyword occurrences and tokens from the
+                              positional corpus index instead of scanning
+                              (token match mode only)
+            use_semantic: Score sentences against the coding scheme's
+                          prototype sentences with the sentence embedding
+                          model (requires sentence-transformers)
         """
-        self.sector = sector
-        self.data_path = DATA_DIR / sector
+        if use_corpus_index and match_mode != 'token':
+            raise ValueError("The corpus index requires match_mode='token'")
+        self.match_mode = match_mode
+        self.use_corpus_index = use_corpus_index
+        # Non-default modes get their own output files so results can be diffed
+        self.output_suffix = '' if match_mode == 'substring' else f'_{match_mode}'
         self.texts = {}
         
         # Load coding scheme
         with open(CODING_SCHEME_PATH, 'r', encoding='utf-8') as f:
             self.coding_scheme = json.load(f)
-        
-        # Initialize sentiment analyzer
-        self.sia = SentimentIntensityAnalyzer()
-        self.stop_words = set(stopwords.words('english'))
-        
-        # Initialize transformer models if available
-        if TRANSFORMERS_AVAILABLE:
-            print("Loading transformer models...")
-            self.emotion_classifier = pipeline(
-                "text-classification", 
-                model="j-hartmann/emotion-english-distilroberta-base",
-                return_all_scores=True
-            )
-            self.sentence_model = SentenceTransformer('all-MiniLM-L6-v2')
+        self.coding_scheme_hash = fingerprint(json.dumps(self.coding_scheme, sort_keys=True))
+        
+        # Initialize sentiment analyzer (one instance per process), a
+        # vectorized VADER-compatible scorer
+        ensure_sentence_tokenizer()
+        self.sia = get_vader_scorer()
+        self.stop_words = get_stopwords()
+        
+        # Transformer models are loaded on first use, see emotion_classifier
+        self.use_transformers = use_transformers and TRANSFORMERS_AVAILABLE
+        if use_transformers and not TRANSFORMERS_AVAILABLE:
+            print("Transformers not available. Using basic analysis only.")
+        self.use_semantic = use_semantic and TRANSFORMERS_AVAILABLE
+        if use_semantic and not TRANSFORMERS_AVAILABLE:
+            print("Sentence-transformers not available. Skipping semantic detection.")
+        self._semantic_detector = None
+        # Batched transformer scores per brand, see score_transformer_emotions
+        self.transformer_scores = {}
+        self.max_chunks = None
         
         # Extract manipulation categories and emotions
         self.manipulation_categories = self.coding_scheme['manipulation_categories']
         self.emotion_categories = self.coding_scheme['emotion_categories']
+        self._set_sector(sector)
+        
+        # Compile all coding scheme lexicons into one index
+        self.lexicon_index = LexiconIndex(self.coding_scheme, match_mode)
+        # Negation, intensity modifiers and hedges from the analysis guidelines
+        self.context_scorer = ContextScorer(self.coding_scheme)
+        # Weighted-sum intensity model from intensity_scoring
+        self.intensity_model = IntensityModel(self.coding_scheme)
+        
+    @property
+    def emotion_classifier(self):
+        """Transformer emotion classifier, loaded once per process on first use"""
+        return get_emotion_classifier()
+    
+    @property
+    def sentence_model(self):
+        """Sentence embedding model, loaded once per process on first use"""
+        return get_sentence_model()
+    
+    @property
+    def semantic_detector(self) -> SemanticDetector:
+        """Prototype-based semantic detector, built on first use"""
+        if self._semantic_detector is None:
+            self._semantic_detector = SemanticDetector(
+                self.coding_scheme, get_sentence_model,
+                open_embedding_store(SENTENCE_MODEL)
+            )
+        return self._semantic_detector
+    
+    @property
+    def corpus_index(self):
+        """Positional index of the materials corpus, opened once per process"""
+        return open_corpus_index(DATA_DIR)
+    
+    def indexed_keywords(self, brand_name: str
+                         ) -> Optional[Tuple[Dict[str, List[int]], Dict[str, List[Tuple[str, ...]]]]]:
+        """
+        Keyword offsets and context windows of a brand read from the corpus
+        index, identical to scanning the text in token match mode
+        
+        Returns:
+            Tuple of (keyword_offsets, keyword_windows), or None if the index
+            is disabled or does not hold the current text of the brand
+        """
+        if not self.use_corpus_index:
+            return None
+        index = self.corpus_index
+        if not index.is_current(self.sector, brand_name, self.texts[brand_name]):
+            return None
+        keyword_offsets = index.keyword_offsets(
+            self.sector, brand_name, self.lexicon_index.keywords
+        )
+        windows = keyword_windows(*index.document_tokens(self.sector, brand_name), keyword_offsets)
+        return keyword_offsets, windows
+    
+    def _set_sector(self, sector: str):
+        """Point the analyzer at a sector's data and patterns"""
+        self.sector = sector
+        self.data_path = DATA_DIR / sector
+        self.sector_key = sector_key(sector)
         self.sector_patterns = self.coding_scheme['sector_specific_patterns'].get(
-            sector.lower().replace('_cosmetics', ''), {}
+            self.sector_key, {}
+        )
+    
+    def for_sector(self, sector: str) -> 'EmotionManipulationAnalyzer':
+        """
+        Analyzer for another sector that shares this analyzer's loaded
+        resources (coding scheme, sentiment analyzer, models, lexicon index)
+        """
+        analyzer = copy.copy(self)
+        analyzer._set_sector(sector)
+        analyzer.texts = {}
+        analyzer.transformer_scores = {}
+        return analyzer
+    
+    def cache_key(self, brand_name: str) -> str:
+        """
+        Result cache key of a brand: its text, the coding scheme, the
+        analyzer version and every setting that changes the result
+        """
+        transformer_model = EMOTION_MODEL if self.use_transformers else None
+        sentence_model = SENTENCE_MODEL if self.use_semantic else None
+        return fingerprint(
+            self.texts[brand_name], self.coding_scheme_hash, ANALYZER_VERSION,
+            self.sector, self.match_mode, transformer_model, self.max_chunks, sentence_model
+        )
+    
+    def document_key(self, brand_name: str) -> str:
+        """
+        Document cache key of a brand: like cache_key but without the coding
+        scheme, so document records survive scheme edits
+        """
+        transformer_model = EMOTION_MODEL if self.use_transformers else None
+        return fingerprint(
+            self.texts[brand_name], ANALYZER_VERSION, self.match_mode,
+            transformer_model, self.max_chunks
         )
         
-    def load_texts(self):
-        """Load all text files from the sector directory"""
-        for file_path in self.data_path.glob("*.txt"):
-            brand_name = file_path.stem
-            with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-                self.texts[brand_name] = f.read()
+    def load_texts(self, deduplicate: bool = False):
+        """
+        Load all texts of the sector from the memory-mapped corpus store
+        
+        Args:
+            deduplicate: Load the texts with repeated boilerplate lines removed
+        """
+        self.texts = load_sector_texts(self.sector, DATA_DIR, deduplicate)
         print(f"Loaded {len(self.texts)} brands from {self.sector} sector")
         
-    def detect_manipulation_strategies(self, text: str) -> Dict[str, Dict]:
+    def detect_manipulation_strategies(self, text: str,
+                                       hits: Optional[LexiconHits] = None,
+                                       windows: Optional[Dict[str, List[Tuple[str, ...]]]] = None
+                                       ) -> Dict[str, Dict]:
         """
         Detect manipulation strategies based on coding scheme
         
+        The weighted score scales the count by the category's context factor
+        (negation, intensity modifiers, hedges before each occurrence).
+        
+        Args:
+            text: Document text
+            hits: Lexicon hits of the text, scanned here if not given
+            windows: Preceding tokens of each hit (keyword_windows), collected
+                     here if not given
+        
         Returns:
             Dictionary with detailed manipulation analysis
         """
-        text_lower = text.lower()
+        if hits is None or windows is None:
+            text_lower = lowercase_preserving_offsets(text)
+            tokenized = tokenize(text_lower)
+            if hits is None:
+                hits = self.lexicon_index.scan(text, text_lower, tokenized)
+            windows = keyword_windows(*tokenized, hits.keyword_offsets)
+        context = self.context_scorer.score(hits, windows)
         results = {}
         
         for category, details in self.manipulation_categories.items():
             keywords = details['keywords']
             weight = details['intensity_weight']
             
-            # Count keyword occurrences
+            # Slice context windows around each occurrence
             matches = []
             for keyword in keywords:
-                if keyword in text_lower:
-                    # Find all occurrences with context
-                    pattern = re.compile(
-                        r'.{0,30}' + re.escape(keyword) + r'.{0,30}',
-                        re.IGNORECASE
-                    )
-                    contexts = pattern.findall(text)
-                    matches.extend([(keyword, context) for context in contexts])
+                starts = hits.offsets(keyword)
+                if starts:
+                    spans = keyword_contexts(text, starts, len(keyword))
+                    matches.extend([(keyword, text[start:end]) for start, end in spans])
             
             results[category] = {
                 'count': len(matches),
                 'unique_keywords': len(set([m[0] for m in matches])),
                 'intensity_weight': weight,
-                'weighted_score': len(matches) * weight,
+                'context_count': len(matches) * context[category]['context_factor'],
+                'weighted_score': len(matches) * context[category]['context_factor'] * weight,
+                **context[category],
                 'examples': matches[:3] if matches else []  # Store first 3 examples
             }
             
         return results
     
-    def analyze_emotions(self, text: str) -> Dict[str, any]:
+    def analyze_sentiment(self, document: Union[str, ParsedDocument]) -> Dict[str, Dict]:
+        """
+        VADER and TextBlob sentiment of a text (independent of the coding scheme)
+        
+        Args:
+            document: Text or parsed document (which records stage timings)
+        
+        Returns:
+            Dictionary with 'vader_sentiment' and 'textblob_sentiment' scores
+        """
+        if isinstance(document, str):
+            document = ParsedDocument(document)
+        
+        with document.timed('vader'):
+            vader_scores = self.sia.polarity_scores(document.text)
+        # TextBlob's pattern analyzer uses its own word splitting
+        with document.timed('textblob'):
+            sentiment = TextBlob(document.text).sentiment
+        return {
+            'vader_sentiment': vader_scores,
+            'textblob_sentiment': {
+                'polarity': sentiment.polarity,
+                'subjectivity': sentiment.subjectivity
+            }
+        }
+    
+    def analyze_emotions(self, text: str,
+                         hits: Optional[LexiconHits] = None,
+                         transformer_emotions: Optional[Dict[str, float]] = None,
+                         sentiment: Optional[Dict[str, Dict]] = None) -> Dict[str, any]:
         """
         Comprehensive emotion analysis using multiple methods
         
+        Args:
+            text: Document text
+            hits: Lexicon hits of the text, scanned here if not given
+            transformer_emotions: Precomputed transformer scores of the text,
+                                  classified here if not given
+            sentiment: Precomputed analyze_sentiment() result of the text
+        
         Returns:
             Dictionary with emotion scores and classifications
         """
@@ -144,25 +328,17 @@ class EmotionManipulationAnalyzer:
             'transformer_emotions': {}
         }
         
-        # VADER sentiment analysis
-        vader_scores = self.sia.polarity_scores(text)
-        results['vader_sentiment'] = vader_scores
-        
-        # TextBlob sentiment
-        blob = TextBlob(text)
-        results['textblob_sentiment'] = {
-            'polarity': blob.sentiment.polarity,
-            'subjectivity': blob.sentiment.subjectivity
-        }
+        # VADER and TextBlob sentiment
+        results.update(sentiment if sentiment is not None else self.analyze_sentiment(text))
         
         # Emotion keyword detection based on coding scheme
-        text_lower = text.lower()
-        for emotion, details in self.emotion_categories.items():
-            markers = details['linguistic_markers']
-            intensity_indicators = details['intensity_indicators']
-            
-            marker_count = sum(1 for marker in markers if marker in text_lower)
-            intensity_count = sum(1 for indicator in intensity_indicators if indicator in text_lower)
+        if hits is None:
+            hits = self.lexicon_index.scan(text)
+        marker_counts = hits.presence(EMOTION_MARKER)
+        intensity_counts = hits.presence(EMOTION_INTENSITY)
+        for emotion in self.emotion_categories:
+            marker_count = marker_counts[emotion]
+            intensity_count = intensity_counts[emotion]
             
             results['emotion_keywords'][emotion] = {
                 'marker_count': marker_count,
@@ -171,96 +347,199 @@ class EmotionManipulationAnalyzer:
             }
         
         # Transformer-based emotion classification if available
-        if TRANSFORMERS_AVAILABLE:
-            # Split text into chunks if too long
-            max_length = 512
-            chunks = [text[i:i+max_length] for i in range(0, len(text), max_length)]
-            
-            all_emotions = defaultdict(list)
-            for chunk in chunks[:5]:  # Analyze first 5 chunks max
-                emotions = self.emotion_classifier(chunk)[0]
-                for emotion_dict in emotions:
-                    all_emotions[emotion_dict['label']].append(emotion_dict['score'])
-            
-            # Average scores across chunks
-            results['transformer_emotions'] = {
-                emotion: np.mean(scores) 
-                for emotion, scores in all_emotions.items()
-            }
+        if transformer_emotions is not None:
+            results['transformer_emotions'] = transformer_emotions
+        elif self.use_transformers:
+            # Sentence-aligned chunks over the whole text, length-weighted average
+            results['transformer_emotions'] = classify_documents(
+                {'text': ParsedDocument(text).sentences}, self.emotion_classifier
+            )['text']
         
         return results
     
-    def calculate_manipulation_intensity(self, manipulation_results: Dict) -> float:
+    def intensity_statistics(self, text: str, hits: LexiconHits,
+                             text_statistics: Dict) -> Dict[str, int]:
         """
-        Calculate overall manipulation intensity score
+        Per-document statistics of the intensity model, from the lexicon
+        hits (no text scan)
         
         Returns:
-            Normalized intensity score (0-1)
+            Dictionary with the intensity_model.STATISTIC_COLUMNS
         """
-        total_weighted_score = sum(
-            cat['weighted_score'] for cat in manipulation_results.values()
-        )
-        
-        # Normalize based on text length (rough approximation)
-        max_expected_score = 50  # Adjust based on empirical observation
-        intensity = min(total_weighted_score / max_expected_score, 1.0)
-        
-        return intensity
+        lead_end = len(text) * LEAD_SHARE
+        keyword_hits = distinct_keywords = lead_hits = 0
+        for details in self.manipulation_categories.values():
+            for keyword in details['keywords']:
+                offsets = hits.offsets(keyword)
+                if offsets:
+                    keyword_hits += len(offsets)
+                    distinct_keywords += 1
+                    lead_hits += bisect.bisect_left(offsets, lead_end)
+        
+        return {
+            'stat_tokens': text_statistics['total_words'],
+            'stat_keyword_hits': keyword_hits,
+            'stat_distinct_keywords': distinct_keywords,
+            'stat_emotion_intensity_hits': sum(hits.counts(EMOTION_INTENSITY).values()),
+            'stat_lead_hits': lead_hits
+        }
     
-    def identify_sector_patterns(self, text: str) -> Dict[str, int]:
+    def identify_sector_patterns(self, text: str,
+                                 hits: Optional[LexiconHits] = None) -> Dict[str, int]:
         """
         Identify sector-specific patterns
         
+        Args:
+            text: Document text
+            hits: Lexicon hits of the text, scanned here if not given
+        
         Returns:
             Count of sector-specific markers
         """
         if not self.sector_patterns:
             return {}
         
-        text_lower = text.lower()
-        unique_markers = self.sector_patterns.get('unique_markers', [])
-        
-        marker_counts = {}
-        for marker in unique_markers:
-            marker_counts[marker] = text_lower.count(marker)
-            
-        return marker_counts
+        if hits is None:
+            hits = self.lexicon_index.scan(text)
+        return hits.keyword_counts(SECTOR_MARKER, self.sector_key)
     
-    def analyze_brand_comprehensive(self, brand_name: str) -> Dict:
+    def index_document(self, brand_name: str) -> Dict:
         """
-        Comprehensive analysis of a single brand's marketing discourse
+        Coding-scheme-independent part of a brand analysis: text statistics,
+        sentiment and the keyword occurrence index of the text
         
         Returns:
-            Complete analysis results for the brand
+            Document record, turned into the full analysis by score_document
         """
         if brand_name not in self.texts:
             raise ValueError(f"Brand {brand_name} not found")
             
+        # Tokenized once; every component below reuses the same parse
+        document = parse_document(self.texts, brand_name)
+        sentiment = self.analyze_sentiment(document)
+        
+        # Single lexicon scan shared by all keyword-based analyses, and the
+        # preceding tokens of every hit for context scoring
+        with document.timed('keywords'):
+            indexed = self.indexed_keywords(brand_name)
+        if indexed is not None:
+            keyword_offsets, windows = indexed
+        else:
+            tokenized = document.keyword_tokens
+            with document.timed('keywords'):
+                keyword_offsets = self.lexicon_index.scan(
+                    document.text, document.text_lower, tokenized
+                ).keyword_offsets
+            with document.timed('keyword_windows'):
+                windows = keyword_windows(*tokenized, keyword_offsets)
+        
+        # Linguistic features
+        sentence_count = len(document.sentence_spans)
+        word_count = len(document.words)
+        
+        return {
+            'brand': brand_name,
+            'text_statistics': {
+                'total_words': word_count,
+                'total_sentences': sentence_count,
+                'avg_sentence_length': word_count / sentence_count if sentence_count else 0
+            },
+            'sentiment': sentiment,
+            'transformer_emotions': self.transformer_scores.get(brand_name),
+            'keyword_offsets': keyword_offsets,
+            'keyword_windows': windows,
+            'scanned_keywords': list(self.lexicon_index.keywords),
+            # Sentence boundaries for semantic detection at scoring time
+            'sentence_spans': document.sentence_spans,
+            'timings': document.timings
+        }
+    
+    def update_document(self, brand_name: str, document: Dict) -> bool:
+        """
+        Bring a stored document record up to date with this analyzer: scan
+        for keywords added to the coding scheme since it was indexed, and
+        add transformer scores classified after indexing
+        
+        Returns:
+            True if the record changed
+        """
+        changed = False
+        offsets = self.lexicon_index.update_offsets(
+            self.texts[brand_name], document['keyword_offsets'], document['scanned_keywords']
+        )
+        if offsets is not document['keyword_offsets']:
+            document['keyword_offsets'] = offsets
+            # Windows of stored hits are unchanged; the text is only
+            # tokenized again if a new keyword occurs in it
+            windows = document['keyword_windows']
+            new_hits = {
+                keyword: keyword_offsets for keyword, keyword_offsets in offsets.items()
+                if keyword not in windows
+            }
+            windows = dict(windows)
+            windows.update(dict.fromkeys(new_hits, []))
+            if any(new_hits.values()):
+                windows.update(keyword_windows(
+                    *tokenize(lowercase_preserving_offsets(self.texts[brand_name])), new_hits
+                ))
+            document['keyword_windows'] = windows
+            document['scanned_keywords'] = sorted(
+                set(document['scanned_keywords']).union(self.lexicon_index.keywords)
+            )
+            changed = True
+        
+        if document['transformer_emotions'] is None and brand_name in self.transformer_scores:
+            document['transformer_emotions'] = self.transformer_scores[brand_name]
+            changed = True
+        
+        if self.use_semantic and 'sentence_spans' not in document:
+            document['sentence_spans'] = list(
+                get_sentence_splitter().span_tokenize(self.texts[brand_name])
+            )
+            changed = True
+        return changed
+    
+    def score_document(self, brand_name: str, document: Dict) -> Dict:
+        """
+        Apply the coding scheme to a document record (no tokenization or
+        sentiment scoring, so re-scoring after a scheme edit is fast)
+        
+        Returns:
+            Complete analysis results for the brand
+        """
         text = self.texts[brand_name]
+        hits = self.lexicon_index.hits(document['keyword_offsets'])
         
         # Core analyses
-        manipulation_strategies = self.detect_manipulation_strategies(text)
-        emotion_analysis = self.analyze_emotions(text)
-        manipulation_intensity = self.calculate_manipulation_intensity(manipulation_strategies)
-        sector_patterns = self.identify_sector_patterns(text)
-        
-        # Linguistic features
-        sentences = sent_tokenize(text)
-        words = word_tokenize(text.lower())
+        manipulation_strategies = self.detect_manipulation_strategies(
+            text, hits, document['keyword_windows']
+        )
+        emotion_analysis = self.analyze_emotions(
+            text, hits, document['transformer_emotions'], document['sentiment']
+        )
+        # Intensity is scored for all brands at once (IntensityModel.apply)
+        intensity_statistics = self.intensity_statistics(
+            text, hits, document['text_statistics']
+        )
+        sector_patterns = self.identify_sector_patterns(text, hits)
+        # Embeddings were stored by embed_sentences() before scoring
+        semantic_manipulation = self.semantic_detector.detect(
+            [text[start:end] for start, end in document['sentence_spans']]
+        ) if self.use_semantic else {}
         
         # Compile results
         analysis = {
             'brand': brand_name,
             'sector': self.sector,
-            'text_statistics': {
-                'total_words': len(words),
-                'total_sentences': len(sentences),
-                'avg_sentence_length': len(words) / len(sentences) if sentences else 0
-            },
+            'text_statistics': document['text_statistics'],
             'manipulation_strategies': manipulation_strategies,
             'emotion_analysis': emotion_analysis,
-            'manipulation_intensity': manipulation_intensity,
+            'intensity_statistics': intensity_statistics,
             'sector_specific_patterns': sector_patterns,
+            'semantic_manipulation': semantic_manipulation,
+            # Occurrence detail for the keyword_hits and sentence_scores tables
+            'keyword_offsets': document['keyword_offsets'],
+            'sentence_spans': document['sentence_spans'],
             'dominant_strategy': max(
                 manipulation_strategies.keys(),
                 key=lambda k: manipulation_strategies[k]['weighted_score']
@@ -273,130 +552,241 @@ class EmotionManipulationAnalyzer:
         
         return analysis
     
-    def analyze_all_brands(self) -> pd.DataFrame:
+    def analyze_brand_streaming(self, brand_name: str,
+                                sentence_sink: Optional[Callable[[Dict], None]] = None,
+                                chunk_size: int = CHUNK_SIZE) -> Dict:
         """
-        Analyze all brands and compile results into DataFrame
+        Sentence-level analysis of a brand file streamed from disk in
+        bounded chunks; the text is never held in memory as a whole
+        
+        Args:
+            brand_name: Brand file name without extension
+            sentence_sink: Optional callback receiving every per-sentence row
+            chunk_size: Characters read from the file at a time
         
         Returns:
-            DataFrame with comprehensive analysis results
-        """
-        all_results = []
-        
-        for brand_name in self.texts:
-            try:
-                print(f"Analyzing {brand_name}...")
-                analysis = self.analyze_brand_comprehensive(brand_name)
-                
-                # Flatten results for DataFrame
-                flat_result = {
-                    'brand': brand_name,
-                    'sector': self.sector,
-                    'word_count': analysis['text_statistics']['total_words'],
-                    'sentence_count': analysis['text_statistics']['total_sentences'],
-                    'avg_sentence_length': analysis['text_statistics']['avg_sentence_length'],
-                    'manipulation_intensity': analysis['manipulation_intensity'],
-                    'dominant_strategy': analysis['dominant_strategy'],
-                    'dominant_emotion': analysis['dominant_emotion']
-                }
-                
-                # Add manipulation strategy counts
-                for strategy, details in analysis['manipulation_strategies'].items():
-                    flat_result[f'strat_{strategy}'] = details['count']
-                    flat_result[f'strat_{strategy}_weighted'] = details['weighted_score']
-                
-                # Add emotion scores
-                for emotion, scores in analysis['emotion_analysis']['emotion_keywords'].items():
-                    flat_result[f'emotion_{emotion}'] = scores['total_score']
-                
-                # Add sentiment scores
-                flat_result['vader_compound'] = analysis['emotion_analysis']['vader_sentiment']['compound']
-                flat_result['textblob_polarity'] = analysis['emotion_analysis']['textblob_sentiment']['polarity']
-                flat_result['textblob_subjectivity'] = analysis['emotion_analysis']['textblob_sentiment']['subjectivity']
-                
-                all_results.append(flat_result)
-                
-            except Exception as e:
-                print(f"Error analyzing {brand_name}: {e}")
-                
-        return pd.DataFrame(all_results)
-    
-    def visualize_manipulation_profile(self, df: pd.DataFrame):
+            Running aggregates of the per-sentence scores
         """
-        Create comprehensive visualizations of manipulation profiles
+        file_path = self.data_path / f"{brand_name}.txt"
+        if not file_path.exists():
+            raise ValueError(f"Brand {brand_name} not found")
+        
+        sentences = stream_sentences(read_chunks(file_path, chunk_size), get_sentence_splitter())
+        summary = analyze_stream(sentences, SentenceAggregator(self), sentence_sink)
+        return {'brand': brand_name, 'sector': self.sector, **summary}
+    
+    def flatten_sentence_summary(self, summary: Dict) -> Dict:
         """
-        fig = plt.figure(figsize=(20, 12))
+        Flatten streaming sentence aggregates into one DataFrame row
+        """
+        flat_result = {
+            'brand': summary['brand'],
+            'sector': self.sector,
+            'sentence_count': summary['sentence_count'],
+            'word_count': summary['word_count']
+        }
         
-        # 1. Manipulation Strategy Heatmap
-        ax1 = plt.subplot(2, 3, 1)
-        strategy_cols = [col for col in df.columns if col.startswith('strat_') and not col.endswith('_weighted')]
-        strategy_data = df.set_index('brand')[strategy_cols]
-        strategy_data.columns = [col.replace('strat_', '') for col in strategy_data.columns]
+        for metric in ['vader_compound', 'textblob_polarity', 'textblob_subjectivity']:
+            for statistic in ['mean', 'std', 'min', 'max']:
+                flat_result[f'{metric}_{statistic}'] = summary[metric][statistic]
+        for label, share in summary['sentiment_distribution'].items():
+            flat_result[f'share_{label}_sentences'] = share
+        flat_result['share_manipulative_sentences'] = summary['manipulative_sentence_share']
         
-        sns.heatmap(strategy_data.T, annot=True, fmt='.0f', cmap='YlOrRd', ax=ax1, cbar_kws={'label': 'Count'})
-        ax1.set_title(f'Manipulation Strategies - {self.sector}', fontsize=12, fontweight='bold')
-        ax1.set_xlabel('Brand')
-        ax1.set_ylabel('Strategy')
+        for strategy, count in summary['manipulation_counts'].items():
+            flat_result[f'strat_{strategy}'] = count
+        for emotion, count in summary['emotion_counts'].items():
+            flat_result[f'emotion_{emotion}'] = count
         
-        # 2. Emotion Distribution
-        ax2 = plt.subplot(2, 3, 2)
-        emotion_cols = [col for col in df.columns if col.startswith('emotion_')]
-        emotion_data = df[emotion_cols].mean()
-        emotion_data.index = [idx.replace('emotion_', '') for idx in emotion_data.index]
-        
-        emotion_data.plot(kind='bar', ax=ax2, color='steelblue')
-        ax2.set_title(f'Average Emotion Scores - {self.sector}', fontsize=12, fontweight='bold')
-        ax2.set_xlabel('Emotion')
-        ax2.set_ylabel('Average Score')
-        ax2.tick_params(axis='x', rotation=45)
-        
-        # 3. Manipulation Intensity by Brand
-        ax3 = plt.subplot(2, 3, 3)
-        intensity_data = df.set_index('brand')['manipulation_intensity'].sort_values(ascending=False)
-        
-        colors = ['red' if x > 0.66 else 'orange' if x > 0.33 else 'green' for x in intensity_data.values]
-        intensity_data.plot(kind='barh', ax=ax3, color=colors)
-        ax3.set_title(f'Manipulation Intensity - {self.sector}', fontsize=12, fontweight='bold')
-        ax3.set_xlabel('Intensity Score')
-        ax3.set_ylabel('Brand')
-        
-        # 4. Sentiment Distribution
-        ax4 = plt.subplot(2, 3, 4)
-        df[['vader_compound', 'textblob_polarity']].boxplot(ax=ax4)
-        ax4.set_title(f'Sentiment Distribution - {self.sector}', fontsize=12, fontweight='bold')
-        ax4.set_ylabel('Sentiment Score')
-        
-        # 5. Strategy vs Emotion Correlation
-        ax5 = plt.subplot(2, 3, 5)
-        dominant_strategies = df['dominant_strategy'].value_counts()
-        dominant_strategies.plot(kind='pie', ax=ax5, autopct='%1.1f%%')
-        ax5.set_title(f'Dominant Strategies - {self.sector}', fontsize=12, fontweight='bold')
-        ax5.set_ylabel('')
-        
-        # 6. Text Complexity
-        ax6 = plt.subplot(2, 3, 6)
-        df.plot.scatter(x='word_count', y='avg_sentence_length', ax=ax6, s=50)
-        for idx, row in df.iterrows():
-            ax6.annotate(row['brand'], (row['word_count'], row['avg_sentence_length']),
-                        fontsize=8, alpha=0.7)
-        ax6.set_title(f'Text Complexity - {self.sector}', fontsize=12, fontweight='bold')
-        ax6.set_xlabel('Word Count')
-        ax6.set_ylabel('Avg Sentence Length')
-        
-        plt.suptitle(f'Manipulation Analysis Dashboard - {self.sector} Sector', 
-                     fontsize=16, fontweight='bold', y=1.02)
-        plt.tight_layout()
-        
-        # Save figure
-        output_path = RESULTS_DIR / f'{self.sector}_manipulation_dashboard.png'
-        plt.savefig(output_path, dpi=300, bbox_inches='tight')
-        plt.show()
-        
-        print(f"Dashboard saved to {output_path}")
+        return flat_result
+    
+    def analyze_brand_comprehensive(self, brand_name: str) -> Dict:
+        """
+        Comprehensive analysis of a single brand's marketing discourse
+        
+        Returns:
+            Complete analysis results for the brand (intensity is scored
+            over result rows, see score_intensity)
+        """
+        return self.score_document(brand_name, self.index_document(brand_name))
+    
+    def flatten_analysis(self, analysis: Dict) -> Dict:
+        """
+        Flatten a comprehensive brand analysis into one DataFrame row
+        
+        The intensity columns are left empty; score_intensity() fills them
+        in for a DataFrame of rows at once.
+        """
+        flat_result = {
+            'brand': analysis['brand'],
+            'sector': self.sector,
+            'word_count': analysis['text_statistics']['total_words'],
+            'sentence_count': analysis['text_statistics']['total_sentences'],
+            'avg_sentence_length': analysis['text_statistics']['avg_sentence_length'],
+            'manipulation_intensity': None,
+            'intensity_level': None,
+            'dominant_strategy': analysis['dominant_strategy'],
+            'dominant_emotion': analysis['dominant_emotion'],
+            **dict.fromkeys(self.intensity_model.factor_columns),
+            # Inputs of the intensity model, see IntensityModel.apply
+            **analysis['intensity_statistics']
+        }
+        
+        # Add manipulation strategy counts
+        for strategy, details in analysis['manipulation_strategies'].items():
+            flat_result[f'strat_{strategy}'] = details['count']
+            flat_result[f'strat_{strategy}_weighted'] = details['weighted_score']
+        
+        # Add emotion scores
+        for emotion, scores in analysis['emotion_analysis']['emotion_keywords'].items():
+            flat_result[f'emotion_{emotion}'] = scores['total_score']
+        
+        # Add sentiment scores
+        flat_result['vader_compound'] = analysis['emotion_analysis']['vader_sentiment']['compound']
+        flat_result['textblob_polarity'] = analysis['emotion_analysis']['textblob_sentiment']['polarity']
+        flat_result['textblob_subjectivity'] = analysis['emotion_analysis']['textblob_sentiment']['subjectivity']
+        
+        # Add transformer emotion scores when available
+        for emotion, score in analysis['emotion_analysis']['transformer_emotions'].items():
+            flat_result[f'transformer_{emotion}'] = score
+        
+        # Add semantic (prototype similarity) detection when enabled
+        for strategy, details in analysis.get('semantic_manipulation', {}).items():
+            flat_result[f'semantic_{strategy}'] = details['sentences']
+            flat_result[f'semantic_{strategy}_share'] = details['share']
+        
+        return flat_result
+    
+    def score_transformer_emotions(self, batch_size: int = 32,
+                                   max_chunks: Optional[int] = None):
+        """
+        Classify all loaded brands in shared batches before per-brand analysis
+        
+        Args:
+            batch_size: Number of chunks per forward pass
+            max_chunks: Optional cap on chunks per brand (self.max_chunks if None)
+        """
+        if not self.use_transformers:
+            return
+        print(f"Classifying emotions for {len(self.texts)} brands...")
+        sentences = {
+            brand_name: parse_document(self.texts, brand_name).sentences
+            for brand_name in self.texts
+        }
+        self.transformer_scores.update(classify_documents(
+            sentences, self.emotion_classifier, batch_size, max_chunks or self.max_chunks
+        ))
+    
+    def embed_sentences(self, analyzers: Dict[str, 'EmotionManipulationAnalyzer']):
+        """
+        Embed the sentences of every loaded brand of the analyzers in one
+        batch before scoring, so semantic detection only reads the store
+        
+        Args:
+            analyzers: Dictionary mapping sector to an analyzer with loaded texts
+        """
+        if not self.use_semantic:
+            return
+        documents = [
+            parse_document(analyzer.texts, brand_name).sentences
+            for analyzer in analyzers.values()
+            for brand_name in analyzer.texts
+        ]
+        print(f"Embedding sentences of {len(documents)} brands...")
+        self.semantic_detector.prefetch(documents)
+    
+    def analyze_all_brands(self, workers: int = 1,
+                           cache: Optional[ResultCache] = None,
+                           document_cache: Optional[ResultCache] = None,
+                           write_tables: bool = True) -> pd.DataFrame:
+        """
+        Analyze all brands and compile results into DataFrame
+        
+        Args:
+            workers: Number of worker processes; 1 analyzes in this process
+            cache: Optional cache of complete results; only brands whose
+                   inputs changed are analyzed again
+            document_cache: Optional cache of document records; after a
+                            coding scheme edit brands are only re-scored
+            write_tables: Also write the sector's Parquet result tables if
+                          pyarrow is installed
+        
+        Returns:
+            DataFrame with comprehensive analysis results, in brand load order
+        """
+        def prepare(unindexed):
+            # Transformer inference runs batched across brands in this process
+            for analyzer in unindexed.values():
+                analyzer.score_transformer_emotions()
+        
+        analyses = {}
+        stage_timings = StageTimings()
+        if self.use_corpus_index:
+            # Built here if stale, before worker processes open it
+            open_corpus_index(DATA_DIR)
+        table_writer = None
+        if write_tables and PYARROW_AVAILABLE:
+            table_writer = ResultTableWriter([self.sector], self.output_suffix, RESULTS_DIR)
+        elif write_tables:
+            print("pyarrow not available. Skipping Parquet result tables.")
+        # Workers skip the transformer models; scores are merged back here
+        for _, brand_name, analysis, error in run_incremental_jobs(
+                {self.sector: self}, (self.sector, self.match_mode, False, self.use_corpus_index),
+                workers,
+                cache, document_cache, prepare, stage_timings, self.embed_sentences):
+            if error is not None:
+                print(f"Error analyzing {brand_name}: {error}")
+                continue
+            analyses[brand_name] = analysis
+            if table_writer is not None:
+                table_writer.write_brand(self, brand_name, analysis)
+        if stage_timings.documents:
+            print(stage_timings.report())
+        
+        df = self.score_intensity(pd.DataFrame([
+            self.flatten_analysis(analyses[brand_name])
+            for brand_name in self.texts if brand_name in analyses
+        ]))
+        if table_writer is not None:
+            if not df.empty:
+                table_writer.write_brand_metrics(self.sector, df)
+            print(table_writer.summary())
+        return df
+    
+    def score_intensity(self, df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Fill in the intensity columns of flat result rows, vectorized over
+        all brands
+        """
+        return self.intensity_model.apply(df)
+    
+    def dashboard_job(self, df: pd.DataFrame) -> ChartJob:
+        """Chart job of the sector's manipulation dashboard"""
+        return ChartJob(
+            RESULTS_DIR / f'{self.sector}_manipulation_dashboard{self.output_suffix}.png',
+            draw_manipulation_dashboard, (df, self.sector)
+        )
+    
+    def visualize_manipulation_profile(self, df: pd.DataFrame, preview: bool = False):
+        """
+        Create comprehensive visualizations of manipulation profiles
+        
+        Args:
+            df: Flat results of the sector
+            preview: Low-resolution preview instead of the 300 dpi figure
+        """
+        render_charts([self.dashboard_job(df)], preview=preview)
     
     def generate_detailed_report(self, df: pd.DataFrame) -> str:
         """
         Generate a detailed analytical report
         """
+        # Brands per level of the coding scheme's intensity thresholds
+        intensity_levels = ''.join(
+            f"- **{name.title()} Intensity ({low:g}-{high:g}):** "
+            f"{(df['intensity_level'] == name).sum()} brands\n"
+            for name, (low, high) in reversed(self.intensity_model.levels)
+        )
         report = f"""
 # Emotion-Based Manipulation Analysis Report
 ## Sector: {self.sector}
@@ -413,10 +803,7 @@ class EmotionManipulationAnalyzer:
 - **Average Sentence Complexity:** {df['avg_sentence_length'].mean():.1f} words/sentence
 
 ### Manipulation Intensity
-- **High Intensity (>0.66):** {len(df[df['manipulation_intensity'] > 0.66])} brands
-- **Medium Intensity (0.33-0.66):** {len(df[(df['manipulation_intensity'] > 0.33) & (df['manipulation_intensity'] <= 0.66)])} brands
-- **Low Intensity (<0.33):** {len(df[df['manipulation_intensity'] <= 0.33])} brands
-- **Average Intensity:** {df['manipulation_intensity'].mean():.3f}
+{intensity_levels}- **Average Intensity:** {df['manipulation_intensity'].mean():.3f}
 
 ---
 
@@ -527,7 +914,7 @@ Results should be validated through manual review for critical applications.*
 """
         
         # Save report
-        report_path = RESULTS_DIR / f'{self.sector}_detailed_report.md'
+        report_path = RESULTS_DIR / f'{self.sector}_detailed_report{self.output_suffix}.md'
         with open(report_path, 'w', encoding='utf-8') as f:
             f.write(report)
         
@@ -535,46 +922,302 @@ Results should be validated through manual review for critical applications.*
         return report
 
 
-def main():
+def draw_manipulation_dashboard(df: pd.DataFrame, sector: str):
+    """
+    Six-panel manipulation profile of one sector's brands
+    
+    Args:
+        df: Flat results of the sector (flatten_analysis rows)
+        sector: Sector name for the titles
+    """
+    # Plotting libraries are slow to import and only needed here
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+
+    fig = plt.figure(figsize=(20, 12))
+    
+    # 1. Manipulation Strategy Heatmap
+    ax1 = plt.subplot(2, 3, 1)
+    strategy_cols = [col for col in df.columns if col.startswith('strat_') and not col.endswith('_weighted')]
+    strategy_data = df.set_index('brand')[strategy_cols]
+    strategy_data.columns = [col.replace('strat_', '') for col in strategy_data.columns]
+    
+    sns.heatmap(strategy_data.T, annot=True, fmt='.0f', cmap='YlOrRd', ax=ax1, cbar_kws={'label': 'Count'})
+    ax1.set_title(f'Manipulation Strategies - {sector}', fontsize=12, fontweight='bold')
+    ax1.set_xlabel('Brand')
+    ax1.set_ylabel('Strategy')
+    
+    # 2. Emotion Distribution
+    ax2 = plt.subplot(2, 3, 2)
+    emotion_cols = [col for col in df.columns if col.startswith('emotion_')]
+    emotion_data = df[emotion_cols].mean()
+    emotion_data.index = [idx.replace('emotion_', '') for idx in emotion_data.index]
+    
+    emotion_data.plot(kind='bar', ax=ax2, color='steelblue')
+    ax2.set_title(f'Average Emotion Scores - {sector}', fontsize=12, fontweight='bold')
+    ax2.set_xlabel('Emotion')
+    ax2.set_ylabel('Average Score')
+    ax2.tick_params(axis='x', rotation=45)
+    
+    # 3. Manipulation Intensity by Brand
+    ax3 = plt.subplot(2, 3, 3)
+    brand_intensity = df.set_index('brand')
+    intensity_data = brand_intensity['manipulation_intensity'].sort_values(ascending=False)
+    
+    # Bars follow the coding scheme's intensity levels, as in the report
+    level_colors = {'high': 'red', 'medium': 'orange', 'low': 'green'}
+    colors = [
+        level_colors.get(level, 'gray')
+        for level in brand_intensity.loc[intensity_data.index, 'intensity_level']
+    ]
+    intensity_data.plot(kind='barh', ax=ax3, color=colors)
+    ax3.set_title(f'Manipulation Intensity - {sector}', fontsize=12, fontweight='bold')
+    ax3.set_xlabel('Intensity Score')
+    ax3.set_ylabel('Brand')
+    
+    # 4. Sentiment Distribution
+    ax4 = plt.subplot(2, 3, 4)
+    df[['vader_compound', 'textblob_polarity']].boxplot(ax=ax4)
+    ax4.set_title(f'Sentiment Distribution - {sector}', fontsize=12, fontweight='bold')
+    ax4.set_ylabel('Sentiment Score')
+    
+    # 5. Strategy vs Emotion Correlation
+    ax5 = plt.subplot(2, 3, 5)
+    dominant_strategies = df['dominant_strategy'].value_counts()
+    dominant_strategies.plot(kind='pie', ax=ax5, autopct='%1.1f%%')
+    ax5.set_title(f'Dominant Strategies - {sector}', fontsize=12, fontweight='bold')
+    ax5.set_ylabel('')
+    
+    # 6. Text Complexity
+    ax6 = plt.subplot(2, 3, 6)
+    df.plot.scatter(x='word_count', y='avg_sentence_length', ax=ax6, s=50)
+    for idx, row in df.iterrows():
+        ax6.annotate(row['brand'], (row['word_count'], row['avg_sentence_length']),
+                    fontsize=8, alpha=0.7)
+    ax6.set_title(f'Text Complexity - {sector}', fontsize=12, fontweight='bold')
+    ax6.set_xlabel('Word Count')
+    ax6.set_ylabel('Avg Sentence Length')
+    
+    plt.suptitle(f'Manipulation Analysis Dashboard - {sector} Sector', 
+                 fontsize=16, fontweight='bold', y=1.02)
+    plt.tight_layout()
+    
+    return fig
+
+
+def draw_cross_sector_comparison(combined_df: pd.DataFrame):
+    """
+    Four-panel comparison of intensity, strategies, emotions and sentiment
+    across sectors
+    
+    Args:
+        combined_df: Flat results of all sectors
+    """
+    # Plotting libraries are slow to import and only needed here
+    import matplotlib.pyplot as plt
+    
+    fig, axes = plt.subplots(2, 2, figsize=(15, 12))
+    
+    # Manipulation intensity by sector
+    ax1 = axes[0, 0]
+    combined_df.boxplot(column='manipulation_intensity', by='sector', ax=ax1)
+    ax1.set_title('Manipulation Intensity Across Sectors')
+    ax1.set_xlabel('Sector')
+    ax1.set_ylabel('Intensity Score')
+    plt.sca(ax1)
+    plt.xticks(rotation=45)
+    
+    # Dominant strategies by sector
+    ax2 = axes[0, 1]
+    strategy_sector = combined_df.groupby(['sector', 'dominant_strategy']).size().unstack(fill_value=0)
+    strategy_sector.T.plot(kind='bar', stacked=True, ax=ax2)
+    ax2.set_title('Dominant Strategies by Sector')
+    ax2.set_xlabel('Strategy')
+    ax2.set_ylabel('Count')
+    ax2.legend(title='Sector')
+    plt.sca(ax2)
+    plt.xticks(rotation=45)
+    
+    # Emotion distribution by sector
+    ax3 = axes[1, 0]
+    emotion_cols = [col for col in combined_df.columns if col.startswith('emotion_')]
+    emotion_by_sector = combined_df.groupby('sector')[emotion_cols].mean()
+    emotion_by_sector.T.plot(kind='bar', ax=ax3)
+    ax3.set_title('Average Emotion Scores by Sector')
+    ax3.set_xlabel('Emotion')
+    ax3.set_ylabel('Average Score')
+    ax3.legend(title='Sector')
+    plt.sca(ax3)
+    plt.xticks(rotation=45)
+    
+    # Sentiment comparison
+    ax4 = axes[1, 1]
+    sentiment_by_sector = combined_df.groupby('sector')[['vader_compound', 'textblob_polarity']].mean()
+    sentiment_by_sector.plot(kind='bar', ax=ax4)
+    ax4.set_title('Average Sentiment by Sector')
+    ax4.set_xlabel('Sector')
+    ax4.set_ylabel('Sentiment Score')
+    ax4.legend(['VADER Compound', 'TextBlob Polarity'])
+    plt.sca(ax4)
+    plt.xticks(rotation=45)
+    
+    plt.suptitle('Cross-Sector Manipulation Analysis', fontsize=16, fontweight='bold')
+    plt.tight_layout()
+    
+    return fig
+
+
+def main(match_mode: str = 'substring', workers: int = 1,
+         batch_size: int = 32, max_chunks: Optional[int] = None,
+         use_transformers: bool = True, use_cache: bool = True,
+         cache_max_bytes: int = DEFAULT_MAX_BYTES, use_corpus_index: bool = False,
+         deduplicate: bool = False, use_semantic: bool = False,
+         write_tables: bool = True, preview: bool = False):
     """
     Main execution pipeline for emotion-based manipulation analysis
+    
+    Args:
+        match_mode: Keyword matching mode passed to every analyzer
+        workers: Number of worker processes shared by all sectors
+        batch_size: Chunks per transformer forward pass
+        max_chunks: Optional cap on transformer chunks per brand
+        use_transformers: Run transformer emotion classification if installed
+        use_cache: Reuse cached results and document records; after a
+                   coding scheme edit brands are only re-scored
+        cache_max_bytes: Size limit of each cache directory
+        use_corpus_index: Read keyword occurrences from the positional corpus
+                          index (token match mode)
+        deduplicate: Analyze the texts with repeated boilerplate lines
+                     removed (results get a '_dedup' suffix)
+        use_semantic: Add embedding-based detection against the coding
+                      scheme's prototype sentences
+        write_tables: Also write the Parquet result tables (brand metrics,
+                      keyword hits, sentence scores) if pyarrow is installed
+        preview: Render the dashboards as low-resolution previews
     """
     sectors = ['Fashion', 'Fitness', 'Skincare_Cosmetics']
     all_sector_results = []
+    chart_jobs = []
     
+    # Load shared resources once; per-sector analyzers reuse them
+    base_analyzer = EmotionManipulationAnalyzer(
+        sectors[0], match_mode, use_transformers, use_corpus_index, use_semantic
+    )
+    base_analyzer.max_chunks = max_chunks
+    if deduplicate:
+        base_analyzer.output_suffix += '_dedup'
+    analyzers = {}
     for sector in sectors:
-        print(f"\n{'='*60}")
-        print(f"Analyzing {sector} Sector")
-        print('='*60)
-        
-        # Initialize analyzer
-        analyzer = EmotionManipulationAnalyzer(sector)
+        analyzer = base_analyzer.for_sector(sector)
         
         # Check if data exists
         if not analyzer.data_path.exists():
             print(f"Warning: Data directory {analyzer.data_path} does not exist")
             continue
         
-        # Load and analyze
-        analyzer.load_texts()
-        
+        analyzer.load_texts(deduplicate)
         if analyzer.texts:
-            # Perform analysis
-            df = analyzer.analyze_all_brands()
-            
-            # Save raw results
-            output_file = RESULTS_DIR / f'{sector}_emotion_manipulation_results.csv'
-            df.to_csv(output_file, index=False)
-            print(f"Results saved to {output_file}")
-            
-            # Generate visualizations
-            analyzer.visualize_manipulation_profile(df)
-            
-            # Generate detailed report
-            analyzer.generate_detailed_report(df)
-            
-            # Store for cross-sector analysis
-            all_sector_results.append(df)
+            analyzers[sector] = analyzer
+    
+    def classify_emotions(unindexed):
+        """Transformer inference for every brand of every sector in shared batches"""
+        if not base_analyzer.use_transformers:
+            return
+        print("Classifying emotions with transformer model...")
+        all_sentences = {
+            (sector, brand_name): parse_document(analyzer.texts, brand_name).sentences
+            for sector, analyzer in unindexed.items()
+            for brand_name in analyzer.texts
+        }
+        scores = classify_documents(
+            all_sentences, base_analyzer.emotion_classifier, batch_size, max_chunks
+        )
+        for (sector, brand_name), brand_scores in scores.items():
+            unindexed[sector].transformer_scores[brand_name] = brand_scores
+    
+    # Only work invalidated since the last run is redone
+    cache = document_cache = None
+    if use_cache:
+        cache = ResultCache(CACHE_DIR, cache_max_bytes)
+        document_cache = ResultCache(CACHE_DIR / "documents", cache_max_bytes)
+    if base_analyzer.use_corpus_index:
+        # Built here if stale, before worker processes open it
+        open_corpus_index(DATA_DIR)
+    
+    # Analyze every (sector, brand) pair in one pool, streaming rows to disk
+    print(f"\n{'='*60}")
+    print(f"Analyzing {sum(len(a.texts) for a in analyzers.values())} brands "
+          f"across {len(analyzers)} sectors")
+    print('='*60)
+    
+    suffix = base_analyzer.output_suffix
+    sector_rows = {sector: {} for sector in analyzers}
+    stage_timings = StageTimings()
+    with ExitStack() as stack:
+        sector_streams = {
+            sector: stack.enter_context(
+                CSVStream(RESULTS_DIR / f'{sector}_emotion_manipulation_results{suffix}.csv'))
+            for sector in analyzers
+        }
+        combined_stream = stack.enter_context(
+            CSVStream(RESULTS_DIR / f'all_sectors_emotion_manipulation{suffix}.csv'))
+        # Typed tables keep the detail the flat rows drop
+        table_writer = None
+        if write_tables and PYARROW_AVAILABLE:
+            table_writer = ResultTableWriter(list(analyzers), suffix, RESULTS_DIR)
+        elif write_tables:
+            print("pyarrow not available. Skipping Parquet result tables.")
+        
+        # Workers skip the transformer models; scores are merged back here
+        for sector, brand_name, analysis, error in run_incremental_jobs(
+                analyzers, (sectors[0], match_mode, False, use_corpus_index), workers,
+                cache, document_cache, classify_emotions, stage_timings,
+                base_analyzer.embed_sentences):
+            if error is not None:
+                print(f"Error analyzing {sector}/{brand_name}: {error}")
+                continue
+            # Streamed rows carry the intensity model's inputs; the intensity
+            # columns are filled in when the results are rewritten below
+            row = analyzers[sector].flatten_analysis(analysis)
+            sector_rows[sector][brand_name] = row
+            sector_streams[sector].write(row)
+            combined_stream.write(row)
+            if table_writer is not None:
+                table_writer.write_brand(analyzers[sector], brand_name, analysis)
+            print(f"Finished {sector}/{brand_name}")
+    
+    if use_cache:
+        print(cache.summary())
+        print(document_cache.summary())
+    if stage_timings.documents:
+        print("\nTime per analysis stage (indexed documents):")
+        print(stage_timings.report())
+    
+    for sector, analyzer in analyzers.items():
+        print(f"\n{'='*60}")
+        print(f"Reporting {sector} Sector")
+        print('='*60)
+        
+        # Rewrite the streamed results in brand load order, with intensity
+        # scored for the whole sector at once
+        df = pd.DataFrame(ordered_rows(sector_rows[sector], list(analyzer.texts)))
+        if df.empty:
+            continue
+        df = analyzer.score_intensity(df)
+        if table_writer is not None:
+            table_writer.write_brand_metrics(sector, df)
+        output_file = RESULTS_DIR / f'{sector}_emotion_manipulation_results{suffix}.csv'
+        df.to_csv(output_file, index=False)
+        print(f"Results saved to {output_file}")
+        
+        # Dashboards are rendered together below
+        chart_jobs.append(analyzer.dashboard_job(df))
+        
+        # Generate detailed report
+        analyzer.generate_detailed_report(df)
+        
+        # Store for cross-sector analysis
+        all_sector_results.append(df)
     
     # Cross-sector comparison
     if all_sector_results:
@@ -584,64 +1227,106 @@ def main():
         
         combined_df = pd.concat(all_sector_results, ignore_index=True)
         
-        # Create cross-sector visualization
-        fig, axes = plt.subplots(2, 2, figsize=(15, 12))
-        
-        # Manipulation intensity by sector
-        ax1 = axes[0, 0]
-        combined_df.boxplot(column='manipulation_intensity', by='sector', ax=ax1)
-        ax1.set_title('Manipulation Intensity Across Sectors')
-        ax1.set_xlabel('Sector')
-        ax1.set_ylabel('Intensity Score')
-        plt.sca(ax1)
-        plt.xticks(rotation=45)
-        
-        # Dominant strategies by sector
-        ax2 = axes[0, 1]
-        strategy_sector = combined_df.groupby(['sector', 'dominant_strategy']).size().unstack(fill_value=0)
-        strategy_sector.T.plot(kind='bar', stacked=True, ax=ax2)
-        ax2.set_title('Dominant Strategies by Sector')
-        ax2.set_xlabel('Strategy')
-        ax2.set_ylabel('Count')
-        ax2.legend(title='Sector')
-        plt.sca(ax2)
-        plt.xticks(rotation=45)
-        
-        # Emotion distribution by sector
-        ax3 = axes[1, 0]
-        emotion_cols = [col for col in combined_df.columns if col.startswith('emotion_')]
-        emotion_by_sector = combined_df.groupby('sector')[emotion_cols].mean()
-        emotion_by_sector.T.plot(kind='bar', ax=ax3)
-        ax3.set_title('Average Emotion Scores by Sector')
-        ax3.set_xlabel('Emotion')
-        ax3.set_ylabel('Average Score')
-        ax3.legend(title='Sector')
-        plt.sca(ax3)
-        plt.xticks(rotation=45)
-        
-        # Sentiment comparison
-        ax4 = axes[1, 1]
-        sentiment_by_sector = combined_df.groupby('sector')[['vader_compound', 'textblob_polarity']].mean()
-        sentiment_by_sector.plot(kind='bar', ax=ax4)
-        ax4.set_title('Average Sentiment by Sector')
-        ax4.set_xlabel('Sector')
-        ax4.set_ylabel('Sentiment Score')
-        ax4.legend(['VADER Compound', 'TextBlob Polarity'])
-        plt.sca(ax4)
-        plt.xticks(rotation=45)
-        
-        plt.suptitle('Cross-Sector Manipulation Analysis', fontsize=16, fontweight='bold')
-        plt.tight_layout()
-        
-        # Save cross-sector visualization
-        cross_sector_path = RESULTS_DIR / 'cross_sector_comparison.png'
-        plt.savefig(cross_sector_path, dpi=300, bbox_inches='tight')
-        plt.show()
+        chart_jobs.append(ChartJob(
+            RESULTS_DIR / f'cross_sector_comparison{suffix}.png',
+            draw_cross_sector_comparison, (combined_df,)
+        ))
         
         # Save combined results
-        combined_df.to_csv(RESULTS_DIR / 'all_sectors_emotion_manipulation.csv', index=False)
+        combined_df.to_csv(RESULTS_DIR / f'all_sectors_emotion_manipulation{suffix}.csv', index=False)
         print(f"Cross-sector analysis complete. Results saved to {RESULTS_DIR}")
+    if table_writer is not None:
+        print(table_writer.summary())
+    
+    # Dashboards and the cross-sector figure in parallel, unchanged ones skipped
+    render_charts(chart_jobs, workers, preview)
+
+
+def main_streaming(match_mode: str = 'substring'):
+    """
+    Sentence-level pipeline for very large documents: brand files are read
+    in chunks, per-sentence scores are written as they are computed and only
+    running aggregates are kept per brand
+    
+    Args:
+        match_mode: Keyword matching mode passed to every analyzer
+    """
+    sectors = ['Fashion', 'Fitness', 'Skincare_Cosmetics']
+    base_analyzer = EmotionManipulationAnalyzer(sectors[0], match_mode, use_transformers=False)
+    suffix = base_analyzer.output_suffix
+    
+    for sector in sectors:
+        analyzer = base_analyzer.for_sector(sector)
+        if not analyzer.data_path.exists():
+            print(f"Warning: Data directory {analyzer.data_path} does not exist")
+            continue
+        
+        print(f"\n{'='*60}")
+        print(f"Streaming {sector} Sector")
+        print('='*60)
+        
+        summaries = []
+        sentence_path = RESULTS_DIR / f'{sector}_sentence_scores{suffix}.csv'
+        summary_path = RESULTS_DIR / f'{sector}_sentence_summary{suffix}.csv'
+        with CSVStream(sentence_path, flush_each_row=False) as sentence_stream, \
+                CSVStream(summary_path) as summary_stream:
+            for file_path in analyzer.data_path.glob("*.txt"):
+                brand_name = file_path.stem
+                try:
+                    summary = analyzer.analyze_brand_streaming(
+                        brand_name, lambda row: sentence_stream.write({'brand': brand_name, **row})
+                    )
+                except Exception as e:
+                    print(f"Error analyzing {brand_name}: {e}")
+                    continue
+                summary_stream.write(analyzer.flatten_sentence_summary(summary))
+                summaries.append(summary)
+                print(f"Finished {brand_name}: {summary['sentence_count']} sentences")
+        
+        # Full aggregates including the top example sentences
+        examples_path = RESULTS_DIR / f'{sector}_sentence_summary{suffix}.json'
+        with open(examples_path, 'w', encoding='utf-8') as f:
+            json.dump(summaries, f, indent=2, ensure_ascii=False)
+        print(f"Sentence scores saved to {sentence_path}")
+        print(f"Brand summaries saved to {summary_path} and {examples_path}")
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Emotion-based manipulation analysis")
+    parser.add_argument('--match-mode', choices=MATCH_MODES, default='substring',
+                        help="Keyword matching: raw substrings or whole tokens")
+    parser.add_argument('--workers', type=int, default=1,
+                        help="Number of worker processes for brand analysis")
+    parser.add_argument('--no-transformers', action='store_true',
+                        help="Skip transformer emotion classification (fast lexicon-only run)")
+    parser.add_argument('--batch-size', type=int, default=32,
+                        help="Chunks per transformer forward pass")
+    parser.add_argument('--max-chunks', type=int, default=None,
+                        help="Cap on transformer chunks per brand (default: whole text)")
+    parser.add_argument('--no-cache', action='store_true',
+                        help="Analyze every brand again instead of reusing cached results")
+    parser.add_argument('--cache-size-mb', type=int, default=DEFAULT_MAX_BYTES // (1024 * 1024),
+                        help="Size limit of the result cache")
+    parser.add_argument('--streaming', action='store_true',
+                        help="Sentence-level analysis streamed from disk in bounded memory")
+    parser.add_argument('--corpus-index', action='store_true',
+                        help="Read keyword occurrences from the positional corpus index "
+                             "(requires --match-mode token)")
+    parser.add_argument('--dedup', action='store_true',
+                        help="Remove repeated boilerplate lines before analysis")
+    parser.add_argument('--semantic', action='store_true',
+                        help="Embedding-based detection of paraphrased manipulation "
+                             "(requires sentence-transformers)")
+    parser.add_argument('--no-tables', action='store_true',
+                        help="Skip the Parquet result tables (CSV results only)")
+    parser.add_argument('--preview', action='store_true',
+                        help="Render figures as fast low-resolution previews")
+    args = parser.parse_args()
+    if args.corpus_index and args.match_mode != 'token':
+        parser.error("--corpus-index requires --match-mode token")
+    if args.streaming:
+        main_streaming(args.match_mode)
+    else:
+        main(args.match_mode, args.workers, args.batch_size, args.max_chunks,
+             not args.no_transformers, not args.no_cache, args.cache_size_mb * 1024 * 1024,
+             args.corpus_index, args.dedup, args.semantic, not args.no_tables, args.preview)
\ No newline at end of file
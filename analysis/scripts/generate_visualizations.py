@@ -1,89 +1,121 @@
 """
 Generate Visualizations for Thesis
 Quick script to create charts and graphs from analysis results
+
+Every chart is drawn from the emotion analyzer's results: the brand_metrics
+Parquet table (result_tables.py) when it exists, otherwise the combined
+results CSV. Per-sector and per-brand aggregations are computed once and
+shared by the charts. Charts are rendered headless in parallel and only
+when the data they show changed (chart_rendering.py).
+
+Usage:
+    python generate_visualizations.py [--suffix _token] [--force]
+                                      [--workers 5] [--preview]
 """
 
-import json
-import matplotlib
-matplotlib.use('Agg')  # Use non-interactive backend
+import argparse
+from chart_rendering import ChartJob, render_charts, use_headless_backend
+use_headless_backend()  # Use non-interactive backend
 import matplotlib.pyplot as plt
+import pandas as pd
 import seaborn as sns
+from functools import lru_cache
 from pathlib import Path
+from typing import Dict
 import numpy as np
 
+from result_tables import read_result_table, tables_dir
+from resources import PYARROW_AVAILABLE
+
 # Configuration
 PROJECT_ROOT = Path("D:/Thesis")
 RESULTS_DIR = PROJECT_ROOT / "analysis" / "results"
 RESULTS_DIR.mkdir(exist_ok=True, parents=True)
 
+SECTORS = ['Fashion', 'Fitness', 'Skincare_Cosmetics']
+SECTOR_LABELS = {'Fashion': 'Fashion', 'Fitness': 'Fitness', 'Skincare_Cosmetics': 'Skincare'}
+SECTOR_COLORS = {'Fashion': '#e74c3c', 'Fitness': '#3498db', 'Skincare_Cosmetics': '#2ecc71'}
+
 # Set style
 sns.set_style("whitegrid")
 plt.rcParams['figure.figsize'] = (12, 8)
 plt.rcParams['font.size'] = 11
 
-# Data from quick analysis
-fashion_data = {
-    'strategies': {
-        'Fear Triggers': 94,
-        'Aspiration Appeals': 67,
-        'Emotional Blackmail': 58,
-        'Scientific Mimicry': 57,
-        'Inadequacy Triggers': 48
-    },
-    'emotions': {
-        'Fear': 59, 'Joy': 53, 'Guilt': 51, 'Pride': 46, 'Hope': 36
-    },
-    'brands': ['Armani', 'Balenciaga', 'Bottega Veneta', 'Celine', 'Chanel', 
-               'Dior', 'Givenchy', 'Hugo Boss', 'Loewe', 'Prada', 'Valentino', 'YSL']
-}
-
-fitness_data = {
-    'strategies': {
-        'Aspiration Appeals': 91,
-        'Fear Triggers': 61,
-        'Scientific Mimicry': 60,
-        'Emotional Blackmail': 55,
-        'Social Proof': 46
-    },
-    'emotions': {
-        'Pride': 62, 'Fear': 42, 'Guilt': 38, 'Joy': 38, 'Hope': 34
-    },
-    'brands': ['AlphAlete', 'Decathlon', 'Gymshark', 'Inov8', 'Merrell', 
-               'Mizuno', 'Nike', 'On', 'Patagonia', 'Reebok', 'Rogue', 'Skechers']
-}
-
-skincare_data = {
-    'strategies': {
-        'Scientific Mimicry': 125,
-        'Fear Triggers': 93,
-        'Aspiration Appeals': 88,
-        'Authority Appeals': 87,
-        'Inadequacy Triggers': 65
-    },
-    'emotions': {
-        'Fear': 52, 'Pride': 41, 'Hope': 40, 'Joy': 38, 'Shame': 37
-    },
-    'brands': ['CeraVe', 'Chanel', 'Estée Lauder', 'Eucerin', 'Garnier', 
-               'La Mer', 'L\'Oréal', 'Nivea', 'Olay', 'Pixi', 'The Ordinary']
-}
-
-def create_strategy_comparison():
+
+def label(name: str) -> str:
+    """Display name of a coding scheme category, e.g. 'Fear Triggers'"""
+    return name.replace('_', ' ').title()
+
+
+@lru_cache(maxsize=None)
+def brand_metrics(suffix: str = '') -> pd.DataFrame:
+    """
+    One row per analyzed brand, read once per run (do not modify)
+    
+    Args:
+        suffix: Output suffix of the analyzer run, e.g. '_token'
+    """
+    if PYARROW_AVAILABLE and (tables_dir(suffix, RESULTS_DIR) / 'brand_metrics').exists():
+        df = read_result_table('brand_metrics', suffix=suffix, results_dir=RESULTS_DIR)
+    else:
+        df = pd.read_csv(RESULTS_DIR / f'all_sectors_emotion_manipulation{suffix}.csv')
+    df = df[df['sector'].isin(SECTORS)]
+    if df.empty:
+        raise FileNotFoundError(f"No analysis results in {RESULTS_DIR}; "
+                                "run emotion_manipulation_analyzer.py first")
+    # Sectors in SECTORS order, brands alphabetically
+    order = df['sector'].map(SECTORS.index)
+    return df.assign(_order=order).sort_values(['_order', 'brand'], kind='stable') \
+        .drop(columns='_order').reset_index(drop=True)
+
+
+@lru_cache(maxsize=None)
+def brand_strategy_counts(suffix: str = '') -> pd.DataFrame:
+    """Manipulation keyword occurrences per brand (rows) and strategy (columns)"""
+    df = brand_metrics(suffix)
+    columns = [column for column in df.columns
+               if column.startswith('strat_') and not column.endswith('_weighted')]
+    counts = df[columns].fillna(0)
+    counts.columns = [column[len('strat_'):] for column in columns]
+    counts.index = pd.MultiIndex.from_frame(df[['sector', 'brand']])
+    return counts
+
+
+@lru_cache(maxsize=None)
+def sector_strategy_totals(suffix: str = '') -> pd.DataFrame:
+    """Manipulation keyword occurrences per sector (rows) and strategy (columns)"""
+    return brand_strategy_counts(suffix).groupby(level='sector', sort=False).sum()
+
+
+@lru_cache(maxsize=None)
+def sector_emotion_totals(suffix: str = '') -> pd.DataFrame:
+    """Emotion keyword scores per sector (rows) and emotion (columns)"""
+    df = brand_metrics(suffix)
+    columns = [column for column in df.columns if column.startswith('emotion_')]
+    totals = df.groupby('sector', sort=False)[columns].sum()
+    totals.columns = [column[len('emotion_'):] for column in columns]
+    return totals
+
+
+def top_items(row: pd.Series, count: int = 5) -> pd.Series:
+    """Largest values of a row, ties in column order"""
+    return row.sort_values(ascending=False, kind='stable').head(count)
+
+
+def draw_strategy_comparison(top: Dict[str, pd.Series]):
     """Create comparison of strategies across sectors"""
-    fig, axes = plt.subplots(1, 3, figsize=(18, 6))
     
-    sectors = ['Fashion', 'Fitness', 'Skincare']
-    data_sets = [fashion_data, fitness_data, skincare_data]
-    colors = ['#e74c3c', '#3498db', '#2ecc71']
+    fig, axes = plt.subplots(1, len(top), figsize=(6 * len(top), 6), squeeze=False)
     
-    for idx, (ax, sector, data, color) in enumerate(zip(axes, sectors, data_sets, colors)):
-        strategies = list(data['strategies'].keys())
-        values = list(data['strategies'].values())
+    for ax, (sector, data) in zip(axes[0], top.items()):
+        strategies = [label(strategy) for strategy in data.index]
+        values = list(data.values)
         
-        bars = ax.bar(range(len(strategies)), values, color=color, alpha=0.7)
+        bars = ax.bar(range(len(strategies)), values, color=SECTOR_COLORS[sector], alpha=0.7)
         ax.set_xticks(range(len(strategies)))
         ax.set_xticklabels(strategies, rotation=45, ha='right')
         ax.set_ylabel('Frequency')
-        ax.set_title(f'{sector} Sector - Top Manipulation Strategies', fontweight='bold')
+        ax.set_title(f'{SECTOR_LABELS[sector]} Sector - Top Manipulation Strategies', fontweight='bold')
         
         # Add value labels on bars
         for bar, val in zip(bars, values):
@@ -93,24 +125,27 @@ def create_strategy_comparison():
     
     plt.suptitle('Manipulation Strategies Across Sectors', fontsize=16, fontweight='bold', y=1.02)
     plt.tight_layout()
-    plt.savefig(RESULTS_DIR / 'strategies_comparison.png', dpi=300, bbox_inches='tight')
-    plt.close()
-    print("Saved: strategies_comparison.png")
+    return fig
 
-def create_emotion_wheel():
+def strategy_comparison_job(suffix: str = '') -> ChartJob:
+    """Chart job of draw_strategy_comparison with its data"""
+    totals = sector_strategy_totals(suffix)
+    top = {sector: top_items(totals.loc[sector]) for sector in totals.index}
+    return ChartJob(RESULTS_DIR / f'strategies_comparison{suffix}.png', draw_strategy_comparison, (top,))
+
+def create_strategy_comparison(suffix: str = '', force: bool = False, preview: bool = False):
+    """Create comparison of strategies across sectors"""
+    render_charts([strategy_comparison_job(suffix)], preview=preview, force=force)
+
+def draw_emotion_wheel(top: Dict[str, pd.Series]):
     """Create emotion distribution wheel"""
-    fig, axes = plt.subplots(1, 3, figsize=(18, 6), subplot_kw=dict(projection='polar'))
     
-    sectors = ['Fashion', 'Fitness', 'Skincare']
-    data_sets = [fashion_data, fitness_data, skincare_data]
-    colors_map = {
-        'Fear': '#e74c3c', 'Joy': '#f39c12', 'Guilt': '#9b59b6',
-        'Pride': '#3498db', 'Hope': '#2ecc71', 'Shame': '#95a5a6'
-    }
+    fig, axes = plt.subplots(1, len(top), figsize=(6 * len(top), 6),
+                             subplot_kw=dict(projection='polar'), squeeze=False)
     
-    for ax, sector, data in zip(axes, sectors, data_sets):
-        emotions = list(data['emotions'].keys())
-        values = list(data['emotions'].values())
+    for ax, (sector, data) in zip(axes[0], top.items()):
+        emotions = [label(emotion) for emotion in data.index]
+        values = [float(value) for value in data.values]
         
         # Calculate angles
         angles = np.linspace(0, 2 * np.pi, len(emotions), endpoint=False).tolist()
@@ -122,43 +157,38 @@ def create_emotion_wheel():
         ax.fill(angles, values_plot, alpha=0.25, color='#3498db')
         ax.set_xticks(angles[:-1])
         ax.set_xticklabels(emotions)
-        ax.set_ylim(0, max(values) * 1.1)
-        ax.set_title(f'{sector} Sector', fontweight='bold', pad=20)
+        ax.set_ylim(0, max(max(values), 1) * 1.1)
+        ax.set_title(f'{SECTOR_LABELS[sector]} Sector', fontweight='bold', pad=20)
         ax.grid(True)
     
     plt.suptitle('Emotion Distribution Across Sectors', fontsize=16, fontweight='bold', y=1.05)
     plt.tight_layout()
-    plt.savefig(RESULTS_DIR / 'emotion_wheel.png', dpi=300, bbox_inches='tight')
-    plt.close()
-    print("Saved: emotion_wheel.png")
+    return fig
 
-def create_cross_sector_heatmap():
+def emotion_wheel_job(suffix: str = '') -> ChartJob:
+    """Chart job of draw_emotion_wheel with its data"""
+    totals = sector_emotion_totals(suffix)
+    top = {sector: top_items(totals.loc[sector]) for sector in totals.index}
+    return ChartJob(RESULTS_DIR / f'emotion_wheel{suffix}.png', draw_emotion_wheel, (top,))
+
+def create_emotion_wheel(suffix: str = '', force: bool = False, preview: bool = False):
+    """Create emotion distribution wheel"""
+    render_charts([emotion_wheel_job(suffix)], preview=preview, force=force)
+
+def draw_cross_sector_heatmap(matrix: pd.DataFrame):
     """Create heatmap of all strategies across sectors"""
-    import pandas as pd
-    
-    # Compile all strategies
-    all_strategies = set()
-    for data in [fashion_data, fitness_data, skincare_data]:
-        all_strategies.update(data['strategies'].keys())
-    
-    # Create matrix
-    sectors = ['Fashion', 'Fitness', 'Skincare']
-    data_sets = [fashion_data, fitness_data, skincare_data]
-    
-    matrix = []
-    for data in data_sets:
-        row = [data['strategies'].get(strategy, 0) for strategy in sorted(all_strategies)]
-        matrix.append(row)
+    strategies = list(matrix.columns)
+    sectors = [SECTOR_LABELS[sector] for sector in matrix.index]
     
     # Create heatmap
     fig, ax = plt.subplots(figsize=(12, 6))
     
-    im = ax.imshow(matrix, cmap='YlOrRd', aspect='auto')
+    im = ax.imshow(matrix.values, cmap='YlOrRd', aspect='auto')
     
     # Set ticks
-    ax.set_xticks(np.arange(len(all_strategies)))
+    ax.set_xticks(np.arange(len(strategies)))
     ax.set_yticks(np.arange(len(sectors)))
-    ax.set_xticklabels(sorted(all_strategies), rotation=45, ha='right')
+    ax.set_xticklabels([label(strategy) for strategy in strategies], rotation=45, ha='right')
     ax.set_yticklabels(sectors)
     
     # Add colorbar
@@ -166,31 +196,34 @@ def create_cross_sector_heatmap():
     
     # Add text annotations
     for i in range(len(sectors)):
-        for j in range(len(all_strategies)):
-            text = ax.text(j, i, int(matrix[i][j]),
+        for j in range(len(strategies)):
+            text = ax.text(j, i, int(matrix.values[i][j]),
                           ha="center", va="center", color="black")
     
     ax.set_title('Manipulation Strategy Heatmap Across Sectors', fontweight='bold', pad=20)
     plt.tight_layout()
-    plt.savefig(RESULTS_DIR / 'strategy_heatmap.png', dpi=300, bbox_inches='tight')
-    plt.close()
-    print("Saved: strategy_heatmap.png")
+    return fig
+
+def cross_sector_heatmap_job(suffix: str = '') -> ChartJob:
+    """Chart job of draw_cross_sector_heatmap with its data"""
+    totals = sector_strategy_totals(suffix)
+    # Strategies among the top five of any sector
+    strategies = sorted(set().union(*(top_items(totals.loc[sector]).index for sector in totals.index)))
+    matrix = totals[strategies]
+    return ChartJob(RESULTS_DIR / f'strategy_heatmap{suffix}.png', draw_cross_sector_heatmap, (matrix,))
 
-def create_intensity_chart():
+def create_cross_sector_heatmap(suffix: str = '', force: bool = False, preview: bool = False):
+    """Create heatmap of all strategies across sectors"""
+    render_charts([cross_sector_heatmap_job(suffix)], preview=preview, force=force)
+
+def draw_intensity_chart(data: pd.DataFrame):
     """Create manipulation intensity comparison"""
-    fig, ax = plt.subplots(figsize=(10, 6))
     
-    # Calculate total manipulation instances per sector
-    sectors = ['Fashion', 'Fitness', 'Skincare']
-    totals = [
-        sum(fashion_data['strategies'].values()),
-        sum(fitness_data['strategies'].values()),
-        sum(skincare_data['strategies'].values())
-    ]
+    fig, ax = plt.subplots(figsize=(10, 6))
     
-    # Calculate average per brand
-    brands_count = [12, 12, 11]
-    averages = [t/b for t, b in zip(totals, brands_count)]
+    sectors = [SECTOR_LABELS[sector] for sector in data.index]
+    totals = list(data['total'])
+    averages = list(data['average'])
     
     x = np.arange(len(sectors))
     width = 0.35
@@ -216,46 +249,40 @@ def create_intensity_chart():
                        ha='center', va='bottom')
     
     plt.tight_layout()
-    plt.savefig(RESULTS_DIR / 'intensity_comparison.png', dpi=300, bbox_inches='tight')
-    plt.close()
-    print("Saved: intensity_comparison.png")
+    return fig
+
+def intensity_chart_job(suffix: str = '') -> ChartJob:
+    """Chart job of draw_intensity_chart with its data"""
+    counts = brand_strategy_counts(suffix)
+    # Total manipulation instances and average per brand of each sector
+    per_brand = counts.sum(axis=1).groupby(level='sector', sort=False)
+    data = pd.DataFrame({'total': per_brand.sum(), 'average': per_brand.mean()})
+    return ChartJob(RESULTS_DIR / f'intensity_comparison{suffix}.png', draw_intensity_chart, (data,))
 
-def create_top_brands_chart():
+def create_intensity_chart(suffix: str = '', force: bool = False, preview: bool = False):
+    """Create manipulation intensity comparison"""
+    render_charts([intensity_chart_job(suffix)], preview=preview, force=force)
+
+def draw_top_brands_chart(top: pd.Series, totals: pd.Series):
     """Create chart of most manipulative brands"""
-    fig, ax = plt.subplots(figsize=(12, 8))
     
-    # Brand manipulation scores (from analysis)
-    brand_scores = {
-        'Nivea': 50,
-        'Gymshark': 35,
-        'Dior': 32,
-        'CeraVe': 29,
-        'Nike': 28,
-        'Celine': 27,
-        'Patagonia': 25,
-        'The Ordinary': 24,
-        'Bottega Veneta': 23,
-        'Prada': 22,
-        'Chanel (Fashion)': 21,
-        'Valentino': 20
-    }
+    fig, ax = plt.subplots(figsize=(12, 8))
     
-    brands = list(brand_scores.keys())
-    scores = list(brand_scores.values())
+    # Brands analyzed in several sectors are labelled with their sector
+    brand_sectors = totals.index.to_frame(index=False).groupby('brand')['sector'].nunique()
+    brands = [
+        f'{label(brand)} ({SECTOR_LABELS[sector]})' if brand_sectors[brand] > 1 else label(brand)
+        for sector, brand in top.index
+    ]
+    scores = list(top.values)
     
     # Color by sector
-    colors = []
-    for brand in brands:
-        if brand in ['Nivea', 'CeraVe', 'The Ordinary']:
-            colors.append('#2ecc71')  # Skincare
-        elif brand in ['Gymshark', 'Nike', 'Patagonia']:
-            colors.append('#3498db')  # Fitness
-        else:
-            colors.append('#e74c3c')  # Fashion
+    colors = [SECTOR_COLORS[sector] for sector, _ in top.index]
     
     bars = ax.barh(range(len(brands)), scores, color=colors)
     ax.set_yticks(range(len(brands)))
     ax.set_yticklabels(brands)
+    ax.invert_yaxis()  # Highest score on top
     ax.set_xlabel('Total Manipulation Instances')
     ax.set_title('Most Manipulative Brands Across All Sectors', fontweight='bold')
     
@@ -268,27 +295,48 @@ def create_top_brands_chart():
     # Add legend
     from matplotlib.patches import Patch
     legend_elements = [
-        Patch(facecolor='#e74c3c', label='Fashion'),
-        Patch(facecolor='#3498db', label='Fitness'),
-        Patch(facecolor='#2ecc71', label='Skincare')
+        Patch(facecolor=SECTOR_COLORS[sector], label=SECTOR_LABELS[sector])
+        for sector in SECTORS
     ]
     ax.legend(handles=legend_elements, loc='lower right')
     
     plt.tight_layout()
-    plt.savefig(RESULTS_DIR / 'top_brands.png', dpi=300, bbox_inches='tight')
-    plt.close()
-    print("Saved: top_brands.png")
+    return fig
+
+def top_brands_chart_job(suffix: str = '', count: int = 12) -> ChartJob:
+    """Chart job of draw_top_brands_chart with its data"""
+    totals = brand_strategy_counts(suffix).sum(axis=1)
+    top = totals.sort_values(ascending=False, kind='stable').head(count)
+    return ChartJob(RESULTS_DIR / f'top_brands{suffix}.png', draw_top_brands_chart, (top, totals))
 
-def main():
-    """Generate all visualizations"""
+def create_top_brands_chart(suffix: str = '', force: bool = False, preview: bool = False):
+    """Create chart of most manipulative brands"""
+    render_charts([top_brands_chart_job(suffix)], preview=preview, force=force)
+
+def chart_jobs(suffix: str = '') -> list:
+    """All thesis charts of an analyzer run"""
+    return [
+        strategy_comparison_job(suffix),
+        emotion_wheel_job(suffix),
+        cross_sector_heatmap_job(suffix),
+        intensity_chart_job(suffix),
+        top_brands_chart_job(suffix)
+    ]
+
+def main(suffix: str = '', force: bool = False, workers: int = 5, preview: bool = False):
+    """
+    Generate all visualizations
+    
+    Args:
+        suffix: Output suffix of the analyzer run whose results are shown
+        force: Redraw charts whose input did not change
+        workers: Charts rendered in parallel processes
+        preview: Low-resolution previews (<name>_preview.png) instead
+    """
     print("Generating visualizations for thesis...")
     print("="*50)
     
-    create_strategy_comparison()
-    create_emotion_wheel()
-    create_cross_sector_heatmap()
-    create_intensity_chart()
-    create_top_brands_chart()
+    render_charts(chart_jobs(suffix), workers, preview, force)
     
     print("="*50)
     print(f"All visualizations saved to {RESULTS_DIR}")
@@ -296,4 +344,14 @@ def main():
     print("\\includegraphics[width=\\textwidth]{analysis/results/filename.png}")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Thesis charts from the analysis results")
+    parser.add_argument('--suffix', default='',
+                        help="Output suffix of the analyzer run, e.g. _token or _dedup")
+    parser.add_argument('--force', action='store_true',
+                        help="Redraw every chart even if its input did not change")
+    parser.add_argument('--workers', type=int, default=5,
+                        help="Charts rendered in parallel processes")
+    parser.add_argument('--preview', action='store_true',
+                        help="Fast low-resolution previews instead of 300 dpi charts")
+    args = parser.parse_args()
+    main(args.suffix, args.force, args.workers, args.preview)
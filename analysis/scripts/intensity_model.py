@@ -0,0 +1,177 @@
+"""
+Manipulation Intensity Model
+Master's Thesis: Psychological Manipulation in Marketing Discourse
+
+Implements the weighted-sum intensity model declared in the coding scheme's
+intensity_scoring section. Five factors are computed from per-document
+statistics, each mapped to 0-1 and independent of document length:
+
+- keyword_frequency: context-weighted manipulation score per 1k tokens
+- keyword_variety: share of manipulation categories used at a substantive
+  rate (at least CATEGORY_PRESENCE_RATE weighted hits per 1k tokens)
+- emotional_intensity: emotion intensity indicators per 1k tokens
+- repetition: repeated manipulation keyword hits per 1k tokens
+- positioning: concentration of manipulation keywords in the opening part
+  of the document beyond an even spread
+
+Calibration: every factor is 0 for a document without the feature and
+rises linearly to 1 at a saturation point, so a weak document can reach
+'low' and the coding scheme's thresholds (0.33 / 0.67) separate brands.
+The rate saturation points are about the 90th percentile brand of the
+materials corpus in 'substring' match mode, and positioning saturates when
+the opening holds POSITIONING_SATURATION times its even share; an even
+spread (or a thinner opening) scores 0. On that corpus this places 15
+brands low, 14 medium and 6 high. Re-check the distribution when the
+corpus or the coding scheme changes much.
+
+Scoring is vectorized over a DataFrame of result rows: the per-document
+statistics are stored with every row (stat_* columns) and IntensityModel
+.apply fills in the intensity columns for all brands at once, also for a
+saved results CSV without re-scanning the texts.
+
+Usage:
+    python intensity_model.py    # factor distribution of the saved results
+"""
+
+import json
+from pathlib import Path
+from typing import Dict, List
+
+import numpy as np
+import pandas as pd
+
+# Configuration
+PROJECT_ROOT = Path("D:/Thesis")
+CODING_SCHEME_PATH = PROJECT_ROOT / "analysis" / "coding_scheme.json"
+RESULTS_PATH = PROJECT_ROOT / "analysis" / "results" / "all_sectors_emotion_manipulation.csv"
+
+# Rates per 1k tokens at which a factor reaches 1.0 (about the 90th
+# percentile brand of the materials corpus in 'substring' match mode)
+FREQUENCY_SATURATION = 25.0
+EMOTION_SATURATION = 15.0
+REPETITION_SATURATION = 35.0
+
+# Weighted hits per 1k tokens for a category to count towards variety
+CATEGORY_PRESENCE_RATE = 1.0
+
+# Opening density, relative to an even spread, at which positioning is 1.0
+POSITIONING_SATURATION = 3.0
+
+# Share of the text (from the start) counted as its opening part
+LEAD_SHARE = 0.1
+
+FACTORS = ('keyword_frequency', 'keyword_variety', 'emotional_intensity',
+           'repetition', 'positioning')
+
+# Per-document statistics the model needs, besides strat_<category>_weighted
+STATISTIC_COLUMNS = [
+    'stat_tokens', 'stat_keyword_hits', 'stat_distinct_keywords',
+    'stat_emotion_intensity_hits', 'stat_lead_hits'
+]
+
+
+def ramp(value: pd.Series, start: float, saturation: float) -> pd.Series:
+    """Map a value to 0-1: 0 up to start, linear to 1 at saturation"""
+    return ((value - start) / (saturation - start)).clip(0.0, 1.0)
+
+
+class IntensityModel:
+    """
+    Weighted sum of intensity factors with the coding scheme's weights and
+    thresholds, vectorized over a DataFrame of documents
+    """
+
+    def __init__(self, coding_scheme: Dict):
+        """
+        Args:
+            coding_scheme: Parsed coding_scheme.json with intensity_scoring
+                           factors and thresholds
+        """
+        scoring = coding_scheme['intensity_scoring']
+        self.weights = scoring['factors']
+        unknown = set(self.weights).difference(FACTORS)
+        if unknown:
+            raise ValueError(f"Unknown intensity factors {sorted(unknown)}, expected {FACTORS}")
+        # Levels ordered by lower bound; the scheme's ranges leave small gaps
+        # (0.33-0.34), which belong to the lower level
+        self.levels = sorted(scoring['thresholds'].items(), key=lambda item: item[1][0])
+        self.categories = list(coding_scheme['manipulation_categories'])
+
+    @property
+    def factor_columns(self) -> List[str]:
+        return [f'intensity_{factor}' for factor in self.weights]
+
+    def factors(self, df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Factor values (0-1) of every document
+
+        Args:
+            df: One row per document with STATISTIC_COLUMNS and the
+                strat_<category>_weighted columns
+
+        Returns:
+            DataFrame with one intensity_<factor> column per factor
+        """
+        per_1k = 1000 / df['stat_tokens'].clip(lower=1)
+        weighted = df[[f'strat_{category}_weighted' for category in self.categories]]
+        category_rates = weighted.clip(lower=0).mul(per_1k, axis=0)
+
+        hits = df['stat_keyword_hits']
+        # Opening density relative to an even spread (1.0)
+        lead_ratio = (df['stat_lead_hits'] / hits.clip(lower=1)) / LEAD_SHARE
+        repeats = (hits - df['stat_distinct_keywords']).clip(lower=0)
+
+        values = {
+            'keyword_frequency': ramp(category_rates.sum(axis=1), 0.0, FREQUENCY_SATURATION),
+            'keyword_variety': (category_rates >= CATEGORY_PRESENCE_RATE).mean(axis=1),
+            'emotional_intensity': ramp(df['stat_emotion_intensity_hits'] * per_1k,
+                                        0.0, EMOTION_SATURATION),
+            'repetition': ramp(repeats * per_1k, 0.0, REPETITION_SATURATION),
+            'positioning': ramp(lead_ratio, 1.0, POSITIONING_SATURATION)
+        }
+        return pd.DataFrame({
+            f'intensity_{factor}': values[factor].fillna(0.0) for factor in self.weights
+        }, index=df.index)
+
+    def level(self, intensity: pd.Series) -> pd.Series:
+        """Threshold level ('low', 'medium', 'high') of each intensity"""
+        names = [name for name, _ in self.levels]
+        bounds = [-np.inf] + [bounds[0] for _, bounds in self.levels[1:]] + [np.inf]
+        return pd.cut(intensity, bounds, labels=names, right=False).astype(str)
+
+    def score(self, df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Factors, weighted intensity and level of every document
+
+        Returns:
+            DataFrame with the intensity_<factor> columns,
+            'manipulation_intensity' and 'intensity_level'
+        """
+        factors = self.factors(df)
+        weights = np.array([self.weights[factor] for factor in self.weights])
+        intensity = factors.to_numpy() @ weights / weights.sum()
+        factors['manipulation_intensity'] = intensity
+        factors['intensity_level'] = self.level(factors['manipulation_intensity'])
+        return factors
+
+    def apply(self, df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Copy of a results DataFrame with its intensity columns filled in
+        (existing columns keep their position)
+        """
+        df = df.copy()
+        if df.empty:
+            return df
+        scores = self.score(df)
+        for column in scores.columns:
+            df[column] = scores[column]
+        return df
+
+
+if __name__ == "__main__":
+    with open(CODING_SCHEME_PATH, 'r', encoding='utf-8') as f:
+        model = IntensityModel(json.load(f))
+    scores = model.score(pd.read_csv(RESULTS_PATH))
+    print(scores.drop(columns='intensity_level').describe().T.round(3).to_string())
+    print()
+    print(scores['intensity_level'].value_counts().to_string())
@@ -0,0 +1,452 @@
+"""
+Multi-Pattern Keyword Matcher
+Master's Thesis: Psychological Manipulation in Marketing Discourse
+
+Compiles every lexicon of the coding scheme (manipulation keywords, emotion
+markers and intensity indicators, sector markers, intensity modifiers and
+hedging markers) into a single Aho-Corasick automaton, so every lexicon hit
+in a document is found in one linear pass instead of one substring scan per
+lexicon entry. All analysis scripts share this index.
+
+Two match modes are available:
+- 'substring': raw substring containment on the lowercased text (the
+  original behaviour, where "now" also matches inside "know")
+- 'token': the text is tokenized once into integer token ids and keywords
+  are matched as whole-token n-grams through a hash index
+"""
+
+import re
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# Use the C implementation when installed, otherwise fall back to pure Python
+try:
+    import ahocorasick
+    AHOCORASICK_AVAILABLE = True
+except ImportError:
+    AHOCORASICK_AVAILABLE = False
+
+MATCH_MODES = ('substring', 'token')
+
+# Words keep inner apostrophes and hyphens ("don't", "anti-aging"); any other
+# non-space character is a token of its own ("#", "!")
+TOKEN_PATTERN = re.compile(r"[^\W_]+(?:['\-][^\W_]+)*|\S")
+
+
+def lowercase_preserving_offsets(text: str) -> str:
+    """
+    Lowercase text without changing its length, so offsets found in the
+    lowercased text can be used to slice the original text.
+    """
+    text_lower = text.lower()
+    if len(text_lower) == len(text):
+        return text_lower
+    # A few characters (e.g. 'İ') expand when lowercased; keep the first char
+    return ''.join(char.lower()[0] for char in text)
+
+
+def tokenize(text_lower: str) -> Tuple[List[str], List[int]]:
+    """
+    Split lowercased text into tokens
+
+    Returns:
+        Tuple of (tokens, character start offset of each token)
+    """
+    # Curly apostrophes are common in scraped text ("don’t")
+    text_lower = text_lower.replace('\u2019', "'")
+    tokens = []
+    starts = []
+    for match in TOKEN_PATTERN.finditer(text_lower):
+        tokens.append(match.group())
+        starts.append(match.start())
+    return tokens, starts
+
+
+def keyword_term(keyword: str) -> str:
+    """Normalized space-joined token form of a keyword, e.g. '#1' -> '# 1'"""
+    tokens, _ = tokenize(keyword.lower())
+    return ' '.join(tokens)
+
+
+def group_offsets(matches: List[Tuple[int, str]]) -> Dict[str, List[int]]:
+    """Group (start offset, keyword) matches into sorted offsets per keyword"""
+    offsets = defaultdict(list)
+    for start, keyword in matches:
+        offsets[keyword].append(start)
+    return dict(offsets)
+
+
+class KeywordMatcher:
+    """
+    Aho-Corasick automaton over a fixed set of keywords
+    """
+
+    def __init__(self, keywords: Iterable[str]):
+        """
+        Build the automaton once for the given keywords
+
+        Args:
+            keywords: Keywords to match; matching is exact (case-sensitive),
+                      so pass lowercased text to match lowercase keywords
+        """
+        self.keywords = sorted(set(keyword for keyword in keywords if keyword))
+
+        self._automaton = None
+        if AHOCORASICK_AVAILABLE:
+            self._automaton = ahocorasick.Automaton()
+            for keyword in self.keywords:
+                self._automaton.add_word(keyword, keyword)
+            if self.keywords:
+                self._automaton.make_automaton()
+        else:
+            self._build_automaton()
+
+    def _build_automaton(self):
+        """Build goto, failure and output tables for the pure Python matcher"""
+        self._goto = [{}]
+        self._fail = [0]
+        self._output = [[]]
+
+        # Trie of all keywords
+        for keyword in self.keywords:
+            state = 0
+            for char in keyword:
+                next_state = self._goto[state].get(char)
+                if next_state is None:
+                    next_state = len(self._goto)
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._output.append([])
+                    self._goto[state][char] = next_state
+                state = next_state
+            self._output[state].append(keyword)
+
+        # Failure links in breadth-first order
+        queue = list(self._goto[0].values())
+        for state in queue:
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fallback = self._fail[state]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[next_state] = self._goto[fallback].get(char, 0)
+                self._output[next_state] = (
+                    self._output[next_state] + self._output[self._fail[next_state]]
+                )
+
+    def find_all(self, text: str) -> List[Tuple[int, str]]:
+        """
+        Find every (possibly overlapping) keyword occurrence in one pass
+
+        Returns:
+            List of (start offset, keyword) tuples ordered by end offset
+        """
+        if not self.keywords:
+            return []
+
+        if self._automaton is not None:
+            return [
+                (end - len(keyword) + 1, keyword)
+                for end, keyword in self._automaton.iter(text)
+            ]
+
+        goto, fail, output = self._goto, self._fail, self._output
+        matches = []
+        state = 0
+        for index, char in enumerate(text):
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if output[state]:
+                for keyword in output[state]:
+                    matches.append((index - len(keyword) + 1, keyword))
+        return matches
+
+    def find_offsets(self, text: str) -> Dict[str, List[int]]:
+        """
+        Find every keyword occurrence in one pass, grouped by keyword
+
+        Returns:
+            Dictionary mapping each keyword found to its sorted start offsets
+        """
+        # Matches arrive ordered by end offset, which is start order per keyword
+        return group_offsets(self.find_all(text))
+
+
+class TokenMatcher:
+    """
+    Whole-token n-gram matcher over a fixed set of keywords
+    """
+
+    def __init__(self, keywords: Iterable[str]):
+        """
+        Build the token vocabulary and n-gram hash index once
+
+        Args:
+            keywords: Keywords to match; matching is case-insensitive and
+                      only succeeds on token boundaries
+        """
+        self.keywords = sorted(set(keyword for keyword in keywords if keyword))
+
+        # Token ids start at 1; 0 marks tokens that occur in no keyword
+        self.vocabulary = {}
+        # n-gram of token ids -> keywords with that tokenization
+        self._ngrams = defaultdict(list)
+        # first token id -> n-gram lengths starting with it, longest first
+        self._lengths = defaultdict(set)
+
+        for keyword in self.keywords:
+            tokens, _ = tokenize(keyword.lower())
+            if not tokens:
+                continue
+            ngram = tuple(
+                self.vocabulary.setdefault(token, len(self.vocabulary) + 1)
+                for token in tokens
+            )
+            self._ngrams[ngram].append(keyword)
+            self._lengths[ngram[0]].add(len(ngram))
+
+        self._ngrams = dict(self._ngrams)
+        self._lengths = {
+            token_id: sorted(lengths, reverse=True)
+            for token_id, lengths in self._lengths.items()
+        }
+
+    def token_ids(self, tokens: List[str]) -> List[int]:
+        """Map tokens to their integer ids (0 for out-of-vocabulary tokens)"""
+        vocabulary = self.vocabulary
+        return [vocabulary.get(token, 0) for token in tokens]
+
+    def find_all(self, text: str,
+                 tokenized: Optional[Tuple[List[str], List[int]]] = None) -> List[Tuple[int, str]]:
+        """
+        Find every keyword occurring as whole tokens in one pass
+
+        Args:
+            text: Lowercased text
+            tokenized: tokenize(text), if already computed
+
+        Returns:
+            List of (start offset, keyword) tuples ordered by start offset
+        """
+        tokens, starts = tokenized if tokenized is not None else tokenize(text)
+        token_ids = self.token_ids(tokens)
+        ngrams, lengths = self._ngrams, self._lengths
+
+        matches = []
+        for position, token_id in enumerate(token_ids):
+            if token_id not in lengths:
+                continue
+            for length in lengths[token_id]:
+                ngram = tuple(token_ids[position:position + length])
+                for keyword in ngrams.get(ngram, ()):
+                    matches.append((starts[position], keyword))
+        return matches
+
+    def find_offsets(self, text: str,
+                     tokenized: Optional[Tuple[List[str], List[int]]] = None) -> Dict[str, List[int]]:
+        """
+        Find every keyword occurrence in one pass, grouped by keyword
+
+        Returns:
+            Dictionary mapping each keyword found to its sorted start offsets
+        """
+        return group_offsets(self.find_all(text, tokenized))
+
+
+# Lexicon groups compiled from the coding scheme
+MANIPULATION = 'manipulation'
+EMOTION_MARKER = 'emotion_marker'
+EMOTION_INTENSITY = 'emotion_intensity'
+SECTOR_MARKER = 'sector_marker'
+MODIFIER = 'modifier'
+
+
+def sector_key(sector: str) -> str:
+    """Map a materials directory name to its sector_specific_patterns key"""
+    return sector.lower().replace('_cosmetics', '')
+
+
+class LexiconIndex:
+    """
+    Single keyword index over all lexicons of the coding scheme
+    """
+
+    def __init__(self, coding_scheme: Dict, match_mode: str = 'substring'):
+        """
+        Compile all lexicons into one matcher
+
+        Args:
+            coding_scheme: Parsed coding_scheme.json
+            match_mode: One of MATCH_MODES
+        """
+        if match_mode not in MATCH_MODES:
+            raise ValueError(f"Unknown match mode {match_mode!r}, expected one of {MATCH_MODES}")
+        self.match_mode = match_mode
+
+        # group -> category -> keywords, in coding scheme order
+        self.lexicons = {
+            MANIPULATION: {
+                category: details['keywords']
+                for category, details in coding_scheme['manipulation_categories'].items()
+            },
+            EMOTION_MARKER: {
+                emotion: details['linguistic_markers']
+                for emotion, details in coding_scheme['emotion_categories'].items()
+            },
+            EMOTION_INTENSITY: {
+                emotion: details['intensity_indicators']
+                for emotion, details in coding_scheme['emotion_categories'].items()
+            },
+            SECTOR_MARKER: {
+                sector: details.get('unique_markers', [])
+                for sector, details in coding_scheme['sector_specific_patterns'].items()
+            },
+            MODIFIER: {
+                modifier_type: coding_scheme['analysis_guidelines'].get(modifier_type, [])
+                for modifier_type in ['intensity_modifiers', 'hedging_markers']
+            }
+        }
+
+        matcher_class = TokenMatcher if match_mode == 'token' else KeywordMatcher
+        self.matcher = matcher_class(
+            keyword
+            for categories in self.lexicons.values()
+            for keywords in categories.values()
+            for keyword in keywords
+        )
+
+    def scan(self, text: str, text_lower: Optional[str] = None,
+             tokenized: Optional[Tuple[List[str], List[int]]] = None) -> 'LexiconHits':
+        """
+        Find all lexicon hits in a document with a single pass
+
+        Args:
+            text: Original (not lowercased) document text
+            text_lower: Its lowercase_preserving_offsets() form, if already computed
+            tokenized: tokenize(text_lower), if already computed (used in
+                       'token' mode)
+        """
+        if text_lower is None:
+            text_lower = lowercase_preserving_offsets(text)
+        if self.match_mode == 'token':
+            return LexiconHits(self.lexicons, self.matcher.find_offsets(text_lower, tokenized))
+        return LexiconHits(self.lexicons, self.matcher.find_offsets(text_lower))
+
+    @property
+    def keywords(self) -> List[str]:
+        """Every keyword of every lexicon, sorted"""
+        return self.matcher.keywords
+
+    def hits(self, keyword_offsets: Dict[str, List[int]]) -> 'LexiconHits':
+        """Lexicon hits from a stored keyword occurrence index, without scanning"""
+        return LexiconHits(self.lexicons, keyword_offsets)
+
+    def update_offsets(self, text: str, keyword_offsets: Dict[str, List[int]],
+                       scanned_keywords: Iterable[str]) -> Dict[str, List[int]]:
+        """
+        Extend a stored keyword occurrence index to the current lexicons
+
+        Occurrences of one keyword do not depend on the other keywords, so
+        only keywords the stored index was not built with are scanned for.
+
+        Args:
+            text: Original (not lowercased) document text
+            keyword_offsets: Stored occurrence index of the document
+            scanned_keywords: Keywords the stored index was built with
+
+        Returns:
+            Occurrence index covering every current keyword
+        """
+        missing = set(self.matcher.keywords).difference(scanned_keywords)
+        if not missing:
+            return keyword_offsets
+        matcher = type(self.matcher)(missing)
+        updated = dict(keyword_offsets)
+        updated.update(matcher.find_offsets(lowercase_preserving_offsets(text)))
+        return updated
+
+
+class LexiconHits:
+    """
+    Keyword occurrences of one document, with per-category aggregations
+    """
+
+    def __init__(self, lexicons: Dict[str, Dict[str, List[str]]],
+                 keyword_offsets: Dict[str, List[int]]):
+        self.lexicons = lexicons
+        self.keyword_offsets = keyword_offsets
+
+    def offsets(self, keyword: str) -> List[int]:
+        """Sorted start offsets of a keyword in the document"""
+        return self.keyword_offsets.get(keyword, [])
+
+    def keyword_counts(self, group: str, category: str) -> Dict[str, int]:
+        """Occurrence count per keyword of one category"""
+        return {
+            keyword: len(self.offsets(keyword))
+            for keyword in self.lexicons[group][category]
+        }
+
+    def counts(self, group: str) -> Dict[str, int]:
+        """Total keyword occurrences per category of a lexicon group"""
+        return {
+            category: sum(len(self.offsets(keyword)) for keyword in keywords)
+            for category, keywords in self.lexicons[group].items()
+        }
+
+    def presence(self, group: str) -> Dict[str, int]:
+        """Number of category keywords that occur at least once"""
+        return {
+            category: sum(1 for keyword in keywords if keyword in self.keyword_offsets)
+            for category, keywords in self.lexicons[group].items()
+        }
+
+
+def keyword_contexts(text: str, starts: List[int], keyword_length: int,
+                     window: int = 30) -> List[Tuple[int, int]]:
+    """
+    Slice context windows around keyword occurrences without regex
+
+    Reproduces the spans of re.findall(r'.{0,30}' + keyword + r'.{0,30}'):
+    windows stay on one line, and occurrences that fall inside the window of
+    an earlier match are absorbed into it.
+
+    Args:
+        text: Original text the offsets refer to
+        starts: Sorted start offsets of one keyword
+        keyword_length: Length of the keyword
+        window: Maximum characters of context on each side
+
+    Returns:
+        List of (start, end) spans, one per context
+    """
+    spans = []
+    search_from = 0
+    index = 0
+    while index < len(starts):
+        first = starts[index]
+        if first < search_from:
+            index += 1
+            continue
+
+        line_start = text.rfind('\n', 0, first) + 1
+        line_end = text.find('\n', first)
+        if line_end == -1:
+            line_end = len(text)
+
+        span_start = max(search_from, first - window, line_start)
+
+        # The leading window is greedy, so it reaches the last occurrence in range
+        last = index
+        while (last + 1 < len(starts)
+               and starts[last + 1] <= span_start + window
+               and starts[last + 1] + keyword_length <= line_end):
+            last += 1
+
+        span_end = min(starts[last] + keyword_length + window, line_end)
+        spans.append((span_start, span_end))
+        search_from = span_end
+        index = last + 1
+
+    return spans
@@ -0,0 +1,287 @@
+"""
+Parallel Brand Analysis
+Master's Thesis: Psychological Manipulation in Marketing Discourse
+
+Runs per-brand analyses in a process pool. Sentiment scoring, tokenization
+and POS tagging are CPU-bound pure Python, so threads do not help; each
+worker process builds its own analyzer (sentiment analyzer, stopwords,
+lexicon index) once and then analyzes every brand it is sent.
+
+Jobs from all sectors can share one pool: a worker derives per-sector
+analyzers from its base analyzer with for_sector(), so resources are
+loaded once per process rather than once per sector.
+
+With result caches, only the work invalidated by a change is redone: a
+changed text is indexed again in the pool, while a changed coding scheme
+only re-scores the stored document indexes in this process.
+"""
+
+import csv
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Optional, Tuple, Union
+
+from corpus_store import StoredDocument, StoredTexts
+from parsed_document import StageTimings
+from result_cache import ResultCache, split_cached
+
+# Base analyzer and per-sector analyzers of the current worker process
+_worker_analyzer = None
+_worker_sector_analyzers = {}
+
+
+def _init_worker(analyzer_class, init_args: tuple):
+    """Build the analyzer once per worker process"""
+    global _worker_analyzer
+    _worker_analyzer = analyzer_class(*init_args)
+    _worker_sector_analyzers.clear()
+
+
+def _job_text(texts, brand_name: str):
+    """Text sent to a worker: stored texts go as a reference, not a copy"""
+    if isinstance(texts, StoredTexts):
+        return texts.reference(brand_name)
+    return texts[brand_name]
+
+
+def _analyze_in_worker(method_name: str, sector: str, brand_name: str,
+                       text: Union[str, StoredDocument]) -> Tuple[Optional[Dict], Optional[str]]:
+    """Analyze one brand in a worker; errors are returned, not raised"""
+    analyzer = _worker_sector_analyzers.get(sector)
+    if analyzer is None:
+        analyzer = _worker_analyzer.for_sector(sector)
+        _worker_sector_analyzers[sector] = analyzer
+
+    if isinstance(text, StoredDocument):
+        # Read from this worker's own mapping of the corpus store
+        analyzer.texts = text.texts()
+    else:
+        analyzer.texts = {brand_name: text}
+    try:
+        return getattr(analyzer, method_name)(brand_name), None
+    except Exception as e:
+        return None, str(e)
+    finally:
+        analyzer.texts = {}
+
+
+def run_brand_jobs(analyzers: Dict, init_args: tuple, method_name: str,
+                   workers: int) -> Iterator[Tuple[str, str, Optional[Dict], Optional[str]]]:
+    """
+    Analyze every (sector, brand) pair, in one shared pool if workers > 1
+
+    Args:
+        analyzers: Dictionary mapping sector to an analyzer with loaded texts
+        init_args: Constructor arguments for the base analyzer in each worker
+        method_name: Per-brand analysis method, e.g. 'analyze_brand'
+        workers: Number of worker processes; 1 analyzes in this process
+
+    Yields:
+        (sector, brand name, analysis result or None, error message or None)
+        as jobs finish
+    """
+    if workers <= 1:
+        for sector, analyzer in analyzers.items():
+            for brand_name in analyzer.texts:
+                try:
+                    yield sector, brand_name, getattr(analyzer, method_name)(brand_name), None
+                except Exception as e:
+                    yield sector, brand_name, None, str(e)
+        return
+
+    analyzer_class = type(next(iter(analyzers.values())))
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(analyzer_class, init_args)) as pool:
+        futures = {
+            pool.submit(_analyze_in_worker, method_name, sector, brand_name,
+                        _job_text(analyzer.texts, brand_name)): (sector, brand_name)
+            for sector, analyzer in analyzers.items()
+            for brand_name in analyzer.texts
+        }
+        for future in as_completed(futures):
+            sector, brand_name = futures[future]
+            try:
+                analysis, error = future.result()
+            except Exception as e:
+                # Worker crashed or result could not be transferred
+                analysis, error = None, str(e)
+            yield sector, brand_name, analysis, error
+
+
+def run_incremental_jobs(analyzers: Dict, init_args: tuple, workers: int,
+                         result_cache: Optional[ResultCache] = None,
+                         document_cache: Optional[ResultCache] = None,
+                         prepare: Optional[Callable[[Dict], None]] = None,
+                         stage_timings: Optional[StageTimings] = None,
+                         prefetch: Optional[Callable[[Dict], None]] = None
+                         ) -> Iterator[Tuple[str, str, Optional[Dict], Optional[str]]]:
+    """
+    Analyze every (sector, brand) pair, redoing only invalidated work
+
+    Analyzers split a brand analysis in two stages: index_document() does
+    the coding-scheme-independent work (sentiment, tokenization, keyword
+    occurrence index) and runs in the pool, score_document() applies the
+    coding scheme to a document record and is cheap. A brand with a cached
+    result is reused as is; a brand with a cached document record is only
+    scanned for keywords new to the coding scheme and re-scored.
+
+    Args:
+        analyzers: Dictionary mapping sector to an analyzer with loaded texts
+        init_args: Constructor arguments for the base analyzer in each worker
+        workers: Number of worker processes; 1 analyzes in this process
+        result_cache: Optional cache of complete analyses, see cache_key()
+        document_cache: Optional cache of document records, see document_key()
+        prepare: Optional callback run on the analyzers restricted to the
+                 brands that must be indexed, before indexing starts
+        stage_timings: Optional collector of the per-stage timings of the
+                       documents indexed in this run
+        prefetch: Optional callback run on the analyzers restricted to the
+                  brands that must be scored (re-scored or indexed), before
+                  scoring starts
+
+    Yields:
+        (sector, brand name, analysis result or None, error message or None)
+    """
+    cached, result_keys, pending = {}, {}, analyzers
+    if result_cache is not None:
+        cached, result_keys, pending = split_cached(analyzers, result_cache)
+    documents, document_keys, unindexed = {}, {}, pending
+    if document_cache is not None:
+        documents, document_keys, unindexed = split_cached(pending, document_cache, 'document_key')
+
+    print(f"{len(cached)} cached results, {len(documents)} brands to re-score, "
+          f"{sum(len(a.texts) for a in unindexed.values())} brands to index")
+
+    def score(analyzer, sector, brand_name, document, indexed):
+        # Timings describe this run, so they are not cached with the document
+        timings = document.pop('timings', {})
+        start = time.perf_counter()
+        changed = analyzer.update_document(brand_name, document)
+        if document_cache is not None and (indexed or changed):
+            document_cache.put(document_keys[(sector, brand_name)], document)
+        analysis = analyzer.score_document(brand_name, document)
+        if indexed and stage_timings is not None:
+            stage_timings.add({**timings, 'scoring': time.perf_counter() - start})
+        if result_cache is not None:
+            result_cache.put(result_keys[(sector, brand_name)], analysis)
+        return analysis
+
+    for (sector, brand_name), analysis in cached.items():
+        yield sector, brand_name, analysis, None
+
+    if prefetch is not None and pending:
+        prefetch(pending)
+    for (sector, brand_name), document in documents.items():
+        try:
+            yield sector, brand_name, score(pending[sector], sector, brand_name, document, False), None
+        except Exception as e:
+            yield sector, brand_name, None, str(e)
+
+    if not unindexed:
+        return
+    if prepare is not None:
+        prepare(unindexed)
+    for sector, brand_name, document, error in run_brand_jobs(
+            unindexed, init_args, 'index_document', workers):
+        if error is None:
+            try:
+                yield sector, brand_name, score(unindexed[sector], sector, brand_name, document, True), None
+                continue
+            except Exception as e:
+                error = str(e)
+        yield sector, brand_name, None, error
+
+
+class CSVStream:
+    """
+    CSV file written one row at a time, so partial results survive a crash
+    """
+
+    def __init__(self, path: Path, flush_each_row: bool = True):
+        """
+        Args:
+            path: Output CSV file
+            flush_each_row: Flush after every row; turn off for streams of
+                            many small rows such as per-sentence scores
+        """
+        self.path = path
+        self.flush_each_row = flush_each_row
+        self._file = None
+        self._writer = None
+
+    def write(self, row: Dict):
+        """Append a row; the header is taken from the first row"""
+        if self._writer is None:
+            self._file = open(self.path, 'w', newline='', encoding='utf-8')
+            self._writer = csv.DictWriter(self._file, fieldnames=list(row), extrasaction='ignore')
+            self._writer.writeheader()
+        self._writer.writerow(row)
+        if self.flush_each_row:
+            self._file.flush()
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class ParquetStream:
+    """
+    Parquet file written in row groups of a fixed number of rows, so
+    memory stays bounded however many rows are written (requires pyarrow)
+    """
+
+    def __init__(self, path: Path, rows_per_group: int = 10000):
+        """
+        Args:
+            path: Output Parquet file
+            rows_per_group: Rows buffered before a row group is written
+        """
+        self.path = path
+        self.rows_per_group = rows_per_group
+        self._rows = []
+        self._file = None
+        self._writer = None
+
+    def write(self, row: Dict):
+        """Append a row; the schema is taken from the first row group"""
+        self._rows.append(row)
+        if len(self._rows) >= self.rows_per_group:
+            self._flush()
+
+    def _flush(self):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        if self._writer is None:
+            table = pa.Table.from_pylist(self._rows)
+            self._file = open(self.path, 'wb')
+            self._writer = pq.ParquetWriter(self._file, table.schema)
+        else:
+            table = pa.Table.from_pylist(self._rows, schema=self._writer.schema)
+        self._writer.write_table(table)
+        self._rows = []
+
+    def close(self):
+        if self._rows:
+            self._flush()
+        if self._writer is not None:
+            self._writer.close()
+            self._file.close()
+            self._writer = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def ordered_rows(rows: Dict[str, Dict], brand_order: List[str]) -> List[Dict]:
+    """Rows of the finished brands in load order"""
+    return [rows[brand_name] for brand_name in brand_order if brand_name in rows]
@@ -0,0 +1,145 @@
+"""
+Parsed Documents
+Master's Thesis: Psychological Manipulation in Marketing Discourse
+
+A ParsedDocument tokenizes a brand text once and shares the result with
+every analysis component: sentence spans, word tokens, POS tags, and the
+offset-preserving lowercase text and tokens used for keyword matching are
+computed lazily on first use and then reused. Each parsing and analysis
+stage is timed per document, and StageTimings aggregates the timings of a
+run.
+"""
+
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Tuple
+
+from nltk.tokenize import word_tokenize
+
+from keyword_matcher import lowercase_preserving_offsets, tokenize
+from resources import get_sentence_splitter
+
+
+class ParsedDocument:
+    """
+    One document with its tokenization, computed once and shared
+    """
+
+    __slots__ = ('text', 'timings', '_text_lower', '_keyword_tokens', '_sentence_spans',
+                 '_sentence_words', '_words', '_pos_tags')
+
+    def __init__(self, text: str, text_lower: Optional[str] = None):
+        """
+        Args:
+            text: Document text
+            text_lower: lowercase_preserving_offsets(text), if already known
+        """
+        self.text = text
+        # Stage name -> seconds spent on this document
+        self.timings = {}
+        self._text_lower = text_lower
+        self._keyword_tokens = None
+        self._sentence_spans = None
+        self._sentence_words = None
+        self._words = None
+        # Tagger backend name -> tags of the word tokens
+        self._pos_tags = {}
+
+    @contextmanager
+    def timed(self, stage: str):
+        """Add the wall-clock time of a block to the stage's timing"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.timings[stage] = self.timings.get(stage, 0.0) + time.perf_counter() - start
+
+    @property
+    def text_lower(self) -> str:
+        """Lowercased text with the same character offsets as the text"""
+        if self._text_lower is None:
+            with self.timed('lowercase'):
+                self._text_lower = lowercase_preserving_offsets(self.text)
+        return self._text_lower
+
+    @property
+    def keyword_tokens(self) -> Tuple[List[str], List[int]]:
+        """Lowercase tokens and their offsets, as used for keyword matching"""
+        if self._keyword_tokens is None:
+            text_lower = self.text_lower
+            with self.timed('keyword_tokens'):
+                self._keyword_tokens = tokenize(text_lower)
+        return self._keyword_tokens
+
+    @property
+    def sentence_spans(self) -> List[Tuple[int, int]]:
+        """(start, end) character offsets of each sentence"""
+        if self._sentence_spans is None:
+            with self.timed('sentences'):
+                self._sentence_spans = list(get_sentence_splitter().span_tokenize(self.text))
+        return self._sentence_spans
+
+    @property
+    def sentences(self) -> List[str]:
+        """Sentences, identical to sent_tokenize(text)"""
+        return [self.text[start:end] for start, end in self.sentence_spans]
+
+    @property
+    def sentence_words(self) -> List[List[str]]:
+        """Word tokens of each sentence"""
+        if self._sentence_words is None:
+            sentences = self.sentences
+            with self.timed('words'):
+                self._sentence_words = [
+                    word_tokenize(sentence, preserve_line=True) for sentence in sentences
+                ]
+        return self._sentence_words
+
+    @property
+    def words(self) -> List[str]:
+        """Word tokens, identical to word_tokenize(text) without re-splitting sentences"""
+        if self._words is None:
+            self._words = [word for words in self.sentence_words for word in words]
+        return self._words
+
+    def pos_tags(self, tagger) -> List[str]:
+        """
+        Penn Treebank tag of each word token
+
+        Args:
+            tagger: Tagger backend from pos_taggers.get_pos_tagger()
+        """
+        if tagger.name not in self._pos_tags:
+            sentence_words = self.sentence_words
+            with self.timed('pos_tags'):
+                self._pos_tags[tagger.name] = tagger.tag(sentence_words)
+        return self._pos_tags[tagger.name]
+
+
+class StageTimings:
+    """
+    Wall-clock time per stage accumulated over many documents
+    """
+
+    def __init__(self):
+        self.totals = defaultdict(float)
+        self.documents = 0
+
+    def add(self, timings: Dict[str, float]):
+        """Add the stage timings of one document"""
+        self.documents += 1
+        for stage, seconds in timings.items():
+            self.totals[stage] += seconds
+
+    def report(self) -> str:
+        """Table of total and per-document time per stage, slowest first"""
+        if not self.documents:
+            return "No documents timed"
+        overall = sum(self.totals.values()) or 1.0
+        lines = [f"{'Stage':<22}{'Total (s)':>10}{'Per doc (ms)':>14}{'Share':>8}"]
+        for stage, seconds in sorted(self.totals.items(), key=lambda item: -item[1]):
+            lines.append(f"{stage:<22}{seconds:>10.2f}{seconds / self.documents * 1000:>14.1f}"
+                         f"{seconds / overall:>8.1%}")
+        lines.append(f"{'Total':<22}{overall:>10.2f}  ({self.documents} documents)")
+        return '\n'.join(lines)
@@ -0,0 +1,180 @@
+"""
+Part-of-Speech Tagger Backends
+Master's Thesis: Psychological Manipulation in Marketing Discourse
+
+Interchangeable taggers for the adjective / adverb / verb counts of the
+linguistic features. All backends take the word tokens of a document,
+sentence by sentence, and return one Penn Treebank tag per token:
+
+- 'nltk': NLTK's averaged perceptron over the whole word list (original)
+- 'spacy': spaCy's statistical tagger on the same tokens, sentences batched
+  through nlp.pipe with the parser, NER and lemmatizer disabled
+- 'lexicon': per-word lookup of the most frequent tag, with suffix rules for
+  unknown words; an approximation for quick exploratory runs
+"""
+
+from functools import lru_cache
+from typing import Dict, List, Optional
+
+from resources import SPACY_MODEL, get_perceptron_tagger, get_spacy_pipeline
+
+TAGGER_BACKENDS = ('nltk', 'spacy', 'lexicon')
+
+# Penn Treebank tags counted as linguistic features
+TAG_GROUPS = {
+    'adjective': ('JJ', 'JJR', 'JJS'),
+    'adverb': ('RB', 'RBR', 'RBS'),
+    'verb': ('VB', 'VBD', 'VBG', 'VBN', 'VBP', 'VBZ')
+}
+
+
+class NLTKTagger:
+    """NLTK averaged perceptron, identical to nltk.pos_tag(words)"""
+
+    name = 'nltk'
+
+    def __init__(self):
+        self.tagger = get_perceptron_tagger()
+
+    def tag(self, sentence_words: List[List[str]]) -> List[str]:
+        # One call over the whole document, as nltk.pos_tag(words) did
+        words = [word for words in sentence_words for word in words]
+        return [tag for _, tag in self.tagger.tag(words)]
+
+
+class SpacyTagger:
+    """spaCy tagger on pre-tokenized sentences, in batches"""
+
+    name = 'spacy'
+
+    def __init__(self, model: str = SPACY_MODEL, batch_size: int = 256):
+        self.nlp = get_spacy_pipeline(model)
+        self.batch_size = batch_size
+
+    def tag(self, sentence_words: List[List[str]]) -> List[str]:
+        from spacy.tokens import Doc
+
+        # Docs built from the NLTK tokens keep the token counts aligned
+        docs = (Doc(self.nlp.vocab, words=words) for words in sentence_words if words)
+        return [
+            token.tag_
+            for doc in self.nlp.pipe(docs, batch_size=self.batch_size)
+            for token in doc
+        ]
+
+
+# Frequent function words, used when no tagger lexicon is installed
+CLOSED_CLASS_TAGS = {
+    **dict.fromkeys(['the', 'a', 'an', 'this', 'that', 'these', 'those', 'every',
+                     'each', 'some', 'any', 'no', 'all'], 'DT'),
+    **dict.fromkeys(['i', 'you', 'he', 'she', 'it', 'we', 'they', 'me', 'him',
+                     'her', 'us', 'them'], 'PRP'),
+    **dict.fromkeys(['my', 'your', 'his', 'its', 'our', 'their'], 'PRP$'),
+    **dict.fromkeys(['in', 'on', 'at', 'of', 'for', 'with', 'from', 'by', 'about',
+                     'into', 'through', 'over', 'under', 'between', 'without'], 'IN'),
+    **dict.fromkeys(['and', 'or', 'but', 'nor'], 'CC'),
+    **dict.fromkeys(['can', 'could', 'will', 'would', 'shall', 'should', 'may',
+                     'might', 'must'], 'MD'),
+    **dict.fromkeys(['not', "n't", 'very', 'so', 'too', 'also', 'just', 'never',
+                     'always', 'now', 'here', 'there', 'even', 'still', 'again',
+                     'already', 'often', 'soon', 'ever'], 'RB'),
+    **dict.fromkeys(['is', "'s"], 'VBZ'),
+    **dict.fromkeys(['are', 'am', "'re", "'m"], 'VBP'),
+    **dict.fromkeys(['was', 'were', 'had', 'did'], 'VBD'),
+    **dict.fromkeys(['be', 'have', 'do', 'get', 'make', 'take', 'give', 'find',
+                     'shop', 'discover', 'explore', 'buy', 'try'], 'VB'),
+    **dict.fromkeys(['been'], 'VBN'),
+    **dict.fromkeys(['has', 'does'], 'VBZ'),
+    **dict.fromkeys(['more', 'less'], 'JJR'),
+    **dict.fromkeys(['most', 'best', 'least'], 'JJS'),
+    'to': 'TO',
+}
+
+# (suffix, tag) rules for words missing from the lexicon, checked in order
+SUFFIX_TAGS = [
+    ('ly', 'RB'), ('ing', 'VBG'), ('ed', 'VBD'), ('est', 'JJS'),
+    ('ous', 'JJ'), ('ful', 'JJ'), ('able', 'JJ'), ('ible', 'JJ'), ('ive', 'JJ'),
+    ('less', 'JJ'), ('ic', 'JJ'), ('al', 'JJ'), ('ish', 'JJ'), ('ary', 'JJ'),
+    ('ize', 'VB'), ('ise', 'VB'), ('ify', 'VB'), ('ness', 'NN'), ('ment', 'NN'),
+    ('tion', 'NN'), ('ss', 'NN'), ('s', 'NNS'),
+]
+
+
+class LexiconTagger:
+    """
+    Context-free tag lookup: each word gets its most frequent tag
+    """
+
+    name = 'lexicon'
+
+    def __init__(self, lexicon: Optional[Dict[str, str]] = None):
+        """
+        Args:
+            lexicon: Word -> tag dictionary; defaults to the unambiguous
+                     words of the NLTK perceptron model when installed
+        """
+        if lexicon is None:
+            lexicon = {}
+            try:
+                lexicon = get_perceptron_tagger().tagdict
+            except Exception:
+                print("Perceptron tagger data not available; lexicon tagger uses suffix rules only")
+        self.lexicon = {**CLOSED_CLASS_TAGS, **lexicon}
+        # Tags of every word seen so far, shared across documents
+        self._tags = {}
+
+    def tag_word(self, word: str) -> str:
+        """Tag of a single word without context"""
+        tag = self.lexicon.get(word) or self.lexicon.get(word.lower())
+        if tag is not None:
+            return tag
+        if not any(char.isalnum() for char in word):
+            return '.'
+        if any(char.isdigit() for char in word):
+            return 'CD'
+        if word[0].isupper():
+            return 'NNP'
+        lower = word.lower()
+        for suffix, suffix_tag in SUFFIX_TAGS:
+            if lower.endswith(suffix) and len(lower) > len(suffix) + 2:
+                return suffix_tag
+        return 'NN'
+
+    def tag(self, sentence_words: List[List[str]]) -> List[str]:
+        tags = self._tags
+        result = []
+        for words in sentence_words:
+            for word in words:
+                tag = tags.get(word)
+                if tag is None:
+                    tag = tags[word] = self.tag_word(word)
+                result.append(tag)
+        return result
+
+
+@lru_cache(maxsize=None)
+def get_pos_tagger(backend: str = 'nltk'):
+    """
+    Tagger for a backend name, created once per process
+
+    Args:
+        backend: One of TAGGER_BACKENDS
+    """
+    if backend == 'nltk':
+        return NLTKTagger()
+    if backend == 'spacy':
+        return SpacyTagger()
+    if backend == 'lexicon':
+        return LexiconTagger()
+    raise ValueError(f"Unknown POS tagger backend {backend!r}, expected one of {TAGGER_BACKENDS}")
+
+
+def count_tag_groups(tags: List[str]) -> Dict[str, int]:
+    """Number of adjective, adverb and verb tags"""
+    counts = dict.fromkeys(TAG_GROUPS, 0)
+    group_of = {tag: group for group, group_tags in TAG_GROUPS.items() for tag in group_tags}
+    for tag in tags:
+        group = group_of.get(tag)
+        if group is not None:
+            counts[group] += 1
+    return counts
@@ -3,12 +3,20 @@ Quick Analysis Script for Thesis Data
 Generates initial insights from brand marketing texts
 """
 
+import argparse
 import json
 import re
 from pathlib import Path
 from collections import Counter, defaultdict
 import os
 
+from keyword_matcher import (
+    LexiconIndex, MATCH_MODES, MANIPULATION, EMOTION_MARKER, keyword_term,
+    lowercase_preserving_offsets, tokenize
+)
+
+COUNTING_MODES = ('presence', 'frequency')
+
 # Configuration
 PROJECT_ROOT = Path("D:/Thesis")
 DATA_DIR = PROJECT_ROOT / "docs" / "materials"
@@ -20,8 +28,141 @@ RESULTS_DIR.mkdir(exist_ok=True, parents=True)
 with open(CODING_SCHEME_PATH, 'r', encoding='utf-8') as f:
     coding_scheme = json.load(f)
 
-def analyze_sector(sector_name):
-    """Analyze all brands in a sector"""
+# Compile all coding scheme lexicons into one index per match mode
+lexicon_indexes = {mode: LexiconIndex(coding_scheme, mode) for mode in MATCH_MODES}
+
+# Fixed-vocabulary term counters per match mode, built on first use
+_term_counters = {}
+
+def get_term_counter(match_mode='token'):
+    """
+    Build the CountVectorizer over all coding scheme keywords once
+
+    Args:
+        match_mode: 'token' counts keywords as whole-token n-grams;
+                    'substring' counts raw substring occurrences
+
+    Returns:
+        Tuple of (vectorizer, {group: (categories, term x category indicator matrix)})
+    """
+    if match_mode in _term_counters:
+        return _term_counters[match_mode]
+    from scipy import sparse
+    from sklearn.feature_extraction.text import CountVectorizer
+    
+    lexicons = lexicon_indexes[match_mode].lexicons
+    if match_mode == 'token':
+        group_terms = {
+            group: {
+                category: sorted(set(keyword_term(keyword) for keyword in keywords) - {''})
+                for category, keywords in lexicons[group].items()
+            }
+            for group in [MANIPULATION, EMOTION_MARKER]
+        }
+    else:
+        group_terms = {
+            group: {
+                category: sorted(set(keywords))
+                for category, keywords in lexicons[group].items()
+            }
+            for group in [MANIPULATION, EMOTION_MARKER]
+        }
+    vocabulary = sorted(set(
+        term
+        for categories in group_terms.values()
+        for terms in categories.values()
+        for term in terms
+    ))
+    term_ids = {term: column for column, term in enumerate(vocabulary)}
+    
+    if match_mode == 'token':
+        # Keywords are matched as whole-token n-grams, like TokenMatcher
+        vectorizer = CountVectorizer(
+            vocabulary=vocabulary,
+            tokenizer=lambda text: tokenize(text)[0],
+            token_pattern=None,
+            lowercase=True,
+            ngram_range=(1, max(len(term.split()) for term in vocabulary))
+        )
+    else:
+        # The analyzer yields every (possibly overlapping) substring hit of
+        # the Aho-Corasick matcher, so each keyword is its own term
+        matcher = lexicon_indexes[match_mode].matcher
+        vectorizer = CountVectorizer(
+            vocabulary=vocabulary,
+            analyzer=lambda text: [
+                keyword for _, keyword in matcher.find_all(lowercase_preserving_offsets(text))
+            ]
+        )
+    
+    # Indicator matrices turn term columns into category columns
+    indicators = {}
+    for group, categories in group_terms.items():
+        rows, cols = [], []
+        for col, terms in enumerate(categories.values()):
+            rows.extend(term_ids[term] for term in terms)
+            cols.extend([col] * len(terms))
+        indicator = sparse.csr_matrix(
+            ([1] * len(rows), (rows, cols)),
+            shape=(len(vocabulary), len(categories))
+        )
+        indicators[group] = (list(categories), indicator)
+    
+    _term_counters[match_mode] = (vectorizer, indicators)
+    return _term_counters[match_mode]
+
+def count_sector_terms(texts, match_mode='token', counting='frequency'):
+    """
+    Presence and frequency of all categories for a whole sector in one pass
+    
+    Builds a sparse brand x term matrix with the fixed-vocabulary vectorizer;
+    category counts are the sums over each category's term columns, and
+    presence counts the columns that are non-zero.
+    
+    Args:
+        texts: Dictionary mapping brand name to text
+        match_mode: One of MATCH_MODES
+        counting: 'presence' reports distinct keywords per category;
+                  'frequency' reports occurrences and also presence
+    """
+    vectorizer, indicators = get_term_counter(match_mode)
+    brands = list(texts)
+    term_matrix = vectorizer.transform([texts[brand] for brand in brands])
+    present = (term_matrix > 0).astype(int)
+    
+    results = {brand: {'text_length': len(texts[brand])} for brand in brands}
+    for group, key in [(MANIPULATION, 'manipulation'), (EMOTION_MARKER, 'emotions')]:
+        categories, indicator = indicators[group]
+        presence = (present @ indicator).toarray()
+        if counting == 'frequency':
+            frequency = (term_matrix @ indicator).toarray()
+        for row, brand in enumerate(brands):
+            if counting == 'frequency':
+                results[brand][key] = dict(zip(categories, frequency[row].tolist()))
+                results[brand][f'{key}_presence'] = dict(zip(categories, presence[row].tolist()))
+            else:
+                results[brand][key] = dict(zip(categories, presence[row].tolist()))
+    
+    for data in results.values():
+        data['top_manipulation'] = max(data['manipulation'], key=data['manipulation'].get)
+        data['top_emotion'] = max(data['emotions'], key=data['emotions'].get) if any(data['emotions'].values()) else 'neutral'
+    
+    return results
+
+def analyze_sector(sector_name, match_mode='substring', counting='presence'):
+    """
+    Analyze all brands in a sector
+
+    Args:
+        sector_name: Directory name under docs/materials
+        match_mode: 'substring' (original containment) or 'token' (whole words)
+        counting: 'presence' counts distinct keywords per category;
+                  'frequency' counts every occurrence (token-based only) and
+                  also reports presence
+    """
+    if counting == 'frequency' and match_mode != 'token':
+        raise ValueError("Frequency counting is token-based; use match_mode='token'")
+    
     sector_path = DATA_DIR / sector_name
     if not sector_path.exists():
         print(f"Sector {sector_name} not found")
@@ -30,40 +171,12 @@ def analyze_sector(sector_name):
     print(f"\nAnalyzing {sector_name} Sector")
     print("="*50)
     
-    results = {}
-    manipulation_categories = coding_scheme['manipulation_categories']
-    emotion_categories = coding_scheme['emotion_categories']
-    
-    # Process each brand
+    texts = {}
     for file_path in sector_path.glob("*.txt"):
-        brand_name = file_path.stem
-        
         with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-            text = f.read().lower()
-        
-        # Count manipulation strategies
-        brand_manipulation = {}
-        for category, details in manipulation_categories.items():
-            keywords = details['keywords']
-            count = sum(1 for keyword in keywords if keyword in text)
-            brand_manipulation[category] = count
-        
-        # Count emotion markers
-        brand_emotions = {}
-        for emotion, details in emotion_categories.items():
-            markers = details['linguistic_markers']
-            count = sum(1 for marker in markers if marker in text)
-            brand_emotions[emotion] = count
-        
-        results[brand_name] = {
-            'text_length': len(text),
-            'manipulation': brand_manipulation,
-            'emotions': brand_emotions,
-            'top_manipulation': max(brand_manipulation, key=brand_manipulation.get),
-            'top_emotion': max(brand_emotions, key=brand_emotions.get) if any(brand_emotions.values()) else 'neutral'
-        }
+            texts[file_path.stem] = f.read()
     
-    return results
+    return count_sector_terms(texts, match_mode, counting)
 
 def generate_sector_report(sector_name, results):
     """Generate a report for sector analysis"""
@@ -77,25 +190,40 @@ def generate_sector_report(sector_name, results):
     report += f"Brands analyzed: {len(results)}\n"
     report += f"Average text length: {sum(r['text_length'] for r in results.values()) / len(results):.0f} characters\n\n"
     
+    # Frequency counting also reports how many distinct keywords were present
+    frequency_mode = all('manipulation_presence' in r for r in results.values())
+    
     # Top manipulation strategies
     all_manipulations = defaultdict(int)
+    all_manipulation_presence = defaultdict(int)
     for brand_data in results.values():
         for strategy, count in brand_data['manipulation'].items():
             all_manipulations[strategy] += count
+        for strategy, count in brand_data.get('manipulation_presence', {}).items():
+            all_manipulation_presence[strategy] += count
     
     report += "TOP MANIPULATION STRATEGIES:\n"
     for strategy, count in sorted(all_manipulations.items(), key=lambda x: x[1], reverse=True)[:5]:
-        report += f"  - {strategy.replace('_', ' ').title()}: {count} occurrences\n"
+        report += f"  - {strategy.replace('_', ' ').title()}: {count} occurrences"
+        if frequency_mode:
+            report += f" ({all_manipulation_presence[strategy]} distinct keywords)"
+        report += "\n"
     
     # Top emotions
     all_emotions = defaultdict(int)
+    all_emotion_presence = defaultdict(int)
     for brand_data in results.values():
         for emotion, count in brand_data['emotions'].items():
             all_emotions[emotion] += count
+        for emotion, count in brand_data.get('emotions_presence', {}).items():
+            all_emotion_presence[emotion] += count
     
     report += "\nTOP EMOTIONS DETECTED:\n"
     for emotion, count in sorted(all_emotions.items(), key=lambda x: x[1], reverse=True)[:5]:
-        report += f"  - {emotion.title()}: {count} markers\n"
+        report += f"  - {emotion.title()}: {count} markers"
+        if frequency_mode:
+            report += f" ({all_emotion_presence[emotion]} distinct markers)"
+        report += "\n"
     
     # Brand profiles
     report += "\nBRAND PROFILES:\n"
@@ -110,24 +238,32 @@ def generate_sector_report(sector_name, results):
         report += "  Top tactics:\n"
         for tactic, count in top_tactics:
             if count > 0:
-                report += f"    - {tactic.replace('_', ' ').title()}: {count}\n"
+                report += f"    - {tactic.replace('_', ' ').title()}: {count}"
+                if frequency_mode:
+                    report += f" ({data['manipulation_presence'][tactic]} distinct keywords)"
+                report += "\n"
     
     return report
 
-def main():
+def main(match_mode='substring', counting='presence'):
     """Main analysis pipeline"""
     sectors = ['Fashion', 'Fitness', 'Skincare_Cosmetics']
     all_reports = []
+    # Non-default modes get their own files so results can be diffed
+    if counting == 'frequency':
+        suffix = '_frequency'
+    else:
+        suffix = '' if match_mode == 'substring' else f'_{match_mode}'
     
     for sector in sectors:
-        results = analyze_sector(sector)
+        results = analyze_sector(sector, match_mode, counting)
         if results:
             report = generate_sector_report(sector, results)
             all_reports.append(report)
             print(report)
             
             # Save sector results
-            output_file = RESULTS_DIR / f"{sector}_quick_analysis.txt"
+            output_file = RESULTS_DIR / f"{sector}_quick_analysis{suffix}.txt"
             with open(output_file, 'w', encoding='utf-8') as f:
                 f.write(report)
             print(f"Report saved to {output_file}")
@@ -137,7 +273,7 @@ def main():
         combined_report = "\nCOMBINED ANALYSIS REPORT\n" + "="*60 + "\n"
         combined_report += "\n".join(all_reports)
         
-        combined_file = RESULTS_DIR / "all_sectors_quick_analysis.txt"
+        combined_file = RESULTS_DIR / f"all_sectors_quick_analysis{suffix}.txt"
         with open(combined_file, 'w', encoding='utf-8') as f:
             f.write(combined_report)
         print(f"\nCombined report saved to {combined_file}")
@@ -145,4 +281,13 @@ def main():
     print("\nAnalysis complete!")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--match-mode', choices=MATCH_MODES, default='substring',
+                        help="Keyword matching: raw substrings or whole tokens")
+    parser.add_argument('--counting', choices=COUNTING_MODES, default='presence',
+                        help="Count distinct keywords per category, or every "
+                             "occurrence (requires --match-mode token)")
+    args = parser.parse_args()
+    if args.counting == 'frequency' and args.match_mode == 'substring':
+        parser.error("--counting frequency is token-based; use it with --match-mode token")
+    main(args.match_mode, args.counting)
\ No newline at end of file
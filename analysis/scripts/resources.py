@@ -0,0 +1,156 @@
+"""
+Shared Analysis Resources
+Master's Thesis: Psychological Manipulation in Marketing Discourse
+
+Process-wide, lazily loaded resources: NLTK data is checked locally and only
+downloaded when missing, and the VADER analyzer, stopword list and
+transformer models are each loaded on first use and at most once per
+process, no matter how many analyzers are created.
+"""
+
+import importlib.util
+from functools import lru_cache
+
+# Check for transformer packages without importing them (importing is slow)
+TRANSFORMERS_AVAILABLE = (
+    importlib.util.find_spec('transformers') is not None
+    and importlib.util.find_spec('sentence_transformers') is not None
+)
+SPACY_AVAILABLE = importlib.util.find_spec('spacy') is not None
+PYARROW_AVAILABLE = importlib.util.find_spec('pyarrow') is not None
+
+EMOTION_MODEL = "j-hartmann/emotion-english-distilroberta-base"
+SENTENCE_MODEL = "all-MiniLM-L6-v2"
+# Small English pipeline; only its tagger is used
+SPACY_MODEL = "en_core_web_sm"
+
+# NLTK download name -> path inside nltk_data
+NLTK_RESOURCES = {
+    'punkt': 'tokenizers/punkt',
+    'punkt_tab': 'tokenizers/punkt_tab',
+    'stopwords': 'corpora/stopwords',
+    'vader_lexicon': 'sentiment/vader_lexicon.zip',
+    'averaged_perceptron_tagger': 'taggers/averaged_perceptron_tagger',
+    'averaged_perceptron_tagger_eng': 'taggers/averaged_perceptron_tagger_eng',
+}
+
+_checked_nltk_resources = set()
+
+
+def ensure_nltk_data(*names: str):
+    """
+    Make NLTK data available, downloading only what is missing locally
+
+    Args:
+        names: NLTK download names, e.g. 'punkt', 'stopwords'
+    """
+    import nltk
+
+    for name in names:
+        if name in _checked_nltk_resources:
+            continue
+        try:
+            nltk.data.find(NLTK_RESOURCES.get(name, name))
+        except LookupError:
+            nltk.download(name, quiet=True)
+        _checked_nltk_resources.add(name)
+
+
+def ensure_sentence_tokenizer():
+    """
+    Punkt data for sent_tokenize/word_tokenize
+
+    NLTK >= 3.8.2 (which has PunktTokenizer) only loads punkt_tab, older
+    releases only the pickled punkt; the variant the installed NLTK loads is
+    downloaded, a locally present other variant does not count.
+    """
+    import nltk.tokenize
+    ensure_nltk_data('punkt_tab' if hasattr(nltk.tokenize, 'PunktTokenizer') else 'punkt')
+
+
+def ensure_pos_tagger():
+    """
+    Perceptron tagger data for nltk.pos_tag
+
+    NLTK >= 3.9 loads the JSON model averaged_perceptron_tagger_eng, older
+    releases the pickled averaged_perceptron_tagger.
+    """
+    from nltk.tag.perceptron import PerceptronTagger
+    ensure_nltk_data('averaged_perceptron_tagger_eng'
+                     if hasattr(PerceptronTagger, 'load_from_json')
+                     else 'averaged_perceptron_tagger')
+
+
+@lru_cache(maxsize=None)
+def get_sentence_splitter():
+    """Punkt sentence tokenizer with span_tokenize(), as used by sent_tokenize"""
+    ensure_sentence_tokenizer()
+    try:
+        from nltk.tokenize import PunktTokenizer
+        return PunktTokenizer('english')
+    except ImportError:
+        # NLTK < 3.8.2 ships the pickled model instead
+        import nltk
+        return nltk.data.load('tokenizers/punkt/english.pickle')
+
+
+@lru_cache(maxsize=None)
+def get_vader():
+    """VADER sentiment analyzer, shared by all analyzers in the process"""
+    ensure_nltk_data('vader_lexicon')
+    from nltk.sentiment.vader import SentimentIntensityAnalyzer
+    return SentimentIntensityAnalyzer()
+
+
+@lru_cache(maxsize=None)
+def get_vader_scorer():
+    """Vectorized VADER-compatible scorer on the same lexicon"""
+    from vader_scorer import VectorizedVader
+    return VectorizedVader(get_vader().lexicon)
+
+
+@lru_cache(maxsize=None)
+def get_stopwords() -> frozenset:
+    """English stopword set, shared by all analyzers in the process"""
+    ensure_nltk_data('stopwords')
+    from nltk.corpus import stopwords
+    return frozenset(stopwords.words('english'))
+
+
+@lru_cache(maxsize=None)
+def get_perceptron_tagger():
+    """NLTK averaged perceptron tagger (the model behind nltk.pos_tag)"""
+    ensure_pos_tagger()
+    from nltk.tag.perceptron import PerceptronTagger
+    return PerceptronTagger()
+
+
+@lru_cache(maxsize=None)
+def get_spacy_pipeline(model: str = SPACY_MODEL):
+    """spaCy pipeline with only the components needed for POS tags"""
+    if not SPACY_AVAILABLE:
+        raise ImportError("The spaCy tagger requires spacy (pip install spacy)")
+    import spacy
+    print(f"Loading spaCy model {model}...")
+    # download with: python -m spacy download en_core_web_sm
+    return spacy.load(model, disable=['parser', 'ner', 'lemmatizer'])
+
+
+@lru_cache(maxsize=None)
+def get_emotion_classifier():
+    """Transformer emotion classifier, loaded on first use"""
+    if not TRANSFORMERS_AVAILABLE:
+        raise ImportError("Emotion classification requires transformers")
+    from transformers import pipeline
+    print("Loading transformer emotion model...")
+    return pipeline("text-classification", model=EMOTION_MODEL, top_k=None)
+
+
+@lru_cache(maxsize=None)
+def get_sentence_model():
+    """Sentence embedding model, loaded on first use"""
+    if not TRANSFORMERS_AVAILABLE:
+        raise ImportError("Sentence embeddings require sentence-transformers")
+    from sentence_transformers import SentenceTransformer
+    print("Loading sentence embedding model...")
+    return SentenceTransformer(SENTENCE_MODEL)
@@ -0,0 +1,152 @@
+"""
+Content-Addressed Result Cache
+Master's Thesis: Psychological Manipulation in Marketing Discourse
+
+Stores per-brand analysis results on disk under a hash of everything that
+determines them: the brand text, the coding scheme, the analyzer version
+and the enabled components. Unchanged brands are read back instead of
+re-running sentiment scoring, tokenization and POS tagging; a changed text
+or coding scheme simply produces a new key. The cache directory is kept
+under a size limit by evicting the least recently used entries.
+"""
+
+import hashlib
+import os
+import pickle
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+
+def fingerprint(*parts) -> str:
+    """
+    Stable hash of several values
+
+    Args:
+        parts: Strings, bytes or other values with a stable repr()
+
+    Returns:
+        Hex SHA-256 digest
+    """
+    digest = hashlib.sha256()
+    for part in parts:
+        if isinstance(part, str):
+            part = part.encode('utf-8')
+        elif not isinstance(part, bytes):
+            part = repr(part).encode('utf-8')
+        # Length prefix keeps ('ab', 'c') and ('a', 'bc') apart
+        digest.update(len(part).to_bytes(8, 'little'))
+        digest.update(part)
+    return digest.hexdigest()
+
+
+class ResultCache:
+    """
+    On-disk cache of analysis results, one pickle file per key
+    """
+
+    def __init__(self, directory: Path, max_bytes: int = DEFAULT_MAX_BYTES):
+        """
+        Args:
+            directory: Cache directory, created if missing
+            max_bytes: Total size above which least recently used entries
+                       are evicted
+        """
+        self.directory = Path(directory)
+        self.directory.mkdir(exist_ok=True, parents=True)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._total_bytes = sum(path.stat().st_size for path in self.directory.glob('*.pkl'))
+
+    def _path(self, key: str) -> Path:
+        return self.directory / f'{key}.pkl'
+
+    def get(self, key: str) -> Optional[Dict]:
+        """Cached result for a key, or None"""
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as f:
+                result = pickle.load(f)
+        except (OSError, EOFError, pickle.UnpicklingError):
+            self.misses += 1
+            return None
+        # Access time for eviction; atime is unreliable on many filesystems
+        os.utime(path)
+        self.hits += 1
+        return result
+
+    def put(self, key: str, result: Dict):
+        """Store a result and evict old entries if over the size limit"""
+        path = self._path(key)
+        previous_size = path.stat().st_size if path.exists() else 0
+
+        # Write to a temporary file first so a crash never leaves a partial entry
+        temp_path = path.with_suffix('.tmp')
+        with open(temp_path, 'wb') as f:
+            pickle.dump(result, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temp_path, path)
+
+        self._total_bytes += path.stat().st_size - previous_size
+        if self._total_bytes > self.max_bytes:
+            self.evict()
+
+    def evict(self):
+        """Remove least recently used entries until under the size limit"""
+        entries = sorted(
+            (entry.stat().st_mtime, entry.stat().st_size, entry)
+            for entry in self.directory.glob('*.pkl')
+        )
+        self._total_bytes = sum(size for _, size, _ in entries)
+        for _, size, entry in entries:
+            if self._total_bytes <= self.max_bytes:
+                break
+            entry.unlink(missing_ok=True)
+            self._total_bytes -= size
+
+    def clear(self):
+        """Remove all entries"""
+        for entry in self.directory.glob('*.pkl'):
+            entry.unlink(missing_ok=True)
+        self._total_bytes = 0
+
+    def summary(self) -> str:
+        return (f"Result cache: {self.hits} reused, {self.misses} recomputed "
+                f"({self._total_bytes / 1024 / 1024:.1f} MB in {self.directory})")
+
+
+def split_cached(analyzers: Dict, cache: ResultCache,
+                 key_method: str = 'cache_key') -> Tuple[Dict, Dict, Dict]:
+    """
+    Separate brands with cached results from those that must be analyzed
+
+    Args:
+        analyzers: Dictionary mapping sector to an analyzer with loaded texts
+        cache: Result cache to look up
+        key_method: Analyzer method computing the cache key of a brand
+
+    Returns:
+        (cached results by (sector, brand), cache keys by (sector, brand),
+         analyzers by sector restricted to the uncached brands)
+    """
+    cached, keys, pending = {}, {}, {}
+    for sector, analyzer in analyzers.items():
+        uncached = []
+        for brand_name in analyzer.texts:
+            key = getattr(analyzer, key_method)(brand_name)
+            keys[(sector, brand_name)] = key
+            result = cache.get(key)
+            if result is None:
+                uncached.append(brand_name)
+            else:
+                cached[(sector, brand_name)] = result
+        if uncached:
+            remaining = analyzer.for_sector(sector)
+            # Texts backed by the corpus store stay backed by it
+            if hasattr(analyzer.texts, 'subset'):
+                remaining.texts = analyzer.texts.subset(uncached)
+            else:
+                remaining.texts = {brand_name: analyzer.texts[brand_name] for brand_name in uncached}
+            pending[sector] = remaining
+    return cached, keys, pending
@@ -0,0 +1,344 @@
+"""
+Columnar Result Tables
+Master's Thesis: Psychological Manipulation in Marketing Discourse
+
+The result CSVs hold one flat row per brand; examples, per-keyword counts
+and sentence-level detail are lost. The emotion analyzer additionally
+writes its results as typed Parquet tables (requires pyarrow), partitioned
+by sector and written brand by brand as analyses finish:
+
+- brand_metrics: the flat result row (with the intensity scored over the
+  sector's rows) plus per-keyword counts
+- keyword_hits: every coding scheme keyword occurrence with its character
+  offsets and sentence index
+- sentence_scores: per-sentence VADER compound, word count and keyword
+  counts per manipulation category and emotion
+
+Layout: results/tables<suffix>/<table>/sector=<sector>/<brand>.parquet.
+Each brand file is written to a temporary name and renamed, so a table
+never holds a partially written brand. read_result_table() loads any
+selection of sectors and columns as one DataFrame.
+
+Usage:
+    python result_tables.py    # rows and columns of every table
+"""
+
+import os
+import shutil
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from keyword_matcher import EMOTION_MARKER, MANIPULATION
+
+# Configuration
+PROJECT_ROOT = Path("D:/Thesis")
+RESULTS_DIR = PROJECT_ROOT / "analysis" / "results"
+
+TABLES = ('brand_metrics', 'keyword_hits', 'sentence_scores')
+
+
+def tables_dir(suffix: str = '', results_dir: Path = RESULTS_DIR) -> Path:
+    """Root directory of the tables of one output suffix"""
+    return Path(results_dir) / f"tables{suffix}"
+
+
+def _schemas() -> Dict:
+    """Fixed schemas of the detail tables (pyarrow imported on first use)"""
+    import pyarrow as pa
+    counts = pa.map_(pa.string(), pa.int32())
+    return {
+        'keyword_hits': pa.schema([
+            ('brand', pa.string()),
+            ('group', pa.string()),
+            ('category', pa.string()),
+            ('keyword', pa.string()),
+            ('start', pa.int64()),
+            ('end', pa.int64()),
+            ('sentence_index', pa.int32())
+        ]),
+        'sentence_scores': pa.schema([
+            ('brand', pa.string()),
+            ('sentence_index', pa.int32()),
+            ('start', pa.int64()),
+            ('end', pa.int64()),
+            ('word_count', pa.int32()),
+            ('vader_compound', pa.float64()),
+            ('manipulation_hits', pa.int32()),
+            ('manipulation_weighted', pa.float64()),
+            ('manipulation_counts', counts),
+            ('emotion_counts', counts)
+        ])
+    }
+
+
+def brand_metrics_schema(row: Dict):
+    """Schema of a flat result row: numbers as int64/float64, the rest strings"""
+    import pyarrow as pa
+    fields = []
+    for column, value in row.items():
+        if column == 'keyword_counts':
+            column_type = pa.map_(pa.string(), pa.int64())
+        elif isinstance(value, (bool, np.bool_)):
+            column_type = pa.bool_()
+        elif isinstance(value, (int, np.integer)):
+            column_type = pa.int64()
+        elif isinstance(value, (float, np.floating)):
+            column_type = pa.float64()
+        else:
+            column_type = pa.string()
+        fields.append((column, column_type))
+    return pa.schema(fields)
+
+
+def sentence_indices(starts: np.ndarray, sentence_spans: List) -> np.ndarray:
+    """Sentence of each offset: the first sentence ending after it"""
+    if not sentence_spans:
+        return np.zeros(len(starts), dtype=np.int32)
+    ends = np.array([end for _, end in sentence_spans])
+    indices = np.searchsorted(ends, starts, side='right')
+    return np.minimum(indices, len(ends) - 1).astype(np.int32)
+
+
+def keyword_hit_columns(brand_name: str, lexicons: Dict[str, Dict[str, List[str]]],
+                        keyword_offsets: Dict[str, List[int]],
+                        sentence_spans: List) -> Dict[str, list]:
+    """
+    Columns of the keyword_hits table of one brand, in text order
+
+    Args:
+        brand_name: Brand of the document
+        lexicons: Group -> category -> keywords (LexiconIndex.lexicons)
+        keyword_offsets: Start offsets per keyword of the document
+        sentence_spans: Sorted (start, end) offsets of its sentences
+    """
+    groups, categories, keywords, starts = [], [], [], []
+    for group, group_categories in lexicons.items():
+        for category, category_keywords in group_categories.items():
+            for keyword in category_keywords:
+                offsets = keyword_offsets.get(keyword, ())
+                groups.extend([group] * len(offsets))
+                categories.extend([category] * len(offsets))
+                keywords.extend([keyword] * len(offsets))
+                starts.extend(offsets)
+    starts = np.array(starts, dtype=np.int64)
+    order = np.argsort(starts, kind='stable')
+    starts = starts[order]
+    keywords = [keywords[index] for index in order]
+    return {
+        'brand': [brand_name] * len(starts),
+        'group': [groups[index] for index in order],
+        'category': [categories[index] for index in order],
+        'keyword': keywords,
+        'start': starts,
+        'end': starts + np.array([len(keyword) for keyword in keywords], dtype=np.int64),
+        'sentence_index': sentence_indices(starts, sentence_spans)
+    }
+
+
+def sentence_score_columns(brand_name: str, text: str, hit_columns: Dict[str, list],
+                           sentence_spans: List, sia,
+                           category_weights: Dict[str, float]) -> Dict[str, list]:
+    """
+    Columns of the sentence_scores table of one brand
+
+    Args:
+        brand_name: Brand of the document
+        text: Document text
+        hit_columns: keyword_hit_columns() of the document
+        sentence_spans: Sorted (start, end) offsets of its sentences
+        sia: VADER scorer with score_batch()
+        category_weights: Intensity weight of each manipulation category
+
+    The weighted score sums the intensity weights of the sentence's
+    manipulation keyword occurrences (no context factors).
+    """
+    sentences = [text[start:end] for start, end in sentence_spans]
+    manipulation_counts = [{} for _ in sentences]
+    emotion_counts = [{} for _ in sentences]
+    for group, category, index in zip(hit_columns['group'], hit_columns['category'],
+                                      hit_columns['sentence_index']):
+        if not sentences:
+            break
+        if group == MANIPULATION:
+            counts = manipulation_counts[index]
+        elif group == EMOTION_MARKER:
+            counts = emotion_counts[index]
+        else:
+            continue
+        counts[category] = counts.get(category, 0) + 1
+    compounds = sia.score_batch(sentences)['compound'] if sentences else []
+    return {
+        'brand': [brand_name] * len(sentences),
+        'sentence_index': np.arange(len(sentences), dtype=np.int32),
+        'start': [start for start, _ in sentence_spans],
+        'end': [end for _, end in sentence_spans],
+        'word_count': [len(sentence.split()) for sentence in sentences],
+        'vader_compound': np.round(np.asarray(compounds, dtype=np.float64), 4),
+        'manipulation_hits': [sum(counts.values()) for counts in manipulation_counts],
+        'manipulation_weighted': [
+            float(sum(count * category_weights[category] for category, count in counts.items()))
+            for counts in manipulation_counts
+        ],
+        'manipulation_counts': [list(counts.items()) for counts in manipulation_counts],
+        'emotion_counts': [list(counts.items()) for counts in emotion_counts]
+    }
+
+
+class ResultTableWriter:
+    """
+    Writes the result tables of every finished brand, one Parquet file per
+    brand and table in the sector's partition
+    """
+
+    def __init__(self, sectors: List[str], suffix: str = '', results_dir: Path = RESULTS_DIR):
+        """
+        Args:
+            sectors: Sectors of this run; their partitions are cleared, so
+                     removed brands do not linger
+            suffix: Output suffix of the analyzer (match mode, dedup)
+            results_dir: Directory holding the tables directory
+        """
+        self.root = tables_dir(suffix, results_dir)
+        self.schemas = _schemas()
+        self.rows_written = dict.fromkeys(TABLES, 0)
+        # (sector, brand) -> sorted (keyword, count) pairs, for brand_metrics
+        self.keyword_counts = {}
+        for table in TABLES:
+            for sector in sectors:
+                shutil.rmtree(self.partition(table, sector), ignore_errors=True)
+
+    def partition(self, table: str, sector: str) -> Path:
+        return self.root / table / f"sector={sector}"
+
+    def _write(self, table: str, sector: str, brand_name: str, pa_table):
+        import pyarrow.parquet as pq
+        directory = self.partition(table, sector)
+        directory.mkdir(exist_ok=True, parents=True)
+        path = directory / f"{brand_name}.parquet"
+        temporary_path = path.with_name(path.name + '.tmp')
+        # pyarrow would read a "D:/..." path as a URI; pass a file object
+        with open(temporary_path, 'wb') as f:
+            pq.write_table(pa_table, f)
+        os.replace(temporary_path, path)
+        self.rows_written[table] += pa_table.num_rows
+
+    def write_brand(self, analyzer, brand_name: str, analysis: Dict):
+        """
+        Write the keyword_hits and sentence_scores tables of one brand as
+        soon as it is analyzed (brand_metrics follows with the scored rows)
+
+        Args:
+            analyzer: EmotionManipulationAnalyzer of the brand's sector, with
+                      the brand's text loaded
+            brand_name: Brand name
+            analysis: score_document() result of the brand
+        """
+        import pyarrow as pa
+        sector = analyzer.sector
+        keyword_offsets = analysis['keyword_offsets']
+        sentence_spans = analysis['sentence_spans']
+        self.keyword_counts[sector, brand_name] = sorted(
+            (keyword, len(offsets)) for keyword, offsets in keyword_offsets.items() if offsets
+        )
+
+        hits = keyword_hit_columns(brand_name, analyzer.lexicon_index.lexicons,
+                                   keyword_offsets, sentence_spans)
+        self._write('keyword_hits', sector, brand_name,
+                    pa.Table.from_pydict(hits, schema=self.schemas['keyword_hits']))
+
+        weights = {
+            category: details['intensity_weight']
+            for category, details in analyzer.manipulation_categories.items()
+        }
+        sentences = sentence_score_columns(brand_name, analyzer.texts[brand_name], hits,
+                                           sentence_spans, analyzer.sia, weights)
+        self._write('sentence_scores', sector, brand_name,
+                    pa.Table.from_pydict(sentences, schema=self.schemas['sentence_scores']))
+
+    def write_brand_metrics(self, sector: str, df: pd.DataFrame):
+        """
+        Write the brand_metrics table of a sector's brands
+
+        Args:
+            sector: Sector of the rows
+            df: Flat result rows with the intensity filled in
+                (score_intensity); brands not passed to write_brand get
+                no keyword counts
+        """
+        import pyarrow as pa
+        for row in df.drop(columns='sector', errors='ignore').to_dict('records'):
+            # Columns missing for this brand (NaN in the sector's DataFrame,
+            # e.g. transformer scores) are left out, read back as nulls
+            row = {column: value for column, value in row.items()
+                   if isinstance(value, (list, dict)) or not pd.isna(value)}
+            row['keyword_counts'] = self.keyword_counts.get((sector, row['brand']), [])
+            self._write('brand_metrics', sector, row['brand'],
+                        pa.Table.from_pylist([row], schema=brand_metrics_schema(row)))
+
+    def summary(self) -> str:
+        counts = ', '.join(f"{count} {table} rows" for table, count in self.rows_written.items())
+        return f"Result tables: {counts} in {self.root}"
+
+
+def read_result_table(table: str, sectors: Optional[List[str]] = None,
+                      columns: Optional[List[str]] = None, suffix: str = '',
+                      results_dir: Path = RESULTS_DIR) -> pd.DataFrame:
+    """
+    Load a result table across sectors
+
+    Args:
+        table: One of TABLES
+        sectors: Sectors to load (all if None)
+        columns: Columns to read (all if None); 'sector' is always included
+        suffix: Output suffix of the analyzer run
+        results_dir: Directory holding the tables directory
+
+    Returns:
+        DataFrame with a 'sector' column; brand files whose columns differ
+        (an integer factor in one brand and a float in another, transformer
+        columns only in some) are unified to the wider type, missing
+        values as nulls
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    if table not in TABLES:
+        raise ValueError(f"Unknown result table {table!r}, expected one of {TABLES}")
+    file_columns = result_columns = None
+    if columns is not None:
+        # 'sector' is the partition key, not a column of the files
+        file_columns = [column for column in columns if column != 'sector']
+        result_columns = file_columns + ['sector']
+    root = tables_dir(suffix, results_dir) / table
+    pieces = []
+    for partition in sorted(root.glob("sector=*")):
+        sector = partition.name.split('=', 1)[1]
+        if sectors is not None and sector not in sectors:
+            continue
+        for path in sorted(partition.glob("*.parquet")):
+            with open(path, 'rb') as f:
+                parquet_file = pq.ParquetFile(f)
+                # Only the requested columns this brand's file has
+                available = set(parquet_file.schema_arrow.names)
+                piece = parquet_file.read(columns=None if file_columns is None else [
+                    column for column in file_columns if column in available
+                ])
+            pieces.append(piece.append_column('sector', pa.array([sector] * piece.num_rows)))
+    if not pieces:
+        return pd.DataFrame(columns=result_columns or ['sector'])
+    df = pa.concat_tables(pieces, promote_options='permissive').to_pandas()
+    # Requested columns no file has come back as nulls
+    return df if result_columns is None else df.reindex(columns=result_columns)
+
+
+if __name__ == "__main__":
+    for suffix_dir in sorted(RESULTS_DIR.glob("tables*")):
+        suffix = suffix_dir.name[len("tables"):]
+        print(suffix_dir.name)
+        for table in TABLES:
+            df = read_result_table(table, suffix=suffix)
+            print(f"  {table}: {len(df)} rows, {len(df.columns)} columns, "
+                  f"sectors {sorted(df['sector'].unique())}")
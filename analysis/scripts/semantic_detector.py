@@ -0,0 +1,162 @@
+"""
+Embedding-Based Semantic Manipulation Detection
+Master's Thesis: Psychological Manipulation in Marketing Discourse
+
+Keyword matching misses paraphrases ("this won't be around for long" is
+temporal pressure without any temporal pressure keyword). The semantic
+detector embeds every sentence of a document with the sentence model and
+compares it with prototype sentences of each manipulation category
+(coding scheme 'prototypes'; the category description if a category has
+none). A sentence expresses a category when its cosine similarity to the
+category's nearest prototype reaches SIMILARITY_THRESHOLD.
+
+Sentence embeddings are kept in the persistent embedding store
+(embedding_store.py), so re-runs and sentences repeated across pages and
+brands are only embedded once; the analyzers prefetch the sentences of
+all documents to score, so missing sentences are embedded in one large
+batch. Prototype search is a brute-force inner-product index over
+normalized vectors (exact, and fast at the size of the coding scheme).
+"""
+
+from typing import Callable, Dict, Iterable, List
+
+import numpy as np
+
+from embedding_store import EmbeddingStore
+
+# Cosine similarity to the nearest prototype above which a sentence counts
+SIMILARITY_THRESHOLD = 0.55
+
+# Sentences per forward pass of the sentence model
+ENCODE_BATCH_SIZE = 256
+
+# Sentences with fewer words (menu items, headings) are not scored
+MIN_SENTENCE_WORDS = 4
+
+# Sentences compared with all prototypes at once (bounds the score matrix)
+SEARCH_BLOCK = 4096
+
+
+class PrototypeIndex:
+    """
+    Exact nearest-prototype search over normalized embeddings
+    """
+
+    def __init__(self, embeddings: np.ndarray, categories: List[str]):
+        """
+        Args:
+            embeddings: One normalized embedding row per prototype
+            categories: Category of each prototype
+        """
+        # Prototypes grouped by category, so per-category maxima are slices
+        order = np.argsort(categories, kind='stable')
+        self.embeddings = embeddings[order].T.astype(np.float32)
+        sorted_categories = [categories[index] for index in order]
+        self.categories = list(dict.fromkeys(sorted_categories))
+        self.starts = np.array([sorted_categories.index(category) for category in self.categories])
+
+    def category_similarities(self, embeddings: np.ndarray) -> np.ndarray:
+        """
+        Similarity of each sentence to the nearest prototype of each category
+
+        Returns:
+            Matrix of shape (sentences, categories), columns in self.categories order
+        """
+        result = np.empty((len(embeddings), len(self.categories)), dtype=np.float32)
+        for start in range(0, len(embeddings), SEARCH_BLOCK):
+            similarities = embeddings[start:start + SEARCH_BLOCK] @ self.embeddings
+            result[start:start + SEARCH_BLOCK] = np.maximum.reduceat(similarities, self.starts, axis=1)
+        return result
+
+
+class SemanticDetector:
+    """
+    Per-category sentence counts from similarity to prototype sentences
+    """
+
+    def __init__(self, coding_scheme: Dict, load_model: Callable[[], object],
+                 store: EmbeddingStore,
+                 similarity_threshold: float = SIMILARITY_THRESHOLD,
+                 batch_size: int = ENCODE_BATCH_SIZE):
+        """
+        Args:
+            coding_scheme: Parsed coding_scheme.json with manipulation_categories
+            load_model: Returns the SentenceTransformer model; only called
+                        when a sentence is not stored
+            store: Embedding store of that model
+            similarity_threshold: Minimum cosine similarity to a prototype
+            batch_size: Sentences per forward pass
+        """
+        self.load_model = load_model
+        self.store = store
+        self.similarity_threshold = similarity_threshold
+        self.batch_size = batch_size
+
+        prototypes, categories = [], []
+        for category, details in coding_scheme['manipulation_categories'].items():
+            for prototype in details.get('prototypes') or [details['description']]:
+                prototypes.append(prototype)
+                categories.append(category)
+        self.index = PrototypeIndex(self.store.embeddings(prototypes, self.encode), categories)
+
+    def encode(self, sentences: List[str]) -> np.ndarray:
+        """Normalized embeddings of sentences, in batches"""
+        return self.load_model().encode(
+            sentences, batch_size=self.batch_size, convert_to_numpy=True,
+            normalize_embeddings=True, show_progress_bar=False
+        )
+
+    def scored_sentences(self, sentences: List[str]) -> List[str]:
+        """Sentences long enough to be scored"""
+        return [sentence for sentence in sentences
+                if len(sentence.split()) >= MIN_SENTENCE_WORDS]
+
+    def prefetch(self, documents: Iterable[List[str]]):
+        """
+        Store the embeddings of many documents' sentences with one encoding
+        batch, so detect() on each document only reads from the store
+
+        Args:
+            documents: Sentences of each document
+        """
+        sentences = [sentence for document in documents
+                     for sentence in self.scored_sentences(document)]
+        if sentences:
+            self.store.add(sentences, self.encode)
+
+    def detect(self, sentences: List[str], examples: int = 3) -> Dict[str, Dict]:
+        """
+        Semantic manipulation profile of one document
+
+        Args:
+            sentences: Sentences of the document
+            examples: Most similar sentences kept per category
+
+        Returns:
+            Dictionary mapping each category to the number of matching
+            'sentences', their 'share' of the scored sentences, the
+            'max_similarity' and the top 'examples' as (similarity, sentence)
+        """
+        scored = self.scored_sentences(sentences)
+        if scored:
+            similarities = self.index.category_similarities(
+                self.store.embeddings(scored, self.encode)
+            )
+        else:
+            similarities = np.zeros((0, len(self.index.categories)), dtype=np.float32)
+
+        results = {}
+        for column, category in enumerate(self.index.categories):
+            values = similarities[:, column]
+            matches = int((values >= self.similarity_threshold).sum())
+            top = np.argsort(-values, kind='stable')[:examples]
+            results[category] = {
+                'sentences': matches,
+                'share': matches / len(scored) if scored else 0.0,
+                'max_similarity': float(values.max()) if len(values) else 0.0,
+                'examples': [
+                    (round(float(values[index]), 4), ' '.join(scored[index].split()))
+                    for index in top if values[index] >= self.similarity_threshold
+                ]
+            }
+        return results
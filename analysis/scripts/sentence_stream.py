@@ -0,0 +1,294 @@
+"""
+Streaming Sentence-Level Analysis
+Master's Thesis: Psychological Manipulation in Marketing Discourse
+
+Reads a brand document in bounded chunks, splits it into sentences with a
+generator pipeline, and folds per-sentence sentiment and keyword hits into
+running aggregates (mean and spread, sentiment distribution, top-k example
+sentences). Only the current chunk and the aggregates are held in memory,
+so memory stays flat however large a document or corpus is, and every
+per-sentence score can still be exported as it is produced.
+"""
+
+import heapq
+import math
+from itertools import islice
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from textblob import TextBlob
+
+from context_scoring import keyword_windows
+from keyword_matcher import lowercase_preserving_offsets, tokenize, MANIPULATION, EMOTION_MARKER
+
+CHUNK_SIZE = 64 * 1024
+
+# A "sentence" longer than this (e.g. a page without punctuation) is cut off
+MAX_SENTENCE_CHARS = 20000
+
+# Sentences scored together by the vectorized VADER scorer
+BATCH_SIZE = 256
+
+# VADER's own thresholds for positive / negative compound scores
+VADER_THRESHOLD = 0.05
+
+
+def read_chunks(path: Path, chunk_size: int = CHUNK_SIZE) -> Iterator[str]:
+    """Yield a text file in chunks of at most chunk_size characters"""
+    with open(path, 'r', encoding='utf-8', errors='ignore') as f:
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                return
+            yield chunk
+
+
+def stream_sentences(chunks: Iterable[str], splitter,
+                     max_sentence_chars: int = MAX_SENTENCE_CHARS) -> Iterator[str]:
+    """
+    Split a stream of text chunks into sentences
+
+    The last sentence of each chunk may continue in the next one, so it is
+    carried over instead of being yielded.
+
+    Args:
+        chunks: Consecutive pieces of one document
+        splitter: Punkt sentence tokenizer with span_tokenize()
+        max_sentence_chars: Carried-over text is flushed beyond this length
+
+    Yields:
+        Sentences with surrounding whitespace removed
+    """
+    buffer = ''
+    for chunk in chunks:
+        buffer += chunk
+        spans = list(splitter.span_tokenize(buffer))
+        if not spans:
+            continue
+        for start, end in spans[:-1]:
+            yield buffer[start:end]
+        buffer = buffer[spans[-1][0]:]
+        if len(buffer) > max_sentence_chars:
+            yield buffer.strip()
+            buffer = ''
+
+    for start, end in splitter.span_tokenize(buffer):
+        yield buffer[start:end]
+
+
+class RunningStats:
+    """
+    Count, mean, standard deviation, range and histogram of a stream of
+    values, in constant memory (Welford's algorithm)
+    """
+
+    def __init__(self, bins: Tuple[float, ...] = (-1.0, -0.5, -VADER_THRESHOLD,
+                                                  VADER_THRESHOLD, 0.5, 1.0)):
+        """
+        Args:
+            bins: Histogram bin edges; values outside fall in the edge bins
+        """
+        self.bins = bins
+        self.histogram = [0] * (len(bins) - 1)
+        self.count = 0
+        self.mean = 0.0
+        self._m2 = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def add(self, value: float):
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self._m2 += delta * (value - self.mean)
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+
+        index = 0
+        while index < len(self.histogram) - 1 and value >= self.bins[index + 1]:
+            index += 1
+        self.histogram[index] += 1
+
+    @property
+    def std(self) -> float:
+        return math.sqrt(self._m2 / self.count) if self.count else 0.0
+
+    def summary(self) -> Dict:
+        return {
+            'count': self.count,
+            'mean': self.mean,
+            'std': self.std,
+            'min': self.min if self.count else 0.0,
+            'max': self.max if self.count else 0.0,
+            'histogram': dict(zip(
+                [f'{low:g}..{high:g}' for low, high in zip(self.bins, self.bins[1:])],
+                self.histogram
+            ))
+        }
+
+
+class TopK:
+    """
+    The k highest-scoring items of a stream (min-heap of size k)
+    """
+
+    def __init__(self, k: int = 5):
+        self.k = k
+        self._heap = []
+        self._counter = 0
+
+    def add(self, score: float, item):
+        # The counter breaks ties so items themselves are never compared
+        entry = (score, self._counter, item)
+        self._counter += 1
+        if len(self._heap) < self.k:
+            heapq.heappush(self._heap, entry)
+        elif entry > self._heap[0]:
+            heapq.heapreplace(self._heap, entry)
+
+    def items(self) -> List[Tuple[float, object]]:
+        """Items with their scores, highest first"""
+        return [(score, item) for score, _, item in sorted(self._heap, reverse=True)]
+
+
+class SentenceAggregator:
+    """
+    Running aggregates of per-sentence scores for one document
+    """
+
+    def __init__(self, analyzer, top_k: int = 5):
+        """
+        Args:
+            analyzer: EmotionManipulationAnalyzer providing the sentiment
+                      analyzers, lexicon index and coding scheme weights
+            top_k: Number of example sentences kept per ranking
+        """
+        self.analyzer = analyzer
+        self.weights = {
+            category: details['intensity_weight']
+            for category, details in analyzer.manipulation_categories.items()
+        }
+        self.sentence_count = 0
+        self.word_count = 0
+        self.vader = RunningStats()
+        self.polarity = RunningStats()
+        self.subjectivity = RunningStats(bins=(0.0, 0.25, 0.5, 0.75, 1.0))
+        self.manipulation_counts = dict.fromkeys(self.weights, 0)
+        self.emotion_counts = dict.fromkeys(analyzer.emotion_categories, 0)
+        self.sentences_with_manipulation = 0
+        self.most_manipulative = TopK(top_k)
+        self.most_positive = TopK(top_k)
+        self.most_negative = TopK(top_k)
+
+    def add(self, sentence: str, vader: Optional[float] = None) -> Dict:
+        """
+        Score one sentence and fold it into the aggregates
+
+        Args:
+            sentence: Sentence text
+            vader: Precomputed VADER compound score of the sentence
+
+        Returns:
+            Per-sentence scores (for export)
+        """
+        if vader is None:
+            vader = self.analyzer.sia.polarity_scores(sentence)['compound']
+        blob = TextBlob(sentence).sentiment
+        sentence_lower = lowercase_preserving_offsets(sentence)
+        tokenized = tokenize(sentence_lower)
+        hits = self.analyzer.lexicon_index.scan(sentence, sentence_lower, tokenized)
+        manipulation = hits.counts(MANIPULATION)
+        emotions = hits.counts(EMOTION_MARKER)
+        # Occurrences weighted by negation, intensity modifiers and hedges
+        context = self.analyzer.context_scorer.score(
+            hits, keyword_windows(*tokenized, hits.keyword_offsets)
+        )
+        weighted = sum(
+            count * context[category]['context_factor'] * self.weights[category]
+            for category, count in manipulation.items()
+        )
+
+        self.sentence_count += 1
+        self.word_count += len(sentence.split())
+        self.vader.add(vader)
+        self.polarity.add(blob.polarity)
+        self.subjectivity.add(blob.subjectivity)
+        for category, count in manipulation.items():
+            self.manipulation_counts[category] += count
+        for emotion, count in emotions.items():
+            self.emotion_counts[emotion] += count
+        if weighted:
+            self.sentences_with_manipulation += 1
+            self.most_manipulative.add(weighted, sentence)
+        self.most_positive.add(vader, sentence)
+        self.most_negative.add(-vader, sentence)
+
+        return {
+            'sentence_index': self.sentence_count - 1,
+            'vader_compound': vader,
+            'textblob_polarity': blob.polarity,
+            'textblob_subjectivity': blob.subjectivity,
+            'manipulation_weighted': weighted,
+            **{f'strat_{category}': count for category, count in manipulation.items()},
+            **{f'emotion_{emotion}': count for emotion, count in emotions.items()},
+            'sentence': sentence
+        }
+
+    def add_batch(self, sentences: List[str]) -> List[Dict]:
+        """Score several sentences with one vectorized VADER call"""
+        compounds = self.analyzer.sia.score_batch(sentences)['compound']
+        return [
+            self.add(sentence, round(float(compound), 4))
+            for sentence, compound in zip(sentences, compounds)
+        ]
+
+    def summary(self) -> Dict:
+        """Aggregates of all sentences seen so far"""
+        vader = self.vader.summary()
+        histogram = self.vader.histogram
+        count = self.sentence_count or 1
+        return {
+            'sentence_count': self.sentence_count,
+            'word_count': self.word_count,
+            'vader_compound': vader,
+            'sentiment_distribution': {
+                # Bins are split at +/- VADER_THRESHOLD
+                'negative': sum(histogram[:2]) / count,
+                'neutral': histogram[2] / count,
+                'positive': sum(histogram[3:]) / count
+            },
+            'textblob_polarity': self.polarity.summary(),
+            'textblob_subjectivity': self.subjectivity.summary(),
+            'manipulation_counts': dict(self.manipulation_counts),
+            'emotion_counts': dict(self.emotion_counts),
+            'manipulative_sentence_share': self.sentences_with_manipulation / count,
+            'top_manipulative_sentences': self.most_manipulative.items(),
+            'top_positive_sentences': self.most_positive.items(),
+            'top_negative_sentences': [(-score, item) for score, item in self.most_negative.items()]
+        }
+
+
+def analyze_stream(sentences: Iterable[str], aggregator: SentenceAggregator,
+                   sentence_sink: Optional[Callable[[Dict], None]] = None,
+                   batch_size: int = BATCH_SIZE) -> Dict:
+    """
+    Run a sentence stream through an aggregator
+
+    Args:
+        sentences: Sentences of one document, e.g. from stream_sentences()
+        aggregator: Aggregator collecting the running statistics
+        sentence_sink: Optional callback receiving every per-sentence row
+        batch_size: Sentences held and VADER-scored together
+
+    Returns:
+        The aggregator summary
+    """
+    sentences = iter(sentences)
+    while True:
+        batch = list(islice(sentences, batch_size))
+        if not batch:
+            break
+        for row in aggregator.add_batch(batch):
+            if sentence_sink is not None:
+                sentence_sink(row)
+    return aggregator.summary()
@@ -0,0 +1,395 @@
+"""
+Vectorized VADER Scoring
+Master's Thesis: Psychological Manipulation in Marketing Discourse
+
+A VADER-compatible sentiment scorer for batches of texts. NLTK's
+SentimentIntensityAnalyzer walks every token through a chain of Python
+rules and, for each text, builds a punctuation lookup table over all of its
+distinct words, which makes it slow on long documents. Here every distinct
+token is looked up once in a vocabulary of precomputed properties (lexicon
+valence, booster value, negation, capitals), each text becomes an array of
+vocabulary rows, and the booster, negation, idiom, "least" and "but" rules
+are applied to all tokens of all texts at once with NumPy.
+
+The rules and their quirks follow NLTK's implementation, including that a
+repeated word is scored in the context of its first occurrence in the text.
+Scores match polarity_scores() to within TOLERANCE (run benchmark_vader.py
+to check this on the corpus); differences come only from floating-point
+rounding of the final scores.
+"""
+
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+import pandas as pd
+from nltk.sentiment.vader import VaderConstants
+
+# Maximum absolute difference to NLTK's polarity_scores(), per score
+TOLERANCE = {'neg': 1e-3, 'neu': 1e-3, 'pos': 1e-3, 'compound': 1e-4}
+
+# VADER's own thresholds for positive / negative compound scores
+VADER_THRESHOLD = 0.05
+
+SCORE_NAMES = ('neg', 'neu', 'pos', 'compound')
+
+# Multi-word rule entries, matched on the exact (case-sensitive) tokens
+IDIOMS = {tuple(phrase.split()): value
+          for phrase, value in VaderConstants.SPECIAL_CASE_IDIOMS.items()}
+BOOSTER_PHRASES = [tuple(phrase.split()) for phrase in VaderConstants.BOOSTER_DICT
+                   if ' ' in phrase]
+EXACT_WORDS = sorted({'never', 'so', 'this'}
+                     | {word for phrase in IDIOMS for word in phrase}
+                     | {word for phrase in BOOSTER_PHRASES for word in phrase})
+EXACT_CODES = {word: code for code, word in enumerate(EXACT_WORDS)}
+
+# Per-token properties of the vocabulary and their array types
+COLUMN_TYPES = {
+    'valence': np.float64, 'upper': bool, 'booster': np.float64, 'negation': bool,
+    'kind': bool, 'of': bool, 'least': bool, 'at_or_very': bool, 'but': bool,
+    'exact': np.int64
+}
+
+
+def round_scores(scores) -> Dict[str, float]:
+    """Scores rounded as polarity_scores() rounds them"""
+    return {name: round(float(scores[name]), 4 if name == 'compound' else 3)
+            for name in SCORE_NAMES}
+
+
+def _back(values: np.ndarray, distance: int, fill) -> np.ndarray:
+    """values[i - distance] at every position i (fill at the start)"""
+    shifted = np.full_like(values, fill)
+    shifted[distance:] = values[:-distance]
+    return shifted
+
+
+def _ahead(values: np.ndarray, distance: int, fill) -> np.ndarray:
+    """values[i + distance] at every position i (fill at the end)"""
+    shifted = np.full_like(values, fill)
+    shifted[:-distance] = values[distance:]
+    return shifted
+
+
+class VectorizedVader:
+    """
+    VADER sentiment for many texts at once
+    """
+
+    def __init__(self, lexicon: Dict[str, float]):
+        """
+        Args:
+            lexicon: Word -> valence dictionary, e.g. the lexicon of NLTK's
+                     SentimentIntensityAnalyzer
+        """
+        self.lexicon = lexicon
+        self.constants = VaderConstants()
+        self.punctuation = set(self.constants.PUNC_LIST)
+        # Raw whitespace-separated token -> vocabulary row (-1: ignored)
+        self._raw_rows = {}
+        # Token with surrounding punctuation removed -> vocabulary row
+        self._rows = {}
+        # Properties of the rows added since the arrays were last built
+        self._columns = {name: [] for name in COLUMN_TYPES}
+        self._arrays = {name: np.empty(0, dtype=dtype) for name, dtype in COLUMN_TYPES.items()}
+
+    def _strip_punctuation(self, token: str) -> str:
+        """
+        Remove one leading or trailing PUNC_LIST entry from a token whose
+        remaining characters contain no punctuation, as SentiText does
+        """
+        remove = self.constants.REGEX_REMOVE_PUNCTUATION
+        stripped = remove.sub('', token)
+        if len(stripped) <= 1 or stripped == token:
+            return token
+        if token.endswith(stripped) and token[:-len(stripped)] in self.punctuation:
+            return stripped
+        if token.startswith(stripped) and token[len(stripped):] in self.punctuation:
+            return stripped
+        return token
+
+    def _row(self, raw_token: str) -> int:
+        """Vocabulary row of a raw token, added on first sight"""
+        row = self._raw_rows.get(raw_token)
+        if row is not None:
+            return row
+        if len(raw_token) <= 1:
+            # SentiText drops single characters
+            row = -1
+        else:
+            token = self._strip_punctuation(raw_token)
+            row = self._rows.get(token)
+            if row is None:
+                row = self._rows[token] = len(self._rows)
+                self._add_properties(token)
+        self._raw_rows[raw_token] = row
+        return row
+
+    def _add_properties(self, token: str):
+        lower = token.lower()
+        columns = self._columns
+        columns['valence'].append(self.lexicon.get(lower, np.nan))
+        columns['upper'].append(token.isupper())
+        columns['booster'].append(self.constants.BOOSTER_DICT.get(lower, 0.0))
+        columns['negation'].append(lower in self.constants.NEGATE or "n't" in lower)
+        columns['kind'].append(lower == 'kind')
+        columns['of'].append(lower == 'of')
+        columns['least'].append(lower == 'least')
+        columns['at_or_very'].append(lower in ('at', 'very'))
+        columns['but'].append(lower == 'but')
+        columns['exact'].append(EXACT_CODES.get(token, -1))
+
+    def _properties(self) -> Dict[str, np.ndarray]:
+        """Vocabulary columns as arrays, extended by the rows added since"""
+        if self._columns['exact']:
+            for name, dtype in COLUMN_TYPES.items():
+                self._arrays[name] = np.concatenate(
+                    [self._arrays[name], np.array(self._columns[name], dtype=dtype)]
+                )
+                self._columns[name] = []
+        return self._arrays
+
+    def _token_rows(self, texts: List[str]):
+        """
+        Vocabulary rows and text index of every token of every text
+
+        Distinct tokens are hashed once (pandas factorize) and only those are
+        looked up in the vocabulary.
+        """
+        split_texts = [text.split() for text in texts]
+        tokens = [token for words in split_texts for token in words]
+        segments = np.repeat(np.arange(len(texts)), [len(words) for words in split_texts])
+        if not tokens:
+            return np.empty(0, dtype=np.int64), segments
+        codes, uniques = pd.factorize(np.array(tokens, dtype=object))
+        unique_rows = np.array([self._row(token) for token in uniques], dtype=np.int64)
+        rows = unique_rows[codes]
+        kept = rows >= 0
+        return rows[kept], segments[kept]
+
+    def _phrase_starts(self, exact: np.ndarray, remaining: np.ndarray, phrase) -> np.ndarray:
+        """Whether the phrase's exact tokens start at each position"""
+        codes = [EXACT_CODES[word] for word in phrase]
+        starts = (exact == codes[0]) & (remaining >= len(phrase) - 1)
+        for distance, code in enumerate(codes[1:], start=1):
+            starts &= _ahead(exact, distance, -1) == code
+        return starts
+
+    def token_sentiments(self, texts: List[str]):
+        """
+        Valence of every token after all VADER rules
+
+        Returns:
+            Tuple of (valences, text index of each token)
+        """
+        constants = self.constants
+        rows, segments = self._token_rows(texts)
+        properties = self._properties()
+        n_texts = len(texts)
+        if rows.size == 0:
+            return np.zeros(0), segments
+
+        def column(name):
+            return properties[name][rows]
+
+        valence = column('valence')
+        in_lexicon = ~np.isnan(valence)
+        upper = column('upper')
+        booster = column('booster')
+        negation = column('negation')
+        exact = column('exact')
+
+        # Position within the text and number of tokens after it
+        lengths = np.bincount(segments, minlength=n_texts)
+        starts = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+        position = np.arange(rows.size) - starts[segments]
+        remaining = lengths[segments] - position - 1
+
+        # Capitals only count when some but not all words are upper case
+        upper_count = np.bincount(segments, weights=upper, minlength=n_texts)
+        cap_differential = ((upper_count > 0) & (upper_count < lengths))[segments]
+
+        sentiments = np.where(in_lexicon, valence, 0.0)
+        capitalized = in_lexicon & upper & cap_differential
+        sentiments = np.where(
+            capitalized,
+            sentiments + np.where(sentiments > 0, constants.C_INCR, -constants.C_INCR),
+            sentiments
+        )
+
+        never = EXACT_CODES['never']
+        so_or_this = [EXACT_CODES['so'], EXACT_CODES['this']]
+
+        # Boosters and negations up to three words before a lexicon word
+        for start_i in range(3):
+            distance = start_i + 1
+            active = (in_lexicon & (position > start_i)
+                      & ~_back(in_lexicon, distance, True))
+
+            previous_booster = _back(booster, distance, 0.0)
+            scalar = np.where(sentiments < 0, -previous_booster, previous_booster)
+            capital_booster = ((previous_booster != 0) & _back(upper, distance, False)
+                               & cap_differential)
+            scalar = np.where(
+                capital_booster,
+                scalar + np.where(sentiments > 0, constants.C_INCR, -constants.C_INCR),
+                scalar
+            )
+            if start_i == 1:
+                scalar = scalar * 0.95
+            elif start_i == 2:
+                scalar = scalar * 0.9
+            sentiments = np.where(active, sentiments + scalar, sentiments)
+
+            negated = active & _back(negation, distance, False)
+            if start_i == 0:
+                emphasis = np.zeros_like(active)
+            elif start_i == 1:
+                emphasis = active & (_back(exact, 2, -1) == never) & np.isin(_back(exact, 1, -1), so_or_this)
+            else:
+                emphasis = active & (
+                    ((_back(exact, 3, -1) == never) & np.isin(_back(exact, 2, -1), so_or_this))
+                    | np.isin(_back(exact, 1, -1), so_or_this)
+                )
+            sentiments = np.where(
+                emphasis, sentiments * (1.5 if start_i == 1 else 1.25),
+                np.where(negated, sentiments * constants.N_SCALAR, sentiments)
+            )
+
+            if start_i == 2:
+                sentiments = self._apply_idioms(sentiments, active, exact, remaining)
+
+        # "least" before a lexicon word negates it, except in "at least"
+        least = (in_lexicon & (position > 0) & _back(column('least'), 1, False)
+                 & ~_back(in_lexicon, 1, True)
+                 & ((position == 1) | ~_back(column('at_or_very'), 2, False)))
+        sentiments = np.where(least, sentiments * constants.N_SCALAR, sentiments)
+
+        # Boosters and "kind" in "kind of" carry no valence themselves
+        skipped = (booster != 0) | (column('kind') & _ahead(column('of'), 1, False)
+                                    & (remaining > 0))
+        sentiments = np.where(skipped, 0.0, sentiments)
+
+        # Every occurrence of a word gets the valence of its first occurrence
+        keys = segments * (len(self._rows) + 1) + rows
+        _, first_index, inverse = np.unique(keys, return_index=True, return_inverse=True)
+        sentiments = sentiments[first_index[inverse.reshape(-1)]]
+
+        # Words before the first "but" count half, words after it 1.5 times
+        is_but = column('but')
+        first_but = np.full(n_texts, np.iinfo(np.int64).max)
+        np.minimum.at(first_but, segments[is_but], position[is_but])
+        but_position = first_but[segments]
+        sentiments = np.where(
+            position < but_position,
+            np.where(but_position < np.iinfo(np.int64).max, sentiments * 0.5, sentiments),
+            np.where(position > but_position, sentiments * 1.5, sentiments)
+        )
+        return sentiments, segments
+
+    def _apply_idioms(self, sentiments, active, exact, remaining) -> np.ndarray:
+        """Idiom and multi-word booster rules (third booster step only)"""
+        bigrams = np.full(exact.shape, np.nan)
+        trigrams = np.full(exact.shape, np.nan)
+        for phrase, value in IDIOMS.items():
+            target = bigrams if len(phrase) == 2 else trigrams
+            target[self._phrase_starts(exact, remaining, phrase)] = value
+
+        # Phrases ending at or before the word, the first match wins ...
+        idiom = np.full(exact.shape, np.nan)
+        for candidate in reversed([_back(bigrams, 1, np.nan), _back(trigrams, 2, np.nan),
+                                   _back(bigrams, 2, np.nan), _back(trigrams, 3, np.nan),
+                                   _back(bigrams, 3, np.nan)]):
+            idiom = np.where(np.isnan(candidate), idiom, candidate)
+        # ... unless one starts at the word
+        idiom = np.where(np.isnan(bigrams), idiom, bigrams)
+        idiom = np.where(np.isnan(trigrams), idiom, trigrams)
+        sentiments = np.where(active & ~np.isnan(idiom), idiom, sentiments)
+
+        booster_phrase = np.zeros(exact.shape, dtype=bool)
+        for phrase in BOOSTER_PHRASES:
+            booster_phrase |= self._phrase_starts(exact, remaining, phrase)
+        damped = active & (_back(booster_phrase, 3, False) | _back(booster_phrase, 2, False))
+        return np.where(damped, sentiments + self.constants.B_DECR, sentiments)
+
+    def score_batch(self, texts: Iterable[str]) -> pd.DataFrame:
+        """
+        Unrounded VADER scores of many texts
+
+        Args:
+            texts: Texts to score independently (e.g. the sentences of a
+                   document, or whole documents)
+
+        Returns:
+            DataFrame with neg, neu, pos and compound columns, one row per text
+        """
+        texts = list(texts)
+        n_texts = len(texts)
+        sentiments, segments = self.token_sentiments(texts)
+
+        token_count = np.bincount(segments, minlength=n_texts)
+        total = np.bincount(segments, weights=sentiments, minlength=n_texts)
+        pos_sum = np.bincount(segments, weights=np.where(sentiments > 0, sentiments + 1, 0.0),
+                              minlength=n_texts)
+        neg_sum = np.bincount(segments, weights=np.where(sentiments < 0, sentiments - 1, 0.0),
+                              minlength=n_texts)
+        neu_count = np.bincount(segments, weights=sentiments == 0, minlength=n_texts)
+
+        exclamations = np.minimum([text.count('!') for text in texts], 4) * 0.292
+        questions = np.array([text.count('?') for text in texts])
+        questions = np.where(questions > 3, 0.96,
+                             np.where(questions > 1, questions * 0.18, 0.0))
+        emphasis = exclamations + questions
+
+        total = total + np.sign(total) * emphasis
+        compound = total / np.sqrt(total * total + 15)
+        more_positive = pos_sum > -neg_sum
+        more_negative = pos_sum < -neg_sum
+        pos_sum = np.where(more_positive, pos_sum + emphasis, pos_sum)
+        neg_sum = np.where(more_negative, neg_sum - emphasis, neg_sum)
+        denominator = pos_sum - neg_sum + neu_count
+        denominator = np.where(denominator == 0, 1.0, denominator)
+
+        scored = token_count > 0
+        return pd.DataFrame({
+            'neg': np.where(scored, np.abs(neg_sum / denominator), 0.0),
+            'neu': np.where(scored, np.abs(neu_count / denominator), 0.0),
+            'pos': np.where(scored, np.abs(pos_sum / denominator), 0.0),
+            'compound': np.where(scored, compound, 0.0)
+        })
+
+    def polarity_scores(self, text: str) -> Dict[str, float]:
+        """Drop-in replacement for SentimentIntensityAnalyzer.polarity_scores"""
+        return round_scores(self.score_batch([text]).iloc[0])
+
+    def score_document(self, sentences: List[str],
+                       text: Optional[str] = None) -> Dict[str, any]:
+        """
+        Per-sentence scores of a document and their aggregates
+
+        Args:
+            sentences: Sentences of the document
+            text: Full document text, scored as a whole when given
+
+        Returns:
+            Dictionary with 'sentences' (DataFrame of per-sentence scores),
+            'aggregate' (mean scores and sentiment distribution) and, if
+            text is given, 'document' (polarity_scores of the whole text)
+        """
+        sentence_scores = self.score_batch(sentences)
+        compound = sentence_scores['compound']
+        count = len(sentence_scores)
+        aggregate = {
+            'sentence_count': count,
+            **{f'mean_{name}': float(sentence_scores[name].mean()) if count else 0.0
+               for name in SCORE_NAMES},
+            'compound_std': float(compound.std(ddof=0)) if count else 0.0,
+            'positive_share': float((compound >= VADER_THRESHOLD).mean()) if count else 0.0,
+            'negative_share': float((compound <= -VADER_THRESHOLD).mean()) if count else 0.0,
+        }
+        aggregate['neutral_share'] = (
+            1.0 - aggregate['positive_share'] - aggregate['negative_share'] if count else 0.0
+        )
+        result = {'sentences': sentence_scores, 'aggregate': aggregate}
+        if text is not None:
+            result['document'] = self.polarity_scores(text)
+        return result